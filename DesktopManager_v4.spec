@@ -11,7 +11,7 @@ datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
 
 
 a = Analysis(
-    ['main_gui.py'],
+    ['launcher.py'],
     pathex=[],
     binaries=binaries,
     datas=datas,
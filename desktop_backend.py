@@ -0,0 +1,275 @@
+"""桌面 ListView 访问后端：远程进程内存读写与窗口消息。
+
+DesktopManager 及批量引擎只通过这里的接口与 Explorer 交互，
+因此可以替换为 desktop_sim 中的模拟实现，在非 Windows 环境下运行和测量。
+"""
+import ctypes
+
+import metrics
+
+try:
+    import win32gui
+    import win32process
+except ImportError:  # 非 Windows 环境下只能使用模拟后端
+    win32gui = win32process = None
+
+
+class _Logger:
+    """最小日志器，仅保留最后一条错误供 UI 展示。"""
+    def __init__(self):
+        self.last_error = None
+    def debug(self, msg): pass
+    def info(self, msg): pass
+    def warning(self, msg): pass
+    def error(self, msg):
+        self.last_error = msg
+    def critical(self, msg):
+        self.last_error = msg
+
+
+logging = _Logger()
+
+LVM_FIRST            = 0x1000
+LVM_GETITEMCOUNT     = LVM_FIRST + 4
+LVM_GETITEMTEXTW     = LVM_FIRST + 115
+LVM_GETITEMPOSITION  = LVM_FIRST + 16
+LVM_SETITEMPOSITION32 = LVM_FIRST + 49
+LVM_GETITEMSPACING   = LVM_FIRST + 53
+LVIF_TEXT            = 0x0001
+
+WM_NULL              = 0x0000
+WM_SETREDRAW         = 0x000B
+SMTO_NORMAL          = 0x0000
+SMTO_ABORTIFHUNG     = 0x0002
+
+MEM_COMMIT     = 0x1000
+MEM_RESERVE    = 0x2000
+MEM_RELEASE    = 0x8000
+PAGE_READWRITE = 0x04
+
+GWL_STYLE          = -16
+LVS_AUTOARRANGE    = 0x0100
+PROCESS_ALL_ACCESS = 0x1F0FFF
+
+
+class DesktopBackend:
+    """后端接口。hwnd 为桌面 SysListView32 句柄，地址均为目标进程内地址。"""
+    hwnd = 0
+
+    def alloc(self, size):
+        """在目标进程中分配 size 字节，失败返回 0。"""
+        raise NotImplementedError
+
+    def free(self, address):
+        raise NotImplementedError
+
+    def read(self, address, size):
+        raise NotImplementedError
+
+    def write(self, address, data):
+        raise NotImplementedError
+
+    def send_message(self, msg, wparam=0, lparam=0):
+        raise NotImplementedError
+
+    def send_notify(self, msg, wparam=0, lparam=0):
+        """异步投递到目标线程的 sent-message 队列（按顺序处理），立即返回是否成功。"""
+        raise NotImplementedError
+
+    def send_message_timeout(self, msg, wparam=0, lparam=0, timeout_ms=5000):
+        """带超时的同步发送，返回 (是否成功, 结果)。可作为之前 send_notify 的屏障。"""
+        raise NotImplementedError
+
+    def invalidate(self):
+        """整窗重绘。"""
+        raise NotImplementedError
+
+    def get_style(self):
+        """ListView 的窗口样式（GWL_STYLE）。"""
+        return 0
+
+    def set_style(self, style):
+        pass
+
+    def is_alive(self):
+        """廉价的健康检查：窗口仍存在且仍属于打开时的进程（Explorer 未重启）。"""
+        return True
+
+    def close(self):
+        pass
+
+
+def _load_kernel32():
+    # 独立的 WinDLL 实例，避免修改全局 ctypes.windll.kernel32 的函数原型
+    from ctypes import wintypes
+    k32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    k32.VirtualAllocEx.restype = ctypes.c_void_p
+    k32.VirtualAllocEx.argtypes = [wintypes.HANDLE, ctypes.c_void_p, ctypes.c_size_t,
+                                   wintypes.DWORD, wintypes.DWORD]
+    k32.VirtualFreeEx.restype = wintypes.BOOL
+    k32.VirtualFreeEx.argtypes = [wintypes.HANDLE, ctypes.c_void_p, ctypes.c_size_t,
+                                  wintypes.DWORD]
+    k32.ReadProcessMemory.restype = wintypes.BOOL
+    k32.ReadProcessMemory.argtypes = [wintypes.HANDLE, ctypes.c_void_p, ctypes.c_void_p,
+                                      ctypes.c_size_t, ctypes.POINTER(ctypes.c_size_t)]
+    k32.WriteProcessMemory.restype = wintypes.BOOL
+    k32.WriteProcessMemory.argtypes = [wintypes.HANDLE, ctypes.c_void_p, ctypes.c_void_p,
+                                       ctypes.c_size_t, ctypes.POINTER(ctypes.c_size_t)]
+    return k32
+
+
+def _load_user32():
+    from ctypes import wintypes
+    u32 = ctypes.WinDLL("user32", use_last_error=True)
+    u32.SendNotifyMessageW.restype = wintypes.BOOL
+    u32.SendNotifyMessageW.argtypes = [wintypes.HWND, wintypes.UINT,
+                                       wintypes.WPARAM, wintypes.LPARAM]
+    u32.SendMessageTimeoutW.restype = wintypes.LPARAM
+    u32.SendMessageTimeoutW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM,
+                                        wintypes.LPARAM, wintypes.UINT, wintypes.UINT,
+                                        ctypes.POINTER(ctypes.c_size_t)]
+    u32.IsWindow.restype = wintypes.BOOL
+    u32.IsWindow.argtypes = [wintypes.HWND]
+    u32.GetWindowThreadProcessId.restype = wintypes.DWORD
+    u32.GetWindowThreadProcessId.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.DWORD)]
+    return u32
+
+
+def find_desktop_listview():
+    """查找桌面 SysListView32：先找 Progman 下的，再在 WorkerW 中查找。"""
+    hwnd_progman = win32gui.FindWindow("Progman", "Program Manager")
+    hwnd_shell = win32gui.FindWindowEx(hwnd_progman, 0, "SHELLDLL_DefView", None)
+    hwnd_listview = win32gui.FindWindowEx(hwnd_shell, 0, "SysListView32", None)
+
+    if not hwnd_listview:
+        def _enum(hwnd, results):
+            if win32gui.GetClassName(hwnd) == "WorkerW":
+                shell = win32gui.FindWindowEx(hwnd, 0, "SHELLDLL_DefView", None)
+                if shell:
+                    lv = win32gui.FindWindowEx(shell, 0, "SysListView32", None)
+                    if lv:
+                        results.append(lv)
+            return True
+        results = []
+        win32gui.EnumWindows(_enum, results)
+        if results:
+            hwnd_listview = results[0]
+
+    return hwnd_listview
+
+
+_dpi_aware = False
+
+
+def enable_dpi_awareness():
+    """声明 Per-Monitor DPI 感知（只执行一次），保证读取到的是物理像素坐标。"""
+    global _dpi_aware
+    if _dpi_aware:
+        return
+    _dpi_aware = True
+    try:
+        ctypes.windll.shcore.SetProcessDpiAwareness(2)
+    except Exception:
+        try:
+            ctypes.windll.user32.SetProcessDPIAware()
+        except Exception:
+            pass
+
+
+class Win32Backend(DesktopBackend):
+    """基于 ReadProcessMemory/WriteProcessMemory/SendMessage 的真实后端。"""
+
+    @classmethod
+    def open(cls):
+        """连接当前桌面的 ListView；非 Windows 环境或找不到窗口时抛出异常。"""
+        if win32gui is None:
+            raise Exception("Win32 desktop access is not available on this platform")
+        enable_dpi_awareness()
+        hwnd = find_desktop_listview()
+        if not hwnd:
+            raise Exception("Could not find Desktop ListView handle")
+
+        pid = win32process.GetWindowThreadProcessId(hwnd)[1]
+        process = ctypes.windll.kernel32.OpenProcess(PROCESS_ALL_ACCESS, False, pid)
+        if not process:
+            raise Exception("Could not open Desktop process")
+        return cls(hwnd, process, pid)
+
+    def __init__(self, hwnd, process, pid=None):
+        self.hwnd = hwnd
+        self.process = process
+        self.pid = pid
+        self._k32 = _load_kernel32()
+        self._u32 = _load_user32()
+
+    def alloc(self, size):
+        if metrics.enabled:
+            metrics.count("alloc")
+        return self._k32.VirtualAllocEx(
+            self.process, None, size, MEM_COMMIT | MEM_RESERVE, PAGE_READWRITE) or 0
+
+    def free(self, address):
+        if address:
+            self._k32.VirtualFreeEx(self.process, address, 0, MEM_RELEASE)
+
+    def read(self, address, size):
+        buffer = ctypes.create_string_buffer(size)
+        bytes_read = ctypes.c_size_t()
+        self._k32.ReadProcessMemory(self.process, address, buffer, size, ctypes.byref(bytes_read))
+        if metrics.enabled:
+            metrics.count("rpm_calls")
+            metrics.count("rpm_bytes", bytes_read.value)
+        return buffer.raw
+
+    def write(self, address, data):
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        bytes_written = ctypes.c_size_t()
+        self._k32.WriteProcessMemory(self.process, address, data, len(data),
+                                     ctypes.byref(bytes_written))
+        if metrics.enabled:
+            metrics.count("wpm_calls")
+            metrics.count("wpm_bytes", bytes_written.value)
+
+    def send_message(self, msg, wparam=0, lparam=0):
+        if metrics.enabled:
+            metrics.count("send_message")
+        return win32gui.SendMessage(self.hwnd, msg, wparam, lparam)
+
+    def send_notify(self, msg, wparam=0, lparam=0):
+        if metrics.enabled:
+            metrics.count("send_notify")
+        return bool(self._u32.SendNotifyMessageW(self.hwnd, msg, wparam, lparam))
+
+    def send_message_timeout(self, msg, wparam=0, lparam=0, timeout_ms=5000):
+        if metrics.enabled:
+            metrics.count("send_message")
+        result = ctypes.c_size_t()
+        ok = self._u32.SendMessageTimeoutW(self.hwnd, msg, wparam, lparam,
+                                           SMTO_NORMAL | SMTO_ABORTIFHUNG, timeout_ms,
+                                           ctypes.byref(result))
+        return bool(ok), result.value
+
+    def invalidate(self):
+        win32gui.InvalidateRect(self.hwnd, None, True)
+        win32gui.UpdateWindow(self.hwnd)
+
+    def get_style(self):
+        return win32gui.GetWindowLong(self.hwnd, GWL_STYLE)
+
+    def set_style(self, style):
+        win32gui.SetWindowLong(self.hwnd, GWL_STYLE, style)
+
+    def is_alive(self):
+        if not self.process or not self._u32.IsWindow(self.hwnd):
+            return False
+        if self.pid is None:
+            return True
+        pid = ctypes.c_ulong()
+        self._u32.GetWindowThreadProcessId(self.hwnd, ctypes.byref(pid))
+        return pid.value == self.pid
+
+    def close(self):
+        if self.process:
+            self._k32.CloseHandle(self.process)
+            self.process = None
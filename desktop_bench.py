@@ -0,0 +1,262 @@
+"""基于 desktop_sim 的性能基准，不需要 Windows 与 Explorer。
+
+对每个 (图标数, 显示器数) 组合测量：
+    snapshot   读取桌面并生成布局数据（get_current_layout_table）
+    restore    约 10% 图标偏离原位时的恢复（restore_from_data）
+    restore_cached  同上，目标坐标取自预编译计划缓存
+    match      按当前拓扑选出布局、读取数据并生成恢复计划（不移动）
+    json_save  布局数据写为 JSON
+    json_load  从 JSON 读回 IconTable
+
+用法：
+    python desktop_bench.py                                  # 默认规模，结果写入 bench_output.txt
+    python desktop_bench.py --icons 100,1000 --monitors 1,3 --latency-us 20
+    python desktop_bench.py --baseline old_bench.txt         # 与之前的结果比较
+
+结果文件每行一个 JSON：第一行为运行环境，其余每行为一个场景的耗时（毫秒）与
+模拟 ListView 上的消息、内存访问次数。调用次数与机器无关，可直接比较；耗时取多次
+运行的最小值与中位数。指定 --baseline 时，中位数变慢超过阈值的场景会列出，
+并以退出码 1 结束，便于在构建机上发现性能回退。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import display_topology
+import desktop_manager
+from desktop_sim import SimulatedDisplays, SimulatedListView, desktop_items, monitor_row
+from icon_table import IconTable, to_plain
+from layout_store import LayoutManager, content_hash
+from monitor_index import np
+from plan_cache import PlanCache
+from restore_plan import build_restore_plan
+
+ICON_COUNTS = (10, 100, 1000, 10000)
+MONITOR_COUNTS = (1, 2, 4, 6)
+SCENARIOS = ("snapshot", "restore", "restore_cached", "match", "json_save", "json_load")
+DEFAULT_REPEAT = 3
+DEFAULT_OUTPUT = "bench_output.txt"
+DISPLACED_RATIO = 0.1
+STORE_LAYOUTS = 8            # match 场景中布局库的布局数，一半与当前拓扑匹配
+REGRESSION_THRESHOLD = 1.25  # 中位数超过基准的倍数视为回退
+NOISE_FLOOR_MS = 1.0         # 低于此耗时的场景不参与回退判断
+
+STAT_KEYS = ("send_message", "notify", "read", "read_bytes", "write", "write_bytes")
+
+
+def _int_list(text):
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+def _measure(func, repeat, setup=None, sim=None):
+    """运行 repeat 次，返回 (各次耗时秒数, 最后一次的模拟调用计数)。"""
+    times = []
+    calls = {}
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        before = dict(sim.stats) if sim is not None else None
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+        if sim is not None:
+            calls = {key: sim.stats[key] - before[key] for key in STAT_KEYS}
+    return times, calls
+
+
+def _build_store(directory, data, other_data):
+    """布局库：交替放入当前拓扑与另一拓扑的布局，时间戳递增。"""
+    store = LayoutManager(os.path.join(directory, "desktop_layouts.json"))
+    for i in range(STORE_LAYOUTS):
+        layout = store.add_layout()
+        store.update_layout(len(store.layouts) - 1, name=f"布局 {i}",
+                            data=data if i % 2 == 0 else other_data)
+        layout["timestamp"] = i
+    store.save()
+    return store
+
+
+def run_case(icon_count, monitor_count, repeat, latency, workdir):
+    """测量一个 (图标数, 显示器数) 组合，返回结果行列表。"""
+    rects = monitor_row(monitor_count)
+    display_topology.use_source(SimulatedDisplays(rects))
+    sim = SimulatedListView(desktop_items(icon_count, rects), latency=latency,
+                            log_messages=False)
+    session = desktop_manager.DesktopSession(lambda: desktop_manager.DesktopManager(sim))
+    measured = {}
+    try:
+        data = desktop_manager.get_current_layout_table(session)   # 建立会话、预热拓扑缓存
+
+        def snapshot():
+            nonlocal data
+            data = desktop_manager.get_current_layout_table(session)
+        measured["snapshot"] = _measure(snapshot, repeat, sim=sim)
+
+        rng = random.Random(icon_count * 7 + monitor_count)
+        displaced = max(1, int(icon_count * DISPLACED_RATIO))
+        spacing_x = sim.spacing[0]
+
+        def displace():
+            for i in rng.sample(range(icon_count), displaced):
+                sim.items[i][1] += spacing_x
+
+        def restore():
+            plan = desktop_manager.restore_from_data(data, session=session)
+            if plan.missing:
+                raise RuntimeError(f"restore lost {plan.missing} icons")
+        measured["restore"] = _measure(restore, repeat, setup=displace, sim=sim)
+
+        plans = PlanCache()
+        layout = {"id": "bench", "content_hash": content_hash(data)}
+        desktop_manager.restore_from_data(data, session=session, layout=layout, plans=plans)
+
+        def restore_cached():
+            desktop_manager.restore_from_data(data, session=session, layout=layout, plans=plans)
+        measured["restore_cached"] = _measure(restore_cached, repeat, setup=displace, sim=sim)
+
+        case_dir = os.path.join(workdir, f"{icon_count}x{monitor_count}")
+        other = SimulatedDisplays(monitor_row(monitor_count + 1))
+        other_data = dict(data, monitors=other.monitors_info())
+        store = _build_store(case_dir, data, other_data)
+        with session.manager() as dm:
+            current_icons, spacing = dm.get_icons()
+
+        def match():
+            store._cache.clear()   # 每次都从磁盘读取布局数据
+            display_topology.invalidate()
+            layout = store.best_layout()
+            saved = store.get_data(layout)
+            build_restore_plan(saved["icons"].grid_order(), current_icons,
+                               display_topology.get_monitors(), spacing, saved["monitors"])
+        measured["match"] = _measure(match, repeat)
+
+        json_path = os.path.join(case_dir, "layout.json")
+
+        def json_save():
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(to_plain(data), f, ensure_ascii=False)
+        measured["json_save"] = _measure(json_save, repeat)
+
+        def json_load():
+            with open(json_path, 'r', encoding='utf-8') as f:
+                IconTable.from_dicts(json.load(f)["icons"])
+        measured["json_load"] = _measure(json_load, repeat)
+    finally:
+        session.close()
+        display_topology.use_source(None)
+
+    rows = []
+    for scenario in SCENARIOS:
+        times, calls = measured[scenario]
+        rows.append({
+            "scenario": scenario,
+            "icons": icon_count,
+            "monitors": monitor_count,
+            "min_ms": round(min(times) * 1000, 3),
+            "median_ms": round(statistics.median(times) * 1000, 3),
+            "calls": calls,
+        })
+    return rows
+
+
+def environment(args, latency):
+    return {
+        "bench": "desktop_bench",
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np is not None,
+        "repeat": args.repeat,
+        "latency_us": {kind: round(seconds * 1e6, 3) for kind, seconds in latency.items()},
+    }
+
+
+def read_results(path):
+    """读取结果文件，返回 (环境, {(scenario, icons, monitors): 行})。"""
+    env, rows = {}, {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if "scenario" in row:
+                rows[(row["scenario"], row["icons"], row["monitors"])] = row
+            else:
+                env = row
+    return env, rows
+
+
+def compare(rows, baseline_rows, threshold=REGRESSION_THRESHOLD):
+    """返回中位数变慢超过 threshold 倍或调用次数增加的场景说明列表。"""
+    regressions = []
+    for row in rows:
+        key = (row["scenario"], row["icons"], row["monitors"])
+        base = baseline_rows.get(key)
+        if base is None:
+            continue
+        label = f"{row['scenario']} icons={row['icons']} monitors={row['monitors']}"
+        if (row["median_ms"] >= NOISE_FLOOR_MS and
+                row["median_ms"] > base["median_ms"] * threshold):
+            regressions.append(f"{label}: {base['median_ms']} ms -> {row['median_ms']} ms")
+        for key_name, value in row.get("calls", {}).items():
+            old = base.get("calls", {}).get(key_name)
+            if old is not None and value > old:
+                regressions.append(f"{label}: {key_name} {old} -> {value}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="desktop_bench",
+                                     description="基于模拟桌面的性能基准")
+    parser.add_argument("--icons", type=_int_list, default=list(ICON_COUNTS),
+                        help="图标数列表，逗号分隔")
+    parser.add_argument("--monitors", type=_int_list, default=list(MONITOR_COUNTS),
+                        help="显示器数列表，逗号分隔")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--latency-us", type=float, default=0.0,
+                        help="每次同步消息与跨进程读写注入的延迟（微秒）")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", help="与之前的结果文件比较")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    seconds = args.latency_us / 1e6
+    latency = {kind: seconds for kind in ("send_message", "read", "write")} if seconds else {}
+
+    rows = []
+    workdir = tempfile.mkdtemp(prefix="desktop_bench_")
+    try:
+        print(f"{'scenario':<14} {'icons':>6} {'mon':>4} {'min ms':>10} {'median ms':>10}")
+        for monitor_count in args.monitors:
+            for icon_count in args.icons:
+                for row in run_case(icon_count, monitor_count, args.repeat, latency, workdir):
+                    rows.append(row)
+                    print(f"{row['scenario']:<14} {row['icons']:>6} {row['monitors']:>4} "
+                          f"{row['min_ms']:>10.3f} {row['median_ms']:>10.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(environment(args, latency), ensure_ascii=False) + "\n")
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        _, baseline_rows = read_results(args.baseline)
+        regressions = compare(rows, baseline_rows, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""桌面操作的后台执行器。
+
+所有会访问桌面 ListView 的操作（保存快照、恢复、预览当前布局）都提交到同一个
+工作线程依次执行，互不交错；UI 线程不再直接调用 desktop_manager。
+
+- 任务函数以 cancel（threading.Event）为唯一参数，长时间操作应在适当位置检查它；
+- replace=True 提交时，同类的排队任务被丢弃、正在执行的同类任务收到取消，
+  连续多次点击“恢复”只会执行最后一次；被丢弃、从未执行的任务收到 on_cancel；
+- 结果与异常通过 dispatch（通常为 root.after）回到 UI 线程。
+"""
+import threading
+from collections import deque
+
+from desktop_backend import logging
+
+
+class Job:
+    __slots__ = ("kind", "func", "on_done", "on_error", "on_cancel", "cancel")
+
+    def __init__(self, kind, func, on_done=None, on_error=None, on_cancel=None):
+        self.kind = kind
+        self.func = func
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel.is_set()
+
+    def __repr__(self):
+        return f"Job({self.kind!r}, cancelled={self.cancelled})"
+
+
+class DesktopJobExecutor:
+    def __init__(self, dispatch):
+        """dispatch(func, *args) 负责在 UI 线程调用 func，例如
+        lambda func, *args: root.after(0, func, *args)。"""
+        self.dispatch = dispatch
+        self._queue = deque()
+        self._current = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="desktop-jobs", daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self):
+        with self._cond:
+            return self._current is not None or bool(self._queue)
+
+    def submit(self, kind, func, on_done=None, on_error=None, replace=False, on_cancel=None):
+        """on_cancel() 在任务未执行就被取消丢弃时调用；已开始执行的任务只收到
+        cancel 信号，结果仍通过 on_done / on_error 返回。"""
+        job = Job(kind, func, on_done, on_error, on_cancel)
+        dropped = ()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("executor is shut down")
+            if replace:
+                dropped = self._cancel_locked(kind)
+            self._queue.append(job)
+            self._cond.notify()
+        self._notify_dropped(dropped)
+        return job
+
+    def cancel(self, kind=None):
+        """取消排队中及正在执行的任务（kind 为 None 时取消全部）。"""
+        with self._cond:
+            dropped = self._cancel_locked(kind)
+        self._notify_dropped(dropped)
+
+    def _cancel_locked(self, kind):
+        """返回被丢弃的排队任务。"""
+        kept = deque()
+        dropped = []
+        for job in self._queue:
+            if kind is None or job.kind == kind:
+                job.cancel.set()
+                dropped.append(job)
+            else:
+                kept.append(job)
+        self._queue = kept
+        current = self._current
+        if current is not None and (kind is None or current.kind == kind):
+            current.cancel.set()
+        return dropped
+
+    def _notify_dropped(self, jobs):
+        for job in jobs:
+            if job.on_cancel:
+                self.dispatch(job.on_cancel)
+
+    def shutdown(self):
+        """停止工作线程；此时 UI 通常已关闭，被丢弃的任务不再回调。"""
+        with self._cond:
+            self._closed = True
+            self._cancel_locked(None)
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                job = self._current = self._queue.popleft()
+            try:
+                result = job.func(job.cancel)
+            except Exception as e:
+                logging.error(f"Job {job.kind} failed: {e}")
+                if job.on_error:
+                    self.dispatch(job.on_error, e)
+            else:
+                if job.on_done:
+                    self.dispatch(job.on_done, result)
+            finally:
+                with self._cond:
+                    self._current = None
@@ -1,124 +1,60 @@
+import atexit
+import contextlib
 import ctypes
 import struct
-import win32gui
-import win32con
-import win32api
-import win32process
-import winreg
+import sys
+import threading
 import json
 import os
 import time
 
-try:
-    ctypes.windll.shcore.SetProcessDpiAwareness(2)
-except Exception:
-    try:
-        ctypes.windll.user32.SetProcessDPIAware()
-    except Exception:
-        pass
-
-
-class _Logger:
-    """最小日志器，仅保留最后一条错误供 UI 展示。"""
-    def __init__(self):
-        self.last_error = None
-    def debug(self, msg): pass
-    def info(self, msg): pass
-    def warning(self, msg): pass
-    def error(self, msg):
-        self.last_error = msg
-    def critical(self, msg):
-        self.last_error = msg
-
-
-logging = _Logger()
-
-LVM_FIRST            = 0x1000
-LVM_GETITEMCOUNT     = LVM_FIRST + 4
-LVM_GETITEMTEXTW     = LVM_FIRST + 115
-LVM_GETITEMPOSITION  = LVM_FIRST + 16
-LVM_SETITEMPOSITION32 = LVM_FIRST + 49
-LVM_GETITEMSPACING   = LVM_FIRST + 53
-LVS_AUTOARRANGE      = 0x0100
-GWL_STYLE            = -16
-
-PROCESS_ALL_ACCESS = 0x1F0FFF
-MEM_COMMIT    = 0x1000
-MEM_RESERVE   = 0x2000
-MEM_RELEASE   = 0x8000
-PAGE_READWRITE = 0x04
+import display_topology
+import metrics
+from desktop_backend import (
+    LVM_GETITEMSPACING, LVM_SETITEMPOSITION32, LVS_AUTOARRANGE, Win32Backend, logging,
+)
+from icon_table import IconTable, to_plain
+from listview_engine import MoveEngine, SnapshotEngine
+from monitor_index import MonitorIndex
+from restore_plan import (
+    POSITION_TOLERANCE, RestorePlan, compile_restore_plan, match_saved, unmatched_positions,
+)
 
 
 class DesktopManager:
-    def __init__(self):
-        self.hwnd = self._get_desktop_listview()
-        if not self.hwnd:
-            raise Exception("Could not find Desktop ListView handle")
+    def __init__(self, backend=None):
+        """backend 默认连接真实桌面（Win32Backend），也可传入 desktop_sim 的模拟实现。"""
+        if backend is None:
+            backend = Win32Backend.open()
 
-        pid = win32process.GetWindowThreadProcessId(self.hwnd)[1]
-        self.process = ctypes.windll.kernel32.OpenProcess(PROCESS_ALL_ACCESS, False, pid)
-        if not self.process:
-            raise Exception("Could not open Desktop process")
+        self.backend = backend
+        self.hwnd = backend.hwnd
+        self.snapshot_engine = SnapshotEngine(backend)
+        self.move_engine = MoveEngine(backend)
 
-        self.move_buffer = ctypes.windll.kernel32.VirtualAllocEx(
-            self.process, 0, 8, MEM_COMMIT | MEM_RESERVE, PAGE_READWRITE)
+        self.move_buffer = backend.alloc(8)
         if not self.move_buffer:
-            logging.error(f"Failed to allocate move_buffer. Error: {ctypes.GetLastError()}")
-
-    def _get_desktop_listview(self):
-        hwnd_progman = win32gui.FindWindow("Progman", "Program Manager")
-        hwnd_shell = win32gui.FindWindowEx(hwnd_progman, 0, "SHELLDLL_DefView", None)
-        hwnd_listview = win32gui.FindWindowEx(hwnd_shell, 0, "SysListView32", None)
-
-        if not hwnd_listview:
-            def _enum(hwnd, results):
-                if win32gui.GetClassName(hwnd) == "WorkerW":
-                    shell = win32gui.FindWindowEx(hwnd, 0, "SHELLDLL_DefView", None)
-                    if shell:
-                        lv = win32gui.FindWindowEx(shell, 0, "SysListView32", None)
-                        if lv:
-                            results.append(lv)
-                return True
-            results = []
-            win32gui.EnumWindows(_enum, results)
-            if results:
-                hwnd_listview = results[0]
-
-        return hwnd_listview
+            if isinstance(backend, Win32Backend):
+                # kernel32 以 use_last_error=True 加载，错误码需从 ctypes 的副本读取
+                logging.error(f"Failed to allocate move_buffer. Error: {ctypes.get_last_error()}")
+            else:
+                logging.error("Failed to allocate move_buffer.")
+
+    def is_alive(self):
+        return self.backend.is_alive()
 
     def _read_memory(self, address, size):
-        buffer = ctypes.create_string_buffer(size)
-        bytes_read = ctypes.c_size_t()
-        ctypes.windll.kernel32.ReadProcessMemory(
-            self.process, ctypes.c_void_p(address), buffer, size, ctypes.byref(bytes_read))
-        return buffer.raw
+        return self.backend.read(address, size)
 
     def _write_memory(self, address, data):
-        bytes_written = ctypes.c_size_t()
-        ctypes.windll.kernel32.WriteProcessMemory(
-            self.process, ctypes.c_void_p(address), data, len(data), ctypes.byref(bytes_written))
+        self.backend.write(address, data)
 
     def get_icon_spacing(self):
-        spacing = win32gui.SendMessage(self.hwnd, LVM_GETITEMSPACING, 0, 0)
+        spacing = self.backend.send_message(LVM_GETITEMSPACING, 0, 0)
         return spacing & 0xFFFF, (spacing >> 16) & 0xFFFF
 
     def get_monitors(self):
-        monitors = []
-        try:
-            for i, handle in enumerate(win32api.EnumDisplayMonitors()):
-                h_monitor, h_dc, (left, top, right, bottom) = handle
-                info = win32api.GetMonitorInfo(h_monitor)
-                monitors.append({
-                    "index": i,
-                    "handle": int(h_monitor),
-                    "rect": info['Monitor'],
-                    "work": info['Work'],
-                    "device": info['Device'],
-                    "is_primary": (info['Flags'] & win32con.MONITORINFOF_PRIMARY) != 0
-                })
-        except Exception as e:
-            logging.error(f"EnumDisplayMonitors failed: {e}")
-        return monitors
+        return display_topology.get_monitors()
 
     def move_icon(self, index, x, y):
         if not self.move_buffer:
@@ -126,30 +62,31 @@ class DesktopManager:
             return False
         try:
             self._write_memory(self.move_buffer, struct.pack('ii', x, y))
-            win32gui.SendMessage(self.hwnd, LVM_SETITEMPOSITION32, index, self.move_buffer)
+            self.backend.send_message(LVM_SETITEMPOSITION32, index, self.move_buffer)
             return True
         except Exception as e:
             logging.error(f"Failed to move icon {index}: {e}")
             return False
 
-    def get_icons(self):
-        count = win32gui.SendMessage(self.hwnd, LVM_GETITEMCOUNT, 0, 0)
-
-        lvitem_size = 128
-        text_buffer_size = 1024
-
-        remote_mem = ctypes.windll.kernel32.VirtualAllocEx(
-            self.process, 0, lvitem_size + text_buffer_size, MEM_COMMIT | MEM_RESERVE, PAGE_READWRITE)
-        remote_point = ctypes.windll.kernel32.VirtualAllocEx(
-            self.process, 0, 8, MEM_COMMIT | MEM_RESERVE, PAGE_READWRITE)
+    def move_icons(self, moves, progress_callback=None, cancel=None):
+        """批量移动，moves 为 [(index, x, y), ...]，返回成功数量。"""
+        try:
+            return self.move_engine.move_batch(moves, progress_callback, cancel=cancel)
+        except Exception as e:
+            logging.error(f"Batch move failed: {e}")
+            return 0
 
-        if not remote_mem or not remote_point:
-            logging.error(f"Failed to allocate memory. Error: {ctypes.GetLastError()}")
-            return [], (100, 100)
+    def get_icons(self):
+        try:
+            with metrics.span("snapshot"):
+                items = self.snapshot_engine.snapshot()
+        except Exception as e:
+            logging.error(f"Snapshot failed: {e}")
+            return IconTable(), (100, 100)
 
         spacing_x, spacing_y = self.get_icon_spacing()
         monitors = self.get_monitors()
-        monitor_handle_map = {int(m['handle']): m for m in monitors}
+        monitor_index = MonitorIndex(monitors)
 
         # LVM_GETITEMPOSITION 返回虚拟桌面坐标（原点=虚拟桌面左上角）
         # GetMonitorInfo 返回屏幕坐标（主显示器左上角为原点）
@@ -157,245 +94,191 @@ class DesktopManager:
         virtual_left = min(m['rect'][0] for m in monitors) if monitors else 0
         virtual_top  = min(m['rect'][1] for m in monitors) if monitors else 0
 
-        icons = []
-        try:
-            for i in range(count):
-                lvitem_buffer = ctypes.create_string_buffer(lvitem_size)
-                struct.pack_into("I", lvitem_buffer, 0, 0x0001)
-                struct.pack_into("i", lvitem_buffer, 4, i)
-                struct.pack_into("i", lvitem_buffer, 8, 0)
-                text_ptr_addr = remote_mem + lvitem_size
-                struct.pack_into("Q", lvitem_buffer, 24, text_ptr_addr)
-                struct.pack_into("i", lvitem_buffer, 32, 512)
-
-                self._write_memory(remote_mem, lvitem_buffer.raw)
-                win32gui.SendMessage(self.hwnd, LVM_GETITEMTEXTW, i, remote_mem)
-
-                text_raw = self._read_memory(text_ptr_addr, 1024)
-                name = text_raw.decode('utf-16').split('\x00')[0]
-
-                win32gui.SendMessage(self.hwnd, LVM_GETITEMPOSITION, i, remote_point)
-                lvm_x, lvm_y = struct.unpack('ii', self._read_memory(remote_point, 8))
-                screen_x = lvm_x + virtual_left
-                screen_y = lvm_y + virtual_top
-
-                monitor_device = ""
-                try:
-                    h_mon = win32api.MonitorFromPoint(
-                        (screen_x, screen_y), win32con.MONITOR_DEFAULTTONEAREST)
-                    h_mon_int = int(h_mon)
-                    if h_mon_int in monitor_handle_map:
-                        m = monitor_handle_map[h_mon_int]
-                        monitor_idx  = m['index']
-                        monitor_left = m['rect'][0]
-                        monitor_top  = m['rect'][1]
-                        monitor_device = m.get('device', '')
-                    else:
-                        monitor_idx  = 0
-                        monitor_left = monitors[0]['rect'][0]
-                        monitor_top  = monitors[0]['rect'][1]
-                        monitor_device = monitors[0].get('device', '')
-                except Exception as e:
-                    logging.warning(f"MonitorFromPoint failed for {name}: {e}")
-                    monitor_idx  = 0
-                    monitor_left = virtual_left
-                    monitor_top  = virtual_top
-
-                icons.append({
-                    "name": name,
-                    "x": screen_x,
-                    "y": screen_y,
-                    "monitor": monitor_idx,
-                    "monitor_device": monitor_device,
-                    "col": round((screen_x - monitor_left) / spacing_x) if spacing_x else 0,
-                    "row": round((screen_y - monitor_top)  / spacing_y) if spacing_y else 0,
-                })
-        except Exception as e:
-            logging.error(f"Error in get_icons loop: {e}")
-        finally:
-            if remote_mem:
-                ctypes.windll.kernel32.VirtualFreeEx(self.process, remote_mem, 0, MEM_RELEASE)
-            if remote_point:
-                ctypes.windll.kernel32.VirtualFreeEx(self.process, remote_point, 0, MEM_RELEASE)
+        icons = IconTable.from_points([name for name, _, _ in items],
+                                      [lvm_x + virtual_left for _, lvm_x, _ in items],
+                                      [lvm_y + virtual_top for _, _, lvm_y in items])
+        icons.assign_monitors(monitor_index, (spacing_x, spacing_y))
 
         return icons, (spacing_x, spacing_y)
 
     def is_point_on_screen(self, x, y, monitors):
-        return any(m['rect'][0] <= x < m['rect'][2] and m['rect'][1] <= y < m['rect'][3]
-                   for m in monitors)
-
-    def restore_icons(self, saved_icons, saved_monitors=None, progress_callback=None):
-        style = win32gui.GetWindowLong(self.hwnd, GWL_STYLE)
+        return MonitorIndex(monitors).contains(x, y)
+
+    def restore_icons(self, saved_icons, saved_monitors=None, progress_callback=None,
+                      tolerance=POSITION_TOLERANCE, cancel=None, progress=None,
+                      layout=None, plans=None):
+        """恢复图标位置，只移动偏离目标超过 tolerance 像素的图标，返回 RestorePlan。
+
+        cancel（threading.Event）置位后停止剩余的移动，plan.cancelled 为 True。
+        progress 为 ProgressChannel，依次收到 snapshot / plan / move 阶段的进度，
+        结束时（包括出错）总会收到一次 finish。
+        给出 layout（布局头信息）与 plans（PlanCache）时，目标坐标按布局、拓扑与
+        间距缓存，重复恢复同一布局时不再重新计算。
+        """
+        plan = None
+        try:
+            with metrics.span("restore"):
+                plan = self._restore_icons(saved_icons, saved_monitors, progress_callback,
+                                           tolerance, cancel, progress, layout, plans)
+            if metrics.enabled:
+                metrics.count("icons_moved", plan.moved)
+                metrics.count("icons_skipped", plan.skipped)
+                metrics.count("icons_missing", plan.missing)
+            return plan
+        finally:
+            if progress is not None:
+                if plan is None:
+                    progress.finish("failed")
+                else:
+                    progress.finish("cancelled" if plan.cancelled else "done",
+                                    plan.moved, plan.skipped, plan.planned)
+
+    def _compiled_plan(self, saved_icons, saved_monitors, monitors, spacing, layout, plans,
+                       current_icons):
+        """返回 (CompiledPlan, matched)；matched 为预先求得的名称对应，没有时为 None。"""
+        # 按 (monitor, row, col) 顺序移动；排序结果是视图，不修改传入的数据
+        saved_icons = IconTable.coerce(saved_icons).grid_order()
+        occupied = matched = None
+        if saved_monitors is not None:
+            with metrics.span("match"):
+                matched = match_saved(saved_icons, current_icons)
+            occupied = unmatched_positions(current_icons, matched[0])
+        key = plans.key(layout, monitors, spacing, occupied) if plans is not None else None
+        compiled = plans.get(key) if key is not None else None
+        if compiled is not None:
+            if metrics.enabled:
+                metrics.count("plan_cache_hit")
+            return compiled, matched
+        with metrics.span("compile"):
+            compiled = compile_restore_plan(saved_icons, monitors, spacing,
+                                            saved_monitors, logging, occupied)
+        if key is not None:
+            plans.put(key, compiled)
+            if metrics.enabled:
+                metrics.count("plan_cache_miss")
+        return compiled, matched
+
+    def _restore_icons(self, saved_icons, saved_monitors, progress_callback, tolerance,
+                       cancel, progress, layout, plans):
+        style = self.backend.get_style()
         if style & LVS_AUTOARRANGE:
-            win32gui.SetWindowLong(self.hwnd, GWL_STYLE, style & ~LVS_AUTOARRANGE)
+            self.backend.set_style(style & ~LVS_AUTOARRANGE)
 
+        if progress is not None:
+            progress.report("snapshot")
         current_icons, current_spacing = self.get_icons()
         if not current_icons:
             logging.error("No icons found on desktop! Aborting.")
-            return 0
-
-        current_map = {icon['name']: i for i, icon in enumerate(current_icons)}
-        common_names = set(ic['name'] for ic in saved_icons) & set(current_map.keys())
-        if not common_names:
+            return RestorePlan()
+
+        if progress is not None:
+            progress.report("plan")
+        compiled, matched = self._compiled_plan(saved_icons, saved_monitors, self.get_monitors(),
+                                                current_spacing, layout, plans, current_icons)
+        with metrics.span("plan"):
+            plan = compiled.resolve(current_icons, tolerance, matched=matched)
+        if not plan.moves and not plan.skipped_names:
             logging.critical("NO MATCHING ICONS FOUND! Aborting restore.")
-            return 0
-
-        monitors = self.get_monitors()
-        current_spacing_x, current_spacing_y = current_spacing
-        current_device_map = {m['device']: m for m in monitors}
-        current_primary = next((m for m in monitors if m['is_primary']), monitors[0])
-
-        # LVM 坐标转换偏移
-        virtual_left = min(m['rect'][0] for m in monitors) if monitors else 0
-        virtual_top  = min(m['rect'][1] for m in monitors) if monitors else 0
-
-        monitor_mapping = {}
-        if saved_monitors:
-            for sm in saved_monitors:
-                s_device = sm.get('device')
-                if s_device and s_device in current_device_map:
-                    target = current_device_map[s_device]
-                elif sm.get('is_primary'):
-                    target = current_primary
-                elif sm['index'] < len(monitors):
-                    target = monitors[sm['index']]
-                else:
-                    target = current_primary
-                monitor_mapping[sm['index']] = target
-
-        try:
-            saved_icons.sort(key=lambda x: (x.get('monitor', 0), x.get('row', 0), x.get('col', 0)))
-        except Exception:
-            pass
-
-        restored_count = 0
-        for saved in saved_icons:
-            name = saved['name']
-            if name not in current_map:
-                continue
-
-            idx = current_map[name]
-
-            if saved_monitors is None:
-                target_x = saved['x']
-                target_y = saved['y']
-            else:
-                target_monitor = monitor_mapping.get(saved.get('monitor', 0), current_primary)
-                col = saved['col']
-                row = saved['row']
-
-                target_x = target_monitor['rect'][0] + int(col * current_spacing_x)
-                target_y = target_monitor['rect'][1] + int(row * current_spacing_y)
-
-                if not self.is_point_on_screen(target_x, target_y, monitors):
-                    logging.warning(f"{name} off-screen, forcing to primary.")
-                    target_x = current_primary['rect'][0] + int(col * current_spacing_x)
-                    target_y = current_primary['rect'][1] + int(row * current_spacing_y)
-
-                # 屏幕坐标 → LVM 虚拟桌面坐标
-                target_x -= virtual_left
-                target_y -= virtual_top
-
-            if self.move_icon(idx, target_x, target_y):
-                restored_count += 1
-            else:
-                logging.error(f"Failed to move {name}")
-
-            if progress_callback:
-                try:
-                    progress_callback(restored_count, len(saved_icons))
-                except Exception:
-                    pass
-
-        win32gui.InvalidateRect(self.hwnd, None, True)
-        win32gui.UpdateWindow(self.hwnd)
-        return restored_count
+            return plan
+        if plan.renamed_names:
+            logging.warning(f"{plan.renamed} icons matched by similar names.")
+            if metrics.enabled:
+                metrics.count("icons_renamed", plan.renamed)
+        if progress is not None:
+            progress.report("move", 0, plan.skipped, plan.planned)
+        if cancel is not None and cancel.is_set():
+            plan.cancelled = True
+            return plan
+        if plan.moves:
+            on_move = progress_callback
+            if progress is not None:
+                def on_move(moved, total):
+                    progress.report("move", moved, plan.skipped, total)
+                    if progress_callback:
+                        progress_callback(moved, total)
+            plan.moved = self.move_icons(plan.moves, on_move, cancel)
+            plan.cancelled = cancel is not None and cancel.is_set()
+        return plan
 
     def close(self):
+        self.snapshot_engine.close()
+        self.move_engine.close()
         if self.move_buffer:
-            ctypes.windll.kernel32.VirtualFreeEx(self.process, self.move_buffer, 0, MEM_RELEASE)
+            self.backend.free(self.move_buffer)
             self.move_buffer = None
-        if self.process:
-            ctypes.windll.kernel32.CloseHandle(self.process)
-            self.process = None
+        self.backend.close()
+
+
+class DesktopSession:
+    """进程内长期复用的 DesktopManager。
+
+    查找 ListView、OpenProcess 与远程缓冲区分配只在第一次使用时进行；之后每次
+    使用前只做 IsWindow/PID 检查，Explorer 重启导致句柄失效时自动重建。
+    操作中抛出异常时丢弃当前实例，下次使用时重建。
+    """
+
+    def __init__(self, factory=DesktopManager):
+        self._factory = factory
+        self._manager = None
+        self._lock = threading.RLock()
+        self.builds = 0
+
+    @contextlib.contextmanager
+    def manager(self):
+        with self._lock:
+            if self._manager is not None and not self._manager.is_alive():
+                logging.warning("Desktop ListView is gone, rebuilding session")
+                self._discard()
+            if self._manager is None:
+                self._manager = self._factory()
+                self.builds += 1
+            try:
+                yield self._manager
+            except Exception:
+                self._discard()
+                raise
 
+    def _discard(self):
+        manager, self._manager = self._manager, None
+        if manager is not None:
+            try:
+                manager.close()
+            except Exception as e:
+                logging.warning(f"Closing desktop session failed: {e}")
 
+    def close(self):
+        with self._lock:
+            self._discard()
+
+
+_session = DesktopSession()
+atexit.register(_session.close)
 
-def _get_monitor_registry_name(device_key):
-    try:
-        prefix = "\\Registry\\Machine\\"
-        key_path = device_key[len(prefix):] if device_key.startswith(prefix) else device_key
-        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path) as key:
-            try:
-                desc, _ = winreg.QueryValueEx(key, "DriverDesc")
-                return desc
-            except Exception:
-                pass
-    except Exception:
-        pass
-    return None
+
+def get_session():
+    return _session
 
 
 def get_monitors_info():
-    """返回所有显示器的详细信息列表。"""
-    monitors = []
-    try:
-        for i, (handle, _, rect) in enumerate(win32api.EnumDisplayMonitors()):
-            info = win32api.GetMonitorInfo(handle)
-            device_name = info['Device']
-            is_primary = bool(info['Flags'] & win32con.MONITORINFOF_PRIMARY)
+    """返回所有显示器的详细信息列表（拓扑未变化时直接使用缓存）。"""
+    return display_topology.get_monitors_info()
 
-            try:
-                settings = win32api.EnumDisplaySettings(device_name, win32con.ENUM_CURRENT_SETTINGS)
-                refresh_rate = settings.DisplayFrequency
-            except Exception:
-                refresh_rate = 60
 
-            name = "Unknown Monitor"
-            device_id = ""
-            try:
-                monitor_dev = win32api.EnumDisplayDevices(device_name, 0)
-                device_id = monitor_dev.DeviceID
-                reg_name = _get_monitor_registry_name(monitor_dev.DeviceKey)
-                name = reg_name if reg_name else monitor_dev.DeviceString
-                if "Generic" in name and device_id.startswith("MONITOR\\"):
-                    parts = device_id.split("\\")
-                    if len(parts) > 1:
-                        name += f" ({parts[1]})"
-            except Exception:
-                pass
-
-            monitors.append({
-                "index": i,
-                "device": device_name,
-                "rect": rect,
-                "work_area": info['Work'],
-                "resolution": (rect[2] - rect[0], rect[3] - rect[1]),
-                "position": (rect[0], rect[1]),
-                "refresh_rate": refresh_rate,
-                "is_primary": is_primary,
-                "name": name,
-                "device_id": device_id,
-            })
-    except Exception as e:
-        logging.error(f"Error enumerating monitors: {e}")
-    return monitors
+def get_current_layout_data(session=None):
+    """获取当前桌面布局数据（session 默认为进程级会话），可直接 json.dump。"""
+    return to_plain(get_current_layout_table(session))
 
 
-def get_current_layout_data():
-    """获取当前桌面布局数据。"""
-    dm = DesktopManager()
-    try:
+def get_current_layout_table(session=None):
+    """同 get_current_layout_data，但 icons 为按网格顺序排列的 IconTable 视图，
+    供保存到布局库、预览与基准测试使用，避免逐个图标生成 dict。"""
+    with (session or _session).manager() as dm:
         icons, spacing = dm.get_icons()
         monitors = get_monitors_info()
 
         device_to_vis_idx = {m['device']: m['index'] for m in monitors}
-        for icon in icons:
-            device = icon.get('monitor_device', '')
-            if device and device in device_to_vis_idx:
-                icon['monitor'] = device_to_vis_idx[device]
-
-        icons.sort(key=lambda x: (x['monitor'], x['row'], x['col']))
+        icons.remap_monitors(device_to_vis_idx)
+        icons = icons.grid_order()
 
         return {
             "version": "3.6",
@@ -404,17 +287,18 @@ def get_current_layout_data():
             "spacing": spacing,
             "icons": icons,
         }
-    finally:
-        dm.close()
 
 
-def restore_from_data(data, progress_callback=None):
-    """从数据对象恢复布局。"""
-    dm = DesktopManager()
-    try:
-        return dm.restore_icons(data['icons'], data.get('monitors'), progress_callback)
-    finally:
-        dm.close()
+def restore_from_data(data, progress_callback=None, cancel=None, progress=None, session=None,
+                      layout=None, plans=None):
+    """从数据对象恢复布局，返回 RestorePlan。
+
+    layout 与 plans 见 DesktopManager.restore_icons，通常为布局头信息与
+    LayoutManager.plans。
+    """
+    with (session or _session).manager() as dm:
+        return dm.restore_icons(data['icons'], data.get('monitors'), progress_callback,
+                                cancel=cancel, progress=progress, layout=layout, plans=plans)
 
 
 def save_layout(filename="desktop_layout.json"):
@@ -429,4 +313,171 @@ def restore_layout(filename="desktop_layout.json", progress_callback=None):
         return 0
     with open(filename, 'r', encoding='utf-8') as f:
         data = json.load(f)
-    return restore_from_data(data, progress_callback)
+    return restore_from_data(data, progress_callback).restored
+
+
+# ---- 命令行入口：python -m desktop_manager ----
+# 不导入 Tk，供登录脚本等无界面场景使用；结果以 JSON 输出到 stdout。
+
+EXIT_OK        = 0
+EXIT_ERROR     = 1
+EXIT_USAGE     = 2   # argparse 参数错误
+EXIT_NOT_FOUND = 3   # 找不到指定布局 / 没有匹配当前拓扑的布局
+EXIT_PARTIAL   = 4   # 恢复完成但有图标缺失，或被取消
+
+
+class _PhaseTimer:
+    """记录恢复各阶段的起始时间，接口与 ProgressChannel 的 report/finish 相同。"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._marks = []
+
+    def report(self, phase, moved=0, skipped=0, total=0, final=False):
+        if not self._marks or self._marks[-1][0] != phase:
+            self._marks.append((phase, time.perf_counter()))
+
+    def finish(self, phase="done", moved=0, skipped=0, total=0):
+        self.report(phase)
+
+    def durations(self):
+        result = {}
+        for (phase, start), (_, end) in zip(self._marks, self._marks[1:]):
+            result[phase] = round((end - start) * 1000, 2)
+        return result
+
+
+def _find_layout(manager, target):
+    index = manager.find_layout(target)
+    return index, (manager.layouts[index] if index is not None else None)
+
+
+def _cli_list(manager, args, timing, session):
+    try:
+        fingerprint = display_topology.current_fingerprint()
+    except Exception:
+        fingerprint = None
+    return EXIT_OK, {
+        "fingerprint": fingerprint,
+        "layouts": [dict(_header(layout), matches=bool(fingerprint) and
+                         layout.get("fingerprint") == fingerprint)
+                    for layout in manager.layouts],
+    }
+
+
+def _cli_save(manager, args, timing, session):
+    start = time.perf_counter()
+    data = get_current_layout_table(session)
+    timing["snapshot"] = round((time.perf_counter() - start) * 1000, 2)
+
+    index, layout = _find_layout(manager, args.name)
+    if layout is None:
+        layout = manager.add_layout()
+        index = len(manager.layouts) - 1
+        manager.update_layout(index, name=args.name)
+    start = time.perf_counter()
+    manager.update_layout(index, data=data)
+    timing["write"] = round((time.perf_counter() - start) * 1000, 2)
+    return EXIT_OK, {"layout": _header(layout)}
+
+
+def _cli_restore(manager, args, timing, session):
+    if args.best:
+        layout = manager.best_layout()
+        if layout is None:
+            return EXIT_NOT_FOUND, {"error": "没有与当前显示器拓扑匹配的布局"}
+    else:
+        _, layout = _find_layout(manager, args.target)
+        if layout is None or not layout.get("saved"):
+            return EXIT_NOT_FOUND, {"error": f"找不到已保存的布局: {args.target}"}
+
+    start = time.perf_counter()
+    data = manager.get_data(layout)
+    timing["load"] = round((time.perf_counter() - start) * 1000, 2)
+    if not data:
+        return EXIT_ERROR, {"error": "布局数据读取失败", "layout": _header(layout)}
+
+    phases = _PhaseTimer()
+    plan = restore_from_data(data, progress=phases, session=session,
+                             layout=layout, plans=manager.plans)
+    timing.update(phases.durations())
+    result = {
+        "layout": _header(layout),
+        "plan": plan.as_dict(),
+        "missing_names": plan.missing_names,
+        "renamed_names": plan.renamed_names,
+    }
+    code = EXIT_PARTIAL if plan.missing or plan.cancelled else EXIT_OK
+    return code, result
+
+
+def _header(layout):
+    from layout_store import HEADER_KEYS
+    return {key: layout.get(key) for key in HEADER_KEYS}
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m desktop_manager",
+        description="无界面保存 / 恢复桌面图标布局，结果以 JSON 输出",
+        epilog="退出码：0 成功，1 出错，2 参数错误，3 找不到布局，4 恢复后仍有缺失或被取消")
+    parser.add_argument("--store", default="desktop_layouts.json",
+                        help="布局库文件（与界面使用的相同，默认 desktop_layouts.json）")
+    parser.add_argument("--timing", action="store_true",
+                        help="输出各阶段耗时（毫秒）及消息、内存访问计数")
+    parser.add_argument("--trace", metavar="FILE", help="把各区段耗时追加写入 JSONL 跟踪文件")
+    parser.add_argument("--record", metavar="FILE",
+                        help="录制本次操作的消息与内存访问，供 desktop_trace.py 离线回放")
+    parser.add_argument("--indent", type=int, default=None, help="JSON 缩进")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="列出所有布局")
+    p_save = sub.add_parser("save", help="把当前桌面保存到指定名称（或 id）的布局，不存在则新建")
+    p_save.add_argument("name")
+    p_restore = sub.add_parser("restore", help="恢复指定名称或 id 的布局")
+    target = p_restore.add_mutually_exclusive_group(required=True)
+    target.add_argument("target", nargs="?", help="布局名称或 id")
+    target.add_argument("--best", action="store_true", help="恢复与当前显示器拓扑匹配的最近布局")
+    args = parser.parse_args(argv)
+
+    commands = {"list": _cli_list, "save": _cli_save, "restore": _cli_restore}
+    if args.timing or args.trace:
+        metrics.enable(args.trace)
+    timing = {}
+    started = time.perf_counter()
+    recorder = session = None
+    try:
+        # LayoutManager 会向 stdout 打印提示，重定向到 stderr 以免破坏 JSON 输出
+        with contextlib.redirect_stdout(sys.stderr):
+            from layout_store import LayoutManager
+            if args.record:
+                from desktop_trace import TraceRecorder
+                recorder = TraceRecorder()
+                session = DesktopSession(recorder.manager)
+            start = time.perf_counter()
+            manager = LayoutManager(args.store)
+            timing["store"] = round((time.perf_counter() - start) * 1000, 2)
+            code, result = commands[args.command](manager, args, timing, session)
+    except Exception as e:
+        code, result = EXIT_ERROR, {"error": str(e)}
+        if logging.last_error:
+            result["detail"] = logging.last_error
+    if recorder is not None:
+        session.close()
+        try:
+            recorder.save(args.record)
+            result["trace"] = args.record
+        except OSError as e:
+            result["trace_error"] = str(e)
+    if args.timing:
+        timing["total"] = round((time.perf_counter() - started) * 1000, 2)
+        result["timing_ms"] = timing
+        result["metrics"] = metrics.snapshot()
+    metrics.disable()
+    print(json.dumps(result, indent=args.indent, ensure_ascii=False))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
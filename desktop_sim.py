@@ -0,0 +1,295 @@
+"""内存中模拟的桌面 SysListView32 与显示器，用于在非 Windows 环境下运行和测量。
+
+latency 可为每类调用注入固定延迟，近似跨进程消息与 ReadProcessMemory 的开销；
+desktop_items() / monitor_row() 生成任意规模的桌面，供 desktop_bench 使用。
+"""
+import bisect
+import struct
+import time
+from collections import deque
+
+import metrics
+
+from desktop_backend import (
+    DesktopBackend, LVM_GETITEMCOUNT, LVM_GETITEMPOSITION, LVM_GETITEMSPACING,
+    LVM_GETITEMTEXTW, LVM_SETITEMPOSITION32, WM_NULL, WM_SETREDRAW,
+)
+
+
+def busy_wait(seconds):
+    """忙等 seconds 秒；time.sleep 的精度不足以模拟几十微秒的延迟。"""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class SimulatedListView(DesktopBackend):
+    """模拟 Explorer 进程的地址空间与 ListView 消息处理。
+
+    items 为 [(name, x, y), ...]，坐标为 LVM 虚拟桌面坐标。
+    stats 记录消息与内存访问次数，便于对比不同实现的调用开销；
+    message_log 按处理顺序记录 (方式, msg, wparam)。send_notify 的消息进入队列，
+    与真实的 sent-message 队列一样在下一次同步发送前按顺序处理。
+    latency 为 {调用类型: 秒}，类型见 LATENCY_KINDS，每次调用前忙等对应时长。
+    """
+
+    LATENCY_KINDS = ("send_message", "notify", "read", "write", "alloc")
+
+    def __init__(self, items=(), spacing=(75, 100), latency=None, log_messages=True):
+        self.hwnd = 0x10010
+        self.items = [[name, x, y] for name, x, y in items]
+        self.spacing = spacing
+        self.latency = {kind: seconds for kind, seconds in (latency or {}).items() if seconds}
+        self.log_messages = log_messages
+        self._blocks = {}
+        self._bases = []
+        self._next_address = 0x7FF000000000
+        self._pending = deque()
+        self.redraw = True
+        self.alive = True      # 置为 False 模拟 Explorer 重启
+        self.style = 0
+        self.message_log = []
+        self.stats = {
+            "send_message": 0,
+            "read": 0,
+            "read_bytes": 0,
+            "write": 0,
+            "write_bytes": 0,
+            "alloc": 0,
+            "notify": 0,
+            "repaint": 0,
+        }
+
+    # ---- 远程内存 ----
+
+    def _wait(self, kind):
+        busy_wait(self.latency.get(kind, 0))
+
+    def alloc(self, size):
+        if self.latency:
+            self._wait("alloc")
+        address = self._next_address
+        self._next_address += (size + 0xFFFF) & ~0xFFFF
+        self._blocks[address] = bytearray(size)
+        bisect.insort(self._bases, address)
+        self.stats["alloc"] += 1
+        if metrics.enabled:
+            metrics.count("alloc")
+        return address
+
+    def free(self, address):
+        if address in self._blocks:
+            del self._blocks[address]
+            self._bases.remove(address)
+
+    def _locate(self, address, size):
+        pos = bisect.bisect_right(self._bases, address) - 1
+        if pos < 0:
+            raise OSError(f"Access violation at {address:#x}")
+        base = self._bases[pos]
+        block = self._blocks[base]
+        offset = address - base
+        if offset + size > len(block):
+            raise OSError(f"Access violation at {address:#x} (+{size})")
+        return block, offset
+
+    def read(self, address, size):
+        block, offset = self._locate(address, size)
+        if self.latency:
+            self._wait("read")
+        self.stats["read"] += 1
+        self.stats["read_bytes"] += size
+        if metrics.enabled:
+            metrics.count("rpm_calls")
+            metrics.count("rpm_bytes", size)
+        return bytes(block[offset:offset + size])
+
+    def write(self, address, data):
+        block, offset = self._locate(address, len(data))
+        if self.latency:
+            self._wait("write")
+        self.stats["write"] += 1
+        self.stats["write_bytes"] += len(data)
+        if metrics.enabled:
+            metrics.count("wpm_calls")
+            metrics.count("wpm_bytes", len(data))
+        block[offset:offset + len(data)] = data
+
+    # ---- ListView 消息 ----
+
+    def send_message(self, msg, wparam=0, lparam=0):
+        if self.latency:
+            self._wait("send_message")
+        self.stats["send_message"] += 1
+        if metrics.enabled:
+            metrics.count("send_message")
+        self._drain()
+        return self._dispatch("send", msg, wparam, lparam)
+
+    def send_notify(self, msg, wparam=0, lparam=0):
+        if self.latency:
+            self._wait("notify")
+        self.stats["notify"] += 1
+        if metrics.enabled:
+            metrics.count("send_notify")
+        self._pending.append((msg, wparam, lparam))
+        return True
+
+    def send_message_timeout(self, msg, wparam=0, lparam=0, timeout_ms=5000):
+        if self.latency:
+            self._wait("send_message")
+        self.stats["send_message"] += 1
+        if metrics.enabled:
+            metrics.count("send_message")
+        self._drain()
+        return True, self._dispatch("timeout", msg, wparam, lparam)
+
+    def invalidate(self):
+        self._drain()
+        if self.log_messages:
+            self.message_log.append(("invalidate", 0, 0))
+        self.stats["repaint"] += 1
+
+    def get_style(self):
+        return self.style
+
+    def set_style(self, style):
+        self.style = style
+
+    def is_alive(self):
+        return self.alive
+
+    def _drain(self):
+        while self._pending:
+            msg, wparam, lparam = self._pending.popleft()
+            self._dispatch("notify", msg, wparam, lparam)
+
+    def _dispatch(self, kind, msg, wparam, lparam):
+        if self.log_messages:
+            self.message_log.append((kind, msg, wparam))
+        if msg == WM_NULL:
+            return 0
+        if msg == WM_SETREDRAW:
+            self.redraw = bool(wparam)
+            return 0
+        if msg == LVM_GETITEMCOUNT:
+            return len(self.items)
+        if msg == LVM_GETITEMSPACING:
+            return (self.spacing[0] & 0xFFFF) | ((self.spacing[1] & 0xFFFF) << 16)
+        if msg == LVM_GETITEMTEXTW:
+            return self._get_item_text(wparam, lparam)
+        if msg == LVM_GETITEMPOSITION:
+            if not 0 <= wparam < len(self.items):
+                return 0
+            _, x, y = self.items[wparam]
+            block, offset = self._locate(lparam, 8)
+            struct.pack_into("<ii", block, offset, x, y)
+            return 1
+        if msg == LVM_SETITEMPOSITION32:
+            if not 0 <= wparam < len(self.items):
+                return 0
+            block, offset = self._locate(lparam, 8)
+            self.items[wparam][1:3] = struct.unpack_from("<ii", block, offset)
+            if self.redraw:
+                # Explorer 在重绘开启时每次移动都会刷新
+                self.stats["repaint"] += 1
+            return 1
+        return 0
+
+    def _get_item_text(self, index, lvitem_address):
+        if not 0 <= index < len(self.items):
+            return 0
+        block, offset = self._locate(lvitem_address, 36)
+        text_address, cch = struct.unpack_from("<Qi", block, offset + 24)
+        if cch <= 0:
+            return 0
+        text = self.items[index][0][:cch - 1]
+        data = text.encode('utf-16-le') + b'\x00\x00'
+        target, target_offset = self._locate(text_address, len(data))
+        target[target_offset:target_offset + len(data)] = data
+        return len(text)
+
+
+TASKBAR_HEIGHT = 40
+
+
+class SimulatedDisplays:
+    """模拟的显示器枚举，可通过 display_topology.use_source() 安装。
+
+    rects 为各显示器的屏幕矩形 (left, top, right, bottom)，第一个为主显示器；
+    每台显示器底部的 taskbar 像素不属于工作区。修改 rects 或 taskbar 后拓扑签名
+    随之变化，缓存会自动重新枚举。
+    """
+
+    def __init__(self, rects=((0, 0, 1920, 1080),), refresh_rate=60, taskbar=TASKBAR_HEIGHT):
+        self.rects = [tuple(r) for r in rects]
+        self.refresh_rate = refresh_rate
+        self.taskbar = taskbar
+
+    def work(self, rect):
+        return (rect[0], rect[1], rect[2], rect[3] - self.taskbar)
+
+    def signature(self):
+        return tuple((0x10000 + i, rect, self.work(rect)) for i, rect in enumerate(self.rects))
+
+    def monitors(self):
+        return [{
+            "index": i,
+            "handle": 0x10000 + i,
+            "rect": rect,
+            "work": self.work(rect),
+            "device": f"\\\\.\\DISPLAY{i + 1}",
+            "is_primary": i == 0,
+        } for i, rect in enumerate(self.rects)]
+
+    def monitors_info(self):
+        return [{
+            "index": i,
+            "device": f"\\\\.\\DISPLAY{i + 1}",
+            "rect": rect,
+            "work_area": self.work(rect),
+            "resolution": (rect[2] - rect[0], rect[3] - rect[1]),
+            "position": (rect[0], rect[1]),
+            "refresh_rate": self.refresh_rate,
+            "is_primary": i == 0,
+            "name": f"Simulated Monitor {i + 1}",
+            "device_id": f"MONITOR\\SIM{i + 1:04d}",
+        } for i, rect in enumerate(self.rects)]
+
+
+MONITOR_SIZES = ((1920, 1080), (2560, 1440), (1920, 1200), (3840, 2160), (1366, 768), (1280, 1024))
+
+
+def monitor_row(count, sizes=MONITOR_SIZES):
+    """count 台显示器从左到右顶端对齐排列的矩形，分辨率轮流取自 sizes。"""
+    rects = []
+    left = 0
+    for i in range(count):
+        width, height = sizes[i % len(sizes)]
+        rects.append((left, 0, left + width, height))
+        left += width
+    return rects
+
+
+def desktop_items(icon_count, rects, spacing=(75, 100), prefix="图标"):
+    """按 Explorer 的默认排列（逐个显示器、按列自上而下）生成 [(name, x, y), ...]。
+
+    坐标为 LVM 虚拟桌面坐标。所有网格都占满后从头再排一层（与已有图标重叠），
+    这样大规模测试中每个图标仍位于网格上，恢复后可以精确回到原位。
+    """
+    spacing_x, spacing_y = spacing
+    virtual_left = min(r[0] for r in rects)
+    virtual_top = min(r[1] for r in rects)
+    cells = []
+    for left, top, right, bottom in rects:
+        columns = max((right - left) // spacing_x, 1)
+        rows = max((bottom - TASKBAR_HEIGHT - top) // spacing_y, 1)
+        for col in range(columns):
+            for row in range(rows):
+                cells.append((left - virtual_left + col * spacing_x,
+                              top - virtual_top + row * spacing_y))
+    items = []
+    for i in range(icon_count):
+        x, y = cells[i % len(cells)]
+        items.append((f"{prefix} {i:05d}", x, y))
+    return items
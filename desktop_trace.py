@@ -0,0 +1,461 @@
+"""桌面会话的录制与回放，用于离线复现与分析用户机器上的慢恢复。
+
+录制：TraceRecorder 包装真实后端，按顺序记下每次窗口消息、远程内存分配与读写
+（读取的内容、写入数据的 CRC）及其耗时，并记录 get_monitors / get_monitors_info
+的结果与枚举耗时、每次 get_icons 得到的桌面状态，以及顶层 get_icons /
+restore_icons 调用的参数。结果写成 gzip 压缩的 JSON 行文件：
+
+    python -m desktop_manager --record slow.dtr restore 办公室
+
+回放（任何平台）：
+
+    python desktop_trace.py info slow.dtr
+    python desktop_trace.py replay slow.dtr               # 严格回放，校验调用序列
+    python desktop_trace.py replay slow.dtr --timing      # 同时按录制的耗时等待
+    python desktop_trace.py replay slow.dtr --sim --profile
+
+严格回放把录制的结果原样返回给 DesktopManager，调用序列与录制时不同就抛出
+TraceMismatch，适合确认行为未变并剖析 Python 侧开销。修改了访问方式的实现无法
+严格回放，此时用 --sim：以录制到的桌面状态与各类调用的中位耗时构造
+SimulatedListView，在相同的图标集与显示器排列上运行同样的调用；每个调用开始前
+模拟桌面都重置为录制时该调用第一次快照看到的状态。
+"""
+import argparse
+import base64
+import gzip
+import json
+import statistics
+import sys
+import time
+import zlib
+
+import display_topology
+from desktop_backend import DesktopBackend, logging
+from desktop_manager import DesktopManager
+from desktop_sim import SimulatedListView, busy_wait
+from icon_table import IconTable
+from restore_plan import POSITION_TOLERANCE
+
+TRACE_FORMAT = "desktop-trace"
+TRACE_VERSION = 1
+
+# 事件的第一个元素为类型，最后一个为耗时（微秒），其余字段见各 RecordingBackend 方法
+BACKEND_EVENTS = ("alloc", "free", "read", "write", "send", "notify", "timeout",
+                  "invalidate", "get_style", "set_style")
+# 模拟回放时各事件类型对应的 SimulatedListView 延迟类型
+LATENCY_KINDS = {"send": "send_message", "timeout": "send_message", "notify": "notify",
+                 "read": "read", "write": "write", "alloc": "alloc"}
+
+
+class TraceMismatch(Exception):
+    """回放时的调用与录制的序列不一致。"""
+
+
+def _micros(start):
+    return int((time.perf_counter() - start) * 1e6)
+
+
+class RecordingBackend(DesktopBackend):
+    """把所有调用转发给 inner，并向 events 追加记录。"""
+
+    def __init__(self, inner, events):
+        self.inner = inner
+        self.events = events
+        self.hwnd = inner.hwnd
+
+    def alloc(self, size):
+        start = time.perf_counter()
+        address = self.inner.alloc(size)
+        self.events.append(["alloc", size, address, _micros(start)])
+        return address
+
+    def free(self, address):
+        start = time.perf_counter()
+        self.inner.free(address)
+        self.events.append(["free", address, _micros(start)])
+
+    def read(self, address, size):
+        start = time.perf_counter()
+        data = self.inner.read(address, size)
+        self.events.append(["read", address, size,
+                            base64.b64encode(data).decode('ascii'), _micros(start)])
+        return data
+
+    def write(self, address, data):
+        start = time.perf_counter()
+        self.inner.write(address, data)
+        self.events.append(["write", address, len(data), zlib.crc32(data), _micros(start)])
+
+    def send_message(self, msg, wparam=0, lparam=0):
+        start = time.perf_counter()
+        result = self.inner.send_message(msg, wparam, lparam)
+        self.events.append(["send", msg, wparam, lparam, result, _micros(start)])
+        return result
+
+    def send_notify(self, msg, wparam=0, lparam=0):
+        start = time.perf_counter()
+        result = self.inner.send_notify(msg, wparam, lparam)
+        self.events.append(["notify", msg, wparam, lparam, result, _micros(start)])
+        return result
+
+    def send_message_timeout(self, msg, wparam=0, lparam=0, timeout_ms=5000):
+        start = time.perf_counter()
+        ok, result = self.inner.send_message_timeout(msg, wparam, lparam, timeout_ms)
+        self.events.append(["timeout", msg, wparam, lparam, ok, result, _micros(start)])
+        return ok, result
+
+    def invalidate(self):
+        start = time.perf_counter()
+        self.inner.invalidate()
+        self.events.append(["invalidate", _micros(start)])
+
+    def get_style(self):
+        start = time.perf_counter()
+        style = self.inner.get_style()
+        self.events.append(["get_style", style, _micros(start)])
+        return style
+
+    def set_style(self, style):
+        start = time.perf_counter()
+        self.inner.set_style(style)
+        self.events.append(["set_style", style, _micros(start)])
+
+    def is_alive(self):
+        # 会话健康检查不属于被测操作，不录制
+        return self.inner.is_alive()
+
+    def close(self):
+        self.inner.close()
+
+
+class RecordingManager(DesktopManager):
+    """记录顶层 get_icons / restore_icons 调用及每次快照得到的桌面状态。"""
+
+    def __init__(self, recorder, backend):
+        self._recorder = recorder
+        self._depth = 0
+        super().__init__(RecordingBackend(backend, recorder.events))
+
+    def get_monitors(self):
+        start = time.perf_counter()
+        monitors = super().get_monitors()
+        self._recorder.events.append(["monitors", _micros(start)])
+        return monitors
+
+    def get_icons(self):
+        top_level = self._depth == 0
+        if top_level:
+            self._recorder.events.append(["call", "get_icons", None])
+        self._depth += 1
+        try:
+            icons, spacing = super().get_icons()
+        finally:
+            self._depth -= 1
+        self._recorder.events.append(["state", icons.names(), list(icons.column("x")),
+                                      list(icons.column("y")), list(spacing)])
+        return icons, spacing
+
+    def restore_icons(self, saved_icons, saved_monitors=None, progress_callback=None,
+                      tolerance=POSITION_TOLERANCE, cancel=None, progress=None,
+                      layout=None, plans=None):
+        if self._depth == 0:
+            self._recorder.events.append(["call", "restore_icons", {
+                "icons": IconTable.coerce(saved_icons).to_dicts(),
+                "monitors": saved_monitors,
+                "tolerance": tolerance,
+            }])
+        self._depth += 1
+        try:
+            return super().restore_icons(saved_icons, saved_monitors, progress_callback,
+                                         tolerance, cancel, progress, layout, plans)
+        finally:
+            self._depth -= 1
+
+
+class TraceRecorder:
+    """录制一次会话。manager() 可直接作为 DesktopSession 的 factory。"""
+
+    def __init__(self, backend_factory=None):
+        self.backend_factory = backend_factory
+        self.events = []
+        self.header = {
+            "format": TRACE_FORMAT,
+            "version": TRACE_VERSION,
+            "created": time.time(),
+            "platform": sys.platform,
+        }
+        self._capture_displays()
+
+    def _capture_displays(self):
+        # 丢弃缓存，记录的是真实枚举的耗时
+        display_topology.invalidate()
+        start = time.perf_counter()
+        self.header["monitors"] = display_topology.get_monitors()
+        self.header["monitors_us"] = _micros(start)
+        start = time.perf_counter()
+        self.header["monitors_info"] = display_topology.get_monitors_info()
+        self.header["monitors_info_us"] = _micros(start)
+
+    def manager(self):
+        if self.backend_factory is not None:
+            backend = self.backend_factory()
+        else:
+            from desktop_backend import Win32Backend
+            backend = Win32Backend.open()
+        self.header["hwnd"] = backend.hwnd
+        return RecordingManager(self, backend)
+
+    def save(self, path):
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps(self.header, ensure_ascii=False) + "\n")
+            for event in self.events:
+                f.write(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + "\n")
+
+
+class Trace:
+    """读入的录制文件：header、backend 事件序列与顶层调用。"""
+
+    def __init__(self, header, events):
+        self.header = header
+        self.events = events
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header.get("format") != TRACE_FORMAT:
+                raise ValueError(f"{path} is not a desktop trace")
+            if header.get("version", 0) > TRACE_VERSION:
+                raise ValueError(f"Unsupported trace version {header.get('version')}")
+            events = [json.loads(line) for line in f if line.strip()]
+        return cls(header, events)
+
+    @property
+    def calls(self):
+        return [(event[1], event[2]) for event in self.events if event[0] == "call"]
+
+    @property
+    def backend_events(self):
+        return [event for event in self.events if event[0] in BACKEND_EVENTS]
+
+    def _state(self, event):
+        """state 事件 → (items, spacing)，items 为 LVM 坐标 [(name, x, y), ...]。"""
+        _, names, xs, ys, spacing = event
+        monitors = self.header.get("monitors") or []
+        left = min((m['rect'][0] for m in monitors), default=0)
+        top = min((m['rect'][1] for m in monitors), default=0)
+        return [(n, x - left, y - top) for n, x, y in zip(names, xs, ys)], tuple(spacing)
+
+    def initial_state(self):
+        """第一次快照得到的桌面：(items, spacing)。"""
+        for event in self.events:
+            if event[0] == "state":
+                return self._state(event)
+        return [], (75, 100)
+
+    def call_states(self):
+        """与 calls 对应：每个调用开始时的桌面，即该调用内第一次快照的结果；
+        调用内没有快照时为 None。"""
+        states = []
+        for event in self.events:
+            if event[0] == "call":
+                states.append(None)
+            elif event[0] == "state" and states and states[-1] is None:
+                states[-1] = self._state(event)
+        return states
+
+    def initial_style(self):
+        return next((event[1] for event in self.events if event[0] == "get_style"), 0)
+
+    def latency(self):
+        """各类调用耗时的中位数（秒），键为 SimulatedListView 的延迟类型。"""
+        samples = {}
+        for event in self.backend_events:
+            kind = LATENCY_KINDS.get(event[0])
+            if kind is not None:
+                samples.setdefault(kind, []).append(event[-1])
+        return {kind: statistics.median(values) / 1e6 for kind, values in samples.items()}
+
+    def summary(self):
+        counts, totals = {}, {}
+        for event in self.backend_events:
+            counts[event[0]] = counts.get(event[0], 0) + 1
+            totals[event[0]] = totals.get(event[0], 0) + event[-1]
+        items, spacing = self.initial_state()
+        return {
+            "created": self.header.get("created"),
+            "platform": self.header.get("platform"),
+            "monitors": [m.get("rect") for m in self.header.get("monitors") or []],
+            "monitors_ms": round(self.header.get("monitors_us", 0) / 1000, 3),
+            "monitors_info_ms": round(self.header.get("monitors_info_us", 0) / 1000, 3),
+            "icons": len(items),
+            "spacing": spacing,
+            "calls": [name for name, _ in self.calls],
+            "events": counts,
+            "event_ms": {kind: round(total / 1000, 3) for kind, total in totals.items()},
+        }
+
+
+class TraceDisplays:
+    """按录制结果返回显示器枚举，可通过 display_topology.use_source() 安装。"""
+
+    def __init__(self, header, timing=False):
+        self.header = header
+        self.timing = timing
+
+    def signature(self):
+        return tuple((m.get('handle', i), tuple(m['rect']))
+                     for i, m in enumerate(self.header.get("monitors") or []))
+
+    def monitors(self):
+        if self.timing:
+            busy_wait(self.header.get("monitors_us", 0) / 1e6)
+        return [dict(m) for m in self.header.get("monitors") or []]
+
+    def monitors_info(self):
+        if self.timing:
+            busy_wait(self.header.get("monitors_info_us", 0) / 1e6)
+        return [dict(m) for m in self.header.get("monitors_info") or []]
+
+
+class ReplayBackend(DesktopBackend):
+    """按顺序返回录制的结果；timing=True 时每次调用等待录制的耗时。"""
+
+    def __init__(self, trace, timing=False):
+        self.hwnd = trace.header.get("hwnd", 0)
+        self.timing = timing
+        self._events = trace.backend_events
+        self._pos = 0
+
+    @property
+    def remaining(self):
+        return len(self._events) - self._pos
+
+    def _next(self, kind, *expected):
+        if self._pos >= len(self._events):
+            raise TraceMismatch(f"#{self._pos}: trace exhausted, got {kind}{expected}")
+        event = self._events[self._pos]
+        if event[0] != kind or tuple(event[1:1 + len(expected)]) != expected:
+            raise TraceMismatch(f"#{self._pos}: expected {event[:1 + len(expected)]}, "
+                                f"got {[kind, *expected]}")
+        self._pos += 1
+        if self.timing:
+            busy_wait(event[-1] / 1e6)
+        return event
+
+    def alloc(self, size):
+        return self._next("alloc", size)[2]
+
+    def free(self, address):
+        self._next("free", address)
+
+    def read(self, address, size):
+        return base64.b64decode(self._next("read", address, size)[3])
+
+    def write(self, address, data):
+        self._next("write", address, len(data), zlib.crc32(data))
+
+    def send_message(self, msg, wparam=0, lparam=0):
+        return self._next("send", msg, wparam, lparam)[4]
+
+    def send_notify(self, msg, wparam=0, lparam=0):
+        return self._next("notify", msg, wparam, lparam)[4]
+
+    def send_message_timeout(self, msg, wparam=0, lparam=0, timeout_ms=5000):
+        event = self._next("timeout", msg, wparam, lparam)
+        return event[4], event[5]
+
+    def invalidate(self):
+        self._next("invalidate")
+
+    def get_style(self):
+        return self._next("get_style")[1]
+
+    def set_style(self, style):
+        self._next("set_style", style)
+
+    def is_alive(self):
+        return True
+
+
+def simulated_backend(trace, timing=True):
+    """由录制的桌面状态（及各类调用的中位耗时）构造 SimulatedListView。"""
+    items, spacing = trace.initial_state()
+    sim = SimulatedListView(items, spacing, latency=trace.latency() if timing else None,
+                            log_messages=False)
+    sim.hwnd = trace.header.get("hwnd", sim.hwnd)
+    sim.style = trace.initial_style()
+    return sim
+
+
+def replay(trace, sim=False, timing=False):
+    """依次重放录制的顶层调用，返回 [(调用, 耗时毫秒, 结果摘要), ...]。"""
+    backend = simulated_backend(trace, timing) if sim else ReplayBackend(trace, timing)
+    display_topology.use_source(TraceDisplays(trace.header, timing))
+    results = []
+    try:
+        manager = DesktopManager(backend)
+        for (name, args), state in zip(trace.calls, trace.call_states()):
+            if sim and state is not None:
+                # 模拟桌面只反映自身执行的移动；按录制时该调用看到的桌面重置，
+                # 使保存之后才执行的恢复与录制时面对同样的图标位置
+                items, backend.spacing = state
+                backend.items = [[n, x, y] for n, x, y in items]
+            start = time.perf_counter()
+            if name == "get_icons":
+                icons, _ = manager.get_icons()
+                summary = {"icons": len(icons)}
+            elif name == "restore_icons":
+                summary = manager.restore_icons(args["icons"], args.get("monitors"),
+                                                tolerance=args["tolerance"]).as_dict()
+            else:
+                raise TraceMismatch(f"Unknown call {name}")
+            results.append((name, round((time.perf_counter() - start) * 1000, 3), summary))
+    finally:
+        display_topology.use_source(None)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="desktop_trace", description="桌面会话录制文件的查看与回放")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_info = sub.add_parser("info", help="显示录制文件摘要")
+    p_info.add_argument("trace")
+    p_replay = sub.add_parser("replay", help="回放录制的 get_icons / restore_icons")
+    p_replay.add_argument("trace")
+    p_replay.add_argument("--sim", action="store_true",
+                          help="在由录制状态构造的模拟桌面上运行，而不是严格回放")
+    p_replay.add_argument("--timing", action="store_true", help="按录制的耗时等待")
+    p_replay.add_argument("--repeat", type=int, default=1)
+    p_replay.add_argument("--profile", action="store_true", help="用 cProfile 输出热点函数")
+    args = parser.parse_args(argv)
+
+    trace = Trace.load(args.trace)
+    if args.command == "info":
+        print(json.dumps(trace.summary(), indent=2, ensure_ascii=False))
+        return 0
+
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        for _ in range(args.repeat):
+            for name, elapsed, summary in replay(trace, sim=args.sim, timing=args.timing):
+                print(f"{name:<14} {elapsed:>10.3f} ms  {json.dumps(summary)}")
+    except TraceMismatch as e:
+        print(f"Replay diverged from trace: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if profiler is not None:
+            import pstats
+            profiler.disable()
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    if logging.last_error:
+        print(f"Last error: {logging.last_error}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
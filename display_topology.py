@@ -0,0 +1,232 @@
+"""显示器拓扑枚举与进程级缓存。
+
+get_monitors_info() 需要对每台显示器调用 EnumDisplaySettings、EnumDisplayDevices
+并查询注册表，开销远大于 EnumDisplayMonitors 本身。这里以 EnumDisplayMonitors
+返回的句柄、矩形与 GetMonitorInfo 的工作区作为廉价签名：签名不变时直接返回缓存，
+变化（包括移动任务栏或改变其大小）时递增 generation 并重新枚举。invalidate()
+可在签名之外的原因需要重新枚举时强制丢弃缓存。
+
+枚举函数可以通过 use_source() 替换，例如 desktop_sim.SimulatedDisplays，
+从而在非 Windows 环境下使用同一套缓存与指纹逻辑。
+"""
+import functools
+import hashlib
+import json
+import threading
+
+try:
+    import win32api
+    import win32con
+    import winreg
+except ImportError:  # 非 Windows 环境
+    win32api = win32con = winreg = None
+
+import metrics
+from desktop_backend import enable_dpi_awareness, logging
+
+
+@functools.lru_cache(maxsize=64)
+def _get_monitor_registry_name(device_key):
+    try:
+        prefix = "\\Registry\\Machine\\"
+        key_path = device_key[len(prefix):] if device_key.startswith(prefix) else device_key
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path) as key:
+            try:
+                desc, _ = winreg.QueryValueEx(key, "DriverDesc")
+                return desc
+            except Exception:
+                pass
+    except Exception:
+        pass
+    return None
+
+
+def enum_monitors():
+    """枚举显示器的基本信息（句柄、矩形、工作区、设备名），不经过缓存。"""
+    monitors = []
+    try:
+        for i, handle in enumerate(win32api.EnumDisplayMonitors()):
+            h_monitor, h_dc, (left, top, right, bottom) = handle
+            info = win32api.GetMonitorInfo(h_monitor)
+            monitors.append({
+                "index": i,
+                "handle": int(h_monitor),
+                "rect": info['Monitor'],
+                "work": info['Work'],
+                "device": info['Device'],
+                "is_primary": (info['Flags'] & win32con.MONITORINFOF_PRIMARY) != 0
+            })
+    except Exception as e:
+        logging.error(f"EnumDisplayMonitors failed: {e}")
+    return monitors
+
+
+def enum_monitors_info():
+    """枚举所有显示器的详细信息，不经过缓存。"""
+    monitors = []
+    try:
+        for i, (handle, _, rect) in enumerate(win32api.EnumDisplayMonitors()):
+            info = win32api.GetMonitorInfo(handle)
+            device_name = info['Device']
+            is_primary = bool(info['Flags'] & win32con.MONITORINFOF_PRIMARY)
+
+            try:
+                settings = win32api.EnumDisplaySettings(device_name, win32con.ENUM_CURRENT_SETTINGS)
+                refresh_rate = settings.DisplayFrequency
+            except Exception:
+                refresh_rate = 60
+
+            name = "Unknown Monitor"
+            device_id = ""
+            try:
+                monitor_dev = win32api.EnumDisplayDevices(device_name, 0)
+                device_id = monitor_dev.DeviceID
+                reg_name = _get_monitor_registry_name(monitor_dev.DeviceKey)
+                name = reg_name if reg_name else monitor_dev.DeviceString
+                if "Generic" in name and device_id.startswith("MONITOR\\"):
+                    parts = device_id.split("\\")
+                    if len(parts) > 1:
+                        name += f" ({parts[1]})"
+            except Exception:
+                pass
+
+            monitors.append({
+                "index": i,
+                "device": device_name,
+                "rect": rect,
+                "work_area": info['Work'],
+                "resolution": (rect[2] - rect[0], rect[3] - rect[1]),
+                "position": (rect[0], rect[1]),
+                "refresh_rate": refresh_rate,
+                "is_primary": is_primary,
+                "name": name,
+                "device_id": device_id,
+            })
+    except Exception as e:
+        logging.error(f"Error enumerating monitors: {e}")
+    return monitors
+
+
+def topology_signature():
+    """廉价的拓扑签名：每台显示器的句柄、矩形与工作区。
+
+    工作区随任务栏位置与大小变化，恢复时的网格安置与计划缓存都依赖它。
+    """
+    enable_dpi_awareness()
+    try:
+        return tuple((int(handle), tuple(rect), tuple(win32api.GetMonitorInfo(handle)['Work']))
+                     for handle, _, rect in win32api.EnumDisplayMonitors())
+    except Exception as e:
+        logging.warning(f"Topology signature failed: {e}")
+        return None
+
+
+def topology_fingerprint(monitors):
+    """显示器拓扑指纹：各显示器矩形与分辨率按位置排序后的摘要，没有显示器时返回 None。
+
+    与布局匹配的比较规则一致，只要矩形和分辨率相同即视为同一拓扑。
+    """
+    if not monitors:
+        return None
+    key = []
+    for m in monitors:
+        rect = [int(v) for v in m['rect']]
+        resolution = m.get('resolution') or (rect[2] - rect[0], rect[3] - rect[1])
+        key.append([rect, [int(v) for v in resolution]])
+    key.sort()
+    return hashlib.sha1(json.dumps(key).encode('ascii')).hexdigest()[:16]
+
+
+_STALE = object()
+
+
+class TopologyCache:
+    """进程级显示器拓扑缓存，generation 在每次拓扑变化或失效时递增。"""
+
+    def __init__(self, signature_func=topology_signature,
+                 monitors_func=enum_monitors, info_func=enum_monitors_info):
+        self._signature_func = signature_func
+        self._monitors_func = monitors_func
+        self._info_func = info_func
+        self._lock = threading.Lock()
+        self._signature = None
+        self._monitors = None
+        self._info = None
+        self._fingerprint = None
+        self.generation = 0
+
+    def _check(self):
+        signature = self._signature_func()
+        if signature is None or signature != self._signature:
+            self._signature = signature
+            self._monitors = None
+            self._info = None
+            self._fingerprint = None
+            self.generation += 1
+
+    def invalidate(self):
+        """显示设置变化通知的入口：丢弃缓存，下次访问重新枚举。"""
+        with self._lock:
+            self._signature = _STALE
+
+    def monitors(self):
+        with self._lock:
+            self._check()
+            if self._monitors is None:
+                with metrics.span("enumerate_monitors"):
+                    self._monitors = self._monitors_func()
+            cached = self._monitors
+        return [dict(m) for m in cached]
+
+    def monitors_info(self):
+        with self._lock:
+            self._check()
+            if self._info is None:
+                with metrics.span("enumerate_monitors_info"):
+                    self._info = self._info_func()
+            cached = self._info
+        return [dict(m) for m in cached]
+
+    def fingerprint(self):
+        """当前拓扑的指纹，同一 generation 内只计算一次。"""
+        with self._lock:
+            self._check()
+            if self._info is None:
+                with metrics.span("enumerate_monitors_info"):
+                    self._info = self._info_func()
+            if self._fingerprint is None:
+                self._fingerprint = topology_fingerprint(self._info)
+            return self._fingerprint
+
+
+_cache = TopologyCache()
+
+
+def use_source(source=None):
+    """替换显示器枚举来源。source 需提供 signature()、monitors()、monitors_info()；
+    传入 None 恢复为 Win32 枚举。"""
+    global _cache
+    if source is None:
+        _cache = TopologyCache()
+    else:
+        _cache = TopologyCache(source.signature, source.monitors, source.monitors_info)
+
+
+def get_monitors():
+    return _cache.monitors()
+
+
+def get_monitors_info():
+    return _cache.monitors_info()
+
+
+def current_fingerprint():
+    return _cache.fingerprint()
+
+
+def generation():
+    return _cache.generation
+
+
+def invalidate():
+    _cache.invalidate()
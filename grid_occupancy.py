@@ -0,0 +1,135 @@
+"""显示器工作区内图标网格的占用情况，用于恢复时无重叠地安置图标。
+
+网格单元 (col, row) 对应屏幕位置 (rect.left + col * spacing_x, rect.top + row * spacing_y)，
+与 restore_plan 中由保存的列行计算目标坐标的方式一致；只有整个单元落在工作区
+（不含任务栏）内的列行才算有效。占用情况存放在 bytearray 位图中；每一行另有向右、
+向左两个并查集，把已占用单元指向同方向的下一个候选单元，查找某行中离指定列最近的
+空闲单元的均摊代价接近常数。nearest_free() 从目标行向上下两侧逐行比较这些候选的
+像素距离，行距已超过当前最优距离时停止，不会绕回网格开头。
+"""
+
+
+class GridOccupancy:
+    def __init__(self, rect, work, spacing):
+        left, top = rect[0], rect[1]
+        spacing_x, spacing_y = spacing
+        self.left = left
+        self.top = top
+        self.spacing_x = spacing_x
+        self.spacing_y = spacing_y
+        if spacing_x <= 0 or spacing_y <= 0:
+            self.col0 = self.row0 = self.cols = self.rows = 0
+        else:
+            # 单元左上角不早于工作区起点，右下角不超出工作区终点
+            self.col0 = -(-(work[0] - left) // spacing_x)
+            self.row0 = -(-(work[1] - top) // spacing_y)
+            self.cols = max((work[2] - left) // spacing_x - self.col0, 0)
+            self.rows = max((work[3] - top) // spacing_y - self.row0, 0)
+        self.size = self.cols * self.rows
+        self.free = self.size
+        self._used = bytearray(self.size)
+        # 每行 cols + 1 项，第 cols 项为哨兵：该方向上没有空闲单元
+        stride = self.cols + 1
+        self._right = [i % stride for i in range(stride * self.rows)]
+        self._left = list(self._right)
+
+    @classmethod
+    def for_monitor(cls, monitor, spacing):
+        """由 get_monitors() 的一项构建，没有 work 时使用整个显示器矩形。"""
+        rect = monitor['rect']
+        return cls(rect, monitor.get('work') or monitor.get('work_area') or rect, spacing)
+
+    def __len__(self):
+        return self.size
+
+    def _index(self, col, row):
+        c = col - self.col0
+        r = row - self.row0
+        if 0 <= c < self.cols and 0 <= r < self.rows:
+            return r * self.cols + c
+        return -1
+
+    @staticmethod
+    def _find(parent, base, c):
+        """行内并查集查找，base 为该行在 parent 中的起点。"""
+        while parent[base + c] != c:
+            parent[base + c] = parent[base + parent[base + c]]
+            c = parent[base + c]
+        return c
+
+    def contains(self, col, row):
+        return self._index(col, row) >= 0
+
+    def is_free(self, col, row):
+        index = self._index(col, row)
+        return index >= 0 and not self._used[index]
+
+    def occupy(self, col, row):
+        """占用单元，成功返回 True；单元无效或已被占用返回 False。"""
+        index = self._index(col, row)
+        if index < 0 or self._used[index]:
+            return False
+        self._used[index] = 1
+        c = col - self.col0
+        base = (row - self.row0) * (self.cols + 1)
+        self._right[base + c] = c + 1
+        # 向左的并查集按镜像列号 cols - 1 - c 存放
+        self._left[base + self.cols - 1 - c] = self.cols - c
+        self.free -= 1
+        return True
+
+    def clamp(self, col, row):
+        """把列行限制到有效范围内（网格为空时原样返回）。"""
+        if not self.size:
+            return col, row
+        col = min(max(col, self.col0), self.col0 + self.cols - 1)
+        row = min(max(row, self.row0), self.row0 + self.rows - 1)
+        return col, row
+
+    def _row_candidates(self, r, c):
+        """第 r 行（相对）中离相对列 c 最近的左右两个空闲列。"""
+        base = r * (self.cols + 1)
+        right = self._find(self._right, base, c)
+        if right < self.cols:
+            yield right
+        left = self.cols - 1 - self._find(self._left, base, self.cols - 1 - c)
+        if left >= 0:
+            yield left
+
+    def nearest_free(self, col, row):
+        """按像素距离离 (col, row) 最近的空闲单元，距离相同时取列、行较小者；
+        没有空闲单元时返回 None。(col, row) 可以超出有效范围。"""
+        if not self.free:
+            return None
+        start_col, start_row = self.clamp(col, row)
+        c = start_col - self.col0
+        r0 = start_row - self.row0
+        best, best_dist = None, None
+        for step in range(self.rows):
+            # 以钳制后的行为中心交替向上下扩展，行距单调不减
+            for r in ((r0 - step, r0 + step) if step else (r0,)):
+                if not 0 <= r < self.rows:
+                    continue
+                dy = (r + self.row0 - row) * self.spacing_y
+                if best_dist is not None and dy * dy > best_dist:
+                    continue
+                for cc in self._row_candidates(r, c):
+                    dx = (cc + self.col0 - col) * self.spacing_x
+                    cell = (cc + self.col0, r + self.row0)
+                    dist = dx * dx + dy * dy
+                    if best_dist is None or (dist, cell) < (best_dist, best):
+                        best, best_dist = cell, dist
+            if best_dist is not None:
+                near = min(abs(r + self.row0 - row) for r in (r0 - step - 1, r0 + step + 1))
+                if (near * self.spacing_y) ** 2 > best_dist:
+                    break
+        return best
+
+    def place(self, col, row):
+        """占用 (col, row) 或距离它最近的空闲单元并返回该单元；网格已满时返回 None。"""
+        if self.occupy(col, row):
+            return col, row
+        cell = self.nearest_free(col, row)
+        if cell is not None:
+            self.occupy(*cell)
+        return cell
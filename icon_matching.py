@@ -0,0 +1,154 @@
+"""保存的图标与当前桌面图标的对应。
+
+按名称建立多重集合：同名图标（例如用户桌面与公共桌面上的同名快捷方式）不再互相
+覆盖，而是按位置就近一一对应。名称对不上的图标依次尝试：
+
+1. 规范化名称相同：忽略大小写、标点与“ - 快捷方式”“ - Shortcut”“(2)”、.lnk 等
+   后缀，例如 "App - 快捷方式" 与 "App"；
+2. 字符 n-gram 倒排索引：只与至少共享一个较少见 n-gram 的名称比较 Dice 相似度，
+   相似度不低于 FUZZY_THRESHOLD 的按相似度、再按距离贪心配对。
+
+各阶段的代价与图标数大致成线性，不会两两比较所有名称。
+"""
+import re
+from collections import defaultdict
+
+FUZZY_THRESHOLD = 0.7
+NGRAM = 3
+MAX_POSTING = 64   # 出现在过多名称中的 n-gram 区分度太低，只用于计算相似度，不用于产生候选
+
+_SUFFIX = re.compile(
+    r"\s*-\s*(快捷方式|捷徑|shortcut|verknüpfung|raccourci|collegamento|acceso directo|ярлык)$"
+    r"|\s*\(\d+\)$"
+    r"|\.(lnk|url|pif)$",
+    re.IGNORECASE)
+_TOKEN = re.compile(r"\w+")
+
+
+def normalize(name):
+    """用于比较的名称：小写、去掉快捷方式后缀与副本编号，只保留字母数字词。"""
+    text = name.casefold().strip()
+    while True:
+        stripped = _SUFFIX.sub("", text).strip()
+        if stripped == text:
+            break
+        text = stripped
+    return " ".join(_TOKEN.findall(text))
+
+
+def ngrams(text, n=NGRAM):
+    """带首尾填充的字符 n-gram 集合，短名称也至少有一个 n-gram。"""
+    padded = f"{' ' * (n - 1)}{text} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class _Matcher:
+    def __init__(self, saved_xs, saved_ys, current_xs, current_ys, offset):
+        self.saved_xs = saved_xs
+        self.saved_ys = saved_ys
+        self.current_xs = current_xs
+        self.current_ys = current_ys
+        self.offset_x, self.offset_y = offset
+        self.matches = [-1] * len(saved_xs)
+        self.used = bytearray(len(current_xs))
+
+    def distance(self, s, c):
+        dx = self.current_xs[c] - self.offset_x - self.saved_xs[s]
+        dy = self.current_ys[c] - self.offset_y - self.saved_ys[s]
+        return dx * dx + dy * dy
+
+    def assign(self, s, c):
+        self.matches[s] = c
+        self.used[c] = 1
+
+    def pair_groups(self, saved_groups, current_groups):
+        """按相同的键配对；同键多个图标时按距离就近一一对应。"""
+        for key, saved_indices in saved_groups.items():
+            current_indices = [c for c in current_groups.get(key, ()) if not self.used[c]]
+            if not current_indices:
+                continue
+            if len(saved_indices) == 1 and len(current_indices) == 1:
+                self.assign(saved_indices[0], current_indices[0])
+                continue
+            pairs = sorted((self.distance(s, c), s, c)
+                           for s in saved_indices for c in current_indices)
+            self.pair_greedily(pairs)
+
+    def pair_greedily(self, ordered_pairs):
+        for pair in ordered_pairs:
+            s, c = pair[-2], pair[-1]
+            if self.matches[s] < 0 and not self.used[c]:
+                self.assign(s, c)
+
+    def unmatched_saved(self):
+        return [s for s, c in enumerate(self.matches) if c < 0]
+
+    def unmatched_current(self):
+        return [c for c, used in enumerate(self.used) if not used]
+
+
+def match_icons(saved_names, saved_xs, saved_ys, current_names, current_xs, current_ys,
+                offset=(0, 0), fuzzy=True, threshold=FUZZY_THRESHOLD):
+    """返回 (matches, renamed)。
+
+    matches[i] 为第 i 个保存图标对应的当前图标下标，找不到为 -1；renamed 为名称
+    不完全相同、经规范化或模糊匹配对应上的保存图标下标。当前坐标减去 offset 后
+    与保存坐标处于同一坐标系，用于同名或同样相似时就近选择。
+    """
+    matcher = _Matcher(saved_xs, saved_ys, current_xs, current_ys, offset)
+
+    saved_groups = defaultdict(list)
+    for s, name in enumerate(saved_names):
+        saved_groups[name].append(s)
+    current_groups = defaultdict(list)
+    for c, name in enumerate(current_names):
+        current_groups[name].append(c)
+    matcher.pair_groups(saved_groups, current_groups)
+
+    pending = matcher.unmatched_saved()
+    if not fuzzy or not pending:
+        return matcher.matches, []
+    remaining = matcher.unmatched_current()
+    if not remaining:
+        return matcher.matches, []
+
+    # 规范化名称相同
+    saved_keys = {s: normalize(saved_names[s]) for s in pending}
+    current_keys = {c: normalize(current_names[c]) for c in remaining}
+    saved_groups = defaultdict(list)
+    for s, key in saved_keys.items():
+        if key:
+            saved_groups[key].append(s)
+    current_groups = defaultdict(list)
+    for c, key in current_keys.items():
+        if key:
+            current_groups[key].append(c)
+    matcher.pair_groups(saved_groups, current_groups)
+
+    # n-gram 倒排索引上的相似度匹配
+    pending_fuzzy = [s for s in pending if matcher.matches[s] < 0 and saved_keys[s]]
+    remaining = [c for c in remaining if not matcher.used[c] and current_keys[c]]
+    if pending_fuzzy and remaining:
+        current_grams = {c: ngrams(current_keys[c]) for c in remaining}
+        postings = defaultdict(list)
+        for c, grams in current_grams.items():
+            for gram in grams:
+                postings[gram].append(c)
+        pairs = []
+        for s in pending_fuzzy:
+            grams = ngrams(saved_keys[s])
+            candidates = set()
+            for gram in grams:
+                posting = postings.get(gram)
+                if posting is not None and len(posting) <= MAX_POSTING:
+                    candidates.update(posting)
+            for c in candidates:
+                other = current_grams[c]
+                score = 2 * len(grams & other) / (len(grams) + len(other))
+                if score >= threshold:
+                    pairs.append((-score, matcher.distance(s, c), s, c))
+        pairs.sort()
+        matcher.pair_greedily(pairs)
+
+    renamed = [s for s in pending if matcher.matches[s] >= 0]
+    return matcher.matches, renamed
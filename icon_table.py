@@ -0,0 +1,280 @@
+"""列式图标表：替代每个图标一个 dict 的列表。
+
+坐标、显示器、网格位置存放在 array 中，名称经 sys.intern 去重，设备名存为
+设备表下标。对外保持与 dict 列表兼容：len()、下标、迭代都返回普通 dict，
+写入 JSON 前用 to_dicts() / to_plain() 转换。排序与切片返回 IconTableView，
+只保存下标序列，不复制列数据。
+"""
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 与 layout_binary 的字段位保持一致，记录 dict 中实际存在哪些键
+F_X       = 0x01
+F_Y       = 0x02
+F_MONITOR = 0x04
+F_DEVICE  = 0x08
+F_COL     = 0x10
+F_ROW     = 0x20
+F_ALL     = 0x3F
+
+NO_DEVICE = 0xFFFFFFFF
+NUMPY_THRESHOLD = 256
+
+
+def _int_field(icon, key):
+    """整数字段原样返回；浮点数（手工编辑或旧版导出的布局）四舍五入，
+    其他类型抛出指明图标与字段的 ValueError。"""
+    value = icon.get(key, 0)
+    if type(value) is int:
+        return value
+    try:
+        return int(round(value))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"Icon {icon.get('name')!r} has invalid {key}: {value!r}") from None
+
+
+class _IconSequence:
+    """IconTable 与 IconTableView 共用的 dict 兼容接口。"""
+
+    __slots__ = ()
+
+    def _indices(self):
+        raise NotImplementedError
+
+    def _table(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        return len(self._indices())
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, key):
+        indices = self._indices()
+        if isinstance(key, slice):
+            return IconTableView(self._table(), indices[key])
+        return self._table().icon(indices[key])
+
+    def __iter__(self):
+        table = self._table()
+        for i in self._indices():
+            yield table.icon(i)
+
+    def to_dicts(self):
+        return list(self)
+
+    def column(self, field):
+        """按当前顺序返回某一列（"name"、"x"、"y"、"monitor"、"col"、"row"）。"""
+        values = getattr(self._table(), f"{field}_column")
+        return [values[i] for i in self._indices()]
+
+    def names(self):
+        return list(self.column("name"))
+
+    def grid_order(self):
+        """按 (monitor, row, col) 排序的视图；缺失字段按 0 处理，排序稳定。"""
+        table = self._table()
+        indices = self._indices()
+        monitors, rows, cols = table.monitor_column, table.row_column, table.col_column
+        if np is not None and len(indices) >= NUMPY_THRESHOLD:
+            idx = np.asarray(indices, dtype=np.int64)
+            order = np.lexsort((np.asarray(cols)[idx], np.asarray(rows)[idx],
+                                np.asarray(monitors)[idx]))
+            return IconTableView(table, array('I', idx[order].tolist()))
+        ordered = sorted(indices, key=lambda i: (monitors[i], rows[i], cols[i]))
+        return IconTableView(table, array('I', ordered))
+
+
+class IconTable(_IconSequence):
+    """图标列存储。各列按下标对齐，mask 记录每个图标原本包含的字段。"""
+
+    __slots__ = ("name_column", "x_column", "y_column", "monitor_column", "device_column",
+                 "col_column", "row_column", "mask_column", "devices", "_device_ids")
+
+    def __init__(self):
+        self.name_column = []
+        self.x_column = array('i')
+        self.y_column = array('i')
+        self.monitor_column = array('i')
+        self.device_column = array('I')
+        self.col_column = array('i')
+        self.row_column = array('i')
+        self.mask_column = array('B')
+        self.devices = []
+        self._device_ids = {}
+
+    def _indices(self):
+        return range(len(self.name_column))
+
+    def _table(self):
+        return self
+
+    def column(self, field):
+        return getattr(self, f"{field}_column")
+
+    def __len__(self):
+        return len(self.name_column)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return IconTableView(self, range(len(self.name_column))[key])
+        return self.icon(range(len(self.name_column))[key])
+
+    def __iter__(self):
+        for i in range(len(self.name_column)):
+            yield self.icon(i)
+
+    # ---- 构建 ----
+
+    def device_id(self, device):
+        if device is None:
+            return NO_DEVICE
+        idx = self._device_ids.get(device)
+        if idx is None:
+            idx = self._device_ids[device] = len(self.devices)
+            self.devices.append(sys.intern(device))
+        return idx
+
+    def append(self, name, x=0, y=0, monitor=0, device=None, col=0, row=0, mask=F_ALL):
+        self.name_column.append(sys.intern(name))
+        self.x_column.append(x)
+        self.y_column.append(y)
+        self.monitor_column.append(monitor)
+        self.device_column.append(self.device_id(device) if mask & F_DEVICE else NO_DEVICE)
+        self.col_column.append(col)
+        self.row_column.append(row)
+        self.mask_column.append(mask)
+
+    @classmethod
+    def from_dicts(cls, icons):
+        table = cls()
+        for icon in icons:
+            mask = 0
+            if "x" in icon:
+                mask |= F_X
+            if "y" in icon:
+                mask |= F_Y
+            if "monitor" in icon:
+                mask |= F_MONITOR
+            if "monitor_device" in icon:
+                mask |= F_DEVICE
+            if "col" in icon:
+                mask |= F_COL
+            if "row" in icon:
+                mask |= F_ROW
+            table.append(icon["name"], _int_field(icon, "x"), _int_field(icon, "y"),
+                         _int_field(icon, "monitor"), icon.get("monitor_device"),
+                         _int_field(icon, "col"), _int_field(icon, "row"), mask)
+        return table
+
+    @classmethod
+    def coerce(cls, icons):
+        """IconTable / IconTableView 原样返回，dict 列表转换为 IconTable。"""
+        if isinstance(icons, _IconSequence):
+            return icons
+        return cls.from_dicts(icons or [])
+
+    @classmethod
+    def from_points(cls, names, xs, ys):
+        """由名称与屏幕坐标构建，显示器与网格位置稍后由 assign_monitors() 填充。"""
+        table = cls()
+        table.name_column = [sys.intern(n) for n in names]
+        table.x_column = array('i', xs)
+        table.y_column = array('i', ys)
+        n = len(table.name_column)
+        table.monitor_column = array('i', [0]) * n
+        table.device_column = array('I', [NO_DEVICE]) * n
+        table.col_column = array('i', [0]) * n
+        table.row_column = array('i', [0]) * n
+        table.mask_column = array('B', [F_X | F_Y]) * n
+        return table
+
+    def assign_monitors(self, monitor_index, spacing):
+        """批量计算所在显示器、设备名与网格列行（见 MonitorIndex.assign）。"""
+        positions, cols, rows = monitor_index.assign(self.x_column, self.y_column, spacing)
+        monitors = monitor_index.monitors
+        monitor_values = [m['index'] for m in monitors]
+        device_ids = [self.device_id(m.get('device', '')) for m in monitors]
+        self.monitor_column = array('i', [monitor_values[p] if p >= 0 else 0 for p in positions])
+        self.device_column = array('I', [device_ids[p] if p >= 0 else self.device_id("")
+                                         for p in positions])
+        self.col_column = array('i', cols)
+        self.row_column = array('i', rows)
+        self.mask_column = array('B', [F_ALL]) * len(self.name_column)
+
+    def remap_monitors(self, device_to_index):
+        """按设备名把 monitor 列改写为新的显示器编号（设备不在映射中的保持不变）。"""
+        new_values = [device_to_index.get(device) for device in self.devices]
+        monitor_column = self.monitor_column
+        for i, device in enumerate(self.device_column):
+            if device != NO_DEVICE and device < len(new_values):
+                value = new_values[device]
+                if value is not None and self.devices[device]:
+                    monitor_column[i] = value
+
+    # ---- 访问 ----
+
+    def icon(self, i):
+        mask = self.mask_column[i]
+        icon = {"name": self.name_column[i]}
+        if mask & F_X:
+            icon["x"] = self.x_column[i]
+        if mask & F_Y:
+            icon["y"] = self.y_column[i]
+        if mask & F_MONITOR:
+            icon["monitor"] = self.monitor_column[i]
+        if mask & F_DEVICE:
+            icon["monitor_device"] = self.devices[self.device_column[i]]
+        if mask & F_COL:
+            icon["col"] = self.col_column[i]
+        if mask & F_ROW:
+            icon["row"] = self.row_column[i]
+        return icon
+
+    def device(self, i):
+        device = self.device_column[i]
+        return self.devices[device] if device != NO_DEVICE else None
+
+    def nbytes(self):
+        """列数据占用的近似字节数（不含共享的已驻留字符串）。"""
+        arrays = (self.x_column, self.y_column, self.monitor_column, self.device_column,
+                  self.col_column, self.row_column, self.mask_column)
+        return (sum(a.itemsize * len(a) for a in arrays) +
+                sys.getsizeof(self.name_column))
+
+    def __repr__(self):
+        return f"IconTable({len(self)} icons)"
+
+
+class IconTableView(_IconSequence):
+    """IconTable 的只读视图：共享列数据，只保存下标序列。"""
+
+    __slots__ = ("table", "indices")
+
+    def __init__(self, table, indices):
+        self.table = table
+        self.indices = indices
+
+    def _indices(self):
+        return self.indices
+
+    def _table(self):
+        return self.table
+
+    def __repr__(self):
+        return f"IconTableView({len(self)} of {len(self.table)} icons)"
+
+
+def to_plain(data):
+    """返回可直接 json.dump 的布局数据副本（icons 转为 dict 列表）。"""
+    icons = data.get("icons")
+    if isinstance(icons, _IconSequence):
+        data = dict(data)
+        data["icons"] = icons.to_dicts()
+    return data
@@ -0,0 +1,195 @@
+"""单实例检测与命令转发。
+
+第一个启动的界面进程调用 InstanceServer.start() 监听本地端点；之后的启动（或脚本）
+用 send_command() 把 restore / save / show 等命令交给已运行的实例，在其已建立的
+桌面会话上执行，而不必再加载 Tk 和布局库。
+
+端点：支持 AF_UNIX 的平台使用当前用户临时目录下的 Unix 套接字；Windows 上使用
+127.0.0.1 的随机端口，端口号与随机令牌写在临时目录的 .port 文件中，客户端必须
+携带令牌。协议为一行 JSON 请求、一行 JSON 应答。
+"""
+import getpass
+import json
+import os
+import secrets
+import socket
+import sys
+import tempfile
+import threading
+
+APP_ID = "desktop-icon-layout"
+CONNECT_TIMEOUT = 0.5
+REPLY_TIMEOUT = 10.0
+MAX_REQUEST = 64 * 1024
+
+
+class AlreadyRunning(Exception):
+    """已有实例在监听。"""
+
+
+def _use_unix_socket():
+    return hasattr(socket, "AF_UNIX") and os.name != "nt"
+
+
+def _endpoint_path(name, directory):
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = "user"
+    suffix = ".sock" if _use_unix_socket() else ".port"
+    return os.path.join(directory or tempfile.gettempdir(), f"{name}-{user}{suffix}")
+
+
+def _read_line(conn):
+    buffer = b""
+    while b"\n" not in buffer:
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        buffer += chunk
+        if len(buffer) > MAX_REQUEST:
+            raise ValueError("request too large")
+    return buffer.split(b"\n", 1)[0]
+
+
+def _connect(name, directory, timeout):
+    """连接已运行的实例，没有实例时返回 (None, None)。"""
+    path = _endpoint_path(name, directory)
+    if not os.path.exists(path):
+        return None, None
+    try:
+        if _use_unix_socket():
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.settimeout(timeout)
+            conn.connect(path)
+            return conn, ""
+        with open(path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+        conn = socket.create_connection(("127.0.0.1", info["port"]), timeout=timeout)
+        return conn, info.get("token", "")
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+
+def send_command(command, args=(), name=APP_ID, directory=None, timeout=REPLY_TIMEOUT):
+    """把命令交给已运行的实例并返回其应答 dict；没有实例在运行时返回 None。"""
+    conn, token = _connect(name, directory, CONNECT_TIMEOUT)
+    if conn is None:
+        return None
+    with conn:
+        conn.settimeout(timeout)
+        request = {"command": command, "args": list(args), "token": token}
+        conn.sendall(json.dumps(request, ensure_ascii=False).encode('utf-8') + b"\n")
+        line = _read_line(conn)
+    if not line:
+        return {"ok": False, "error": "no reply"}
+    return json.loads(line.decode('utf-8'))
+
+
+def parse_argv(argv):
+    """命令行参数 → (command, args)，没有参数时为 show。"""
+    return (argv[0], list(argv[1:])) if argv else ("show", [])
+
+
+def forward(argv, name=APP_ID, directory=None):
+    """把命令行转发给已运行的实例，返回退出码；没有实例在运行时返回 None。"""
+    reply = send_command(*parse_argv(argv), name=name, directory=directory)
+    if reply is None:
+        return None
+    if not reply.get("ok"):
+        print(reply.get("error"), file=sys.stderr)
+        return 1
+    return 0
+
+
+def is_running(name=APP_ID, directory=None):
+    conn, _ = _connect(name, directory, CONNECT_TIMEOUT)
+    if conn is None:
+        return False
+    conn.close()
+    return True
+
+
+class InstanceServer:
+    """在后台线程中接收命令，handler(command, args) 返回可 JSON 序列化的结果。
+
+    handler 在监听线程中调用，需要访问 Tk 时由调用方自行切回 UI 线程。
+    """
+
+    def __init__(self, handler, name=APP_ID, directory=None):
+        self.handler = handler
+        self.name = name
+        self.directory = directory
+        self.path = _endpoint_path(name, directory)
+        self.token = "" if _use_unix_socket() else secrets.token_hex(16)
+        self._sock = None
+        self._thread = None
+
+    def start(self):
+        """开始监听；已有实例在运行时抛出 AlreadyRunning。"""
+        if is_running(self.name, self.directory):
+            raise AlreadyRunning(self.path)
+        if _use_unix_socket():
+            try:
+                os.remove(self.path)   # 上次异常退出留下的套接字文件
+            except FileNotFoundError:
+                pass
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            old_umask = os.umask(0o077)
+            try:
+                sock.bind(self.path)
+            finally:
+                os.umask(old_umask)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.bind(("127.0.0.1", 0))
+            info = {"port": sock.getsockname()[1], "token": self.token, "pid": os.getpid()}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(info, f)
+            os.replace(tmp_path, self.path)
+        sock.listen(8)
+        self._sock = sock
+        self._thread = threading.Thread(target=self._serve, name="instance-ipc", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        sock, self._sock = self._sock, None
+        if sock is None:
+            return
+        try:
+            sock.close()
+        finally:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def _serve(self):
+        while self._sock is not None:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return   # 已关闭
+            with conn:
+                try:
+                    conn.settimeout(REPLY_TIMEOUT)
+                    reply = self._handle(_read_line(conn))
+                    conn.sendall(json.dumps(reply, ensure_ascii=False).encode('utf-8') + b"\n")
+                except (OSError, ValueError):
+                    pass
+
+    def _handle(self, line):
+        try:
+            request = json.loads(line.decode('utf-8'))
+        except ValueError:
+            return {"ok": False, "error": "bad request"}
+        token = str(request.get("token", "")).encode('utf-8')
+        if not secrets.compare_digest(token, self.token.encode('utf-8')):
+            return {"ok": False, "error": "bad token"}
+        try:
+            result = self.handler(request.get("command"), request.get("args") or [])
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "result": result}
@@ -0,0 +1,21 @@
+"""程序入口（打包的 exe 从这里启动）。
+
+已有实例在运行时只导入 instance_ipc，把命令转发给它后立即退出，不加载 Tk、
+桌面访问与布局库等界面模块；没有实例时才导入 main_gui 启动界面。
+"""
+import sys
+
+import instance_ipc
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    exit_code = instance_ipc.forward(argv)
+    if exit_code is not None:
+        return exit_code
+    import main_gui
+    return main_gui.main(argv, forward=False)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
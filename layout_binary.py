@@ -0,0 +1,390 @@
+"""紧凑的二进制布局格式（.dil）。
+
+"3.6" JSON 中每个图标都重复 name/x/y/monitor/monitor_device/col/row 这些键，
+设备名也逐个图标重复。二进制格式把名称与设备名放进去重后的字符串表，
+图标坐标与网格位置存为定长记录，显示器等其余字段保留为一段 JSON 元数据。
+未压缩的文件可直接 mmap，通过 LayoutView 按需读取单个字段而不构造字典。
+
+文件结构（小端）：
+    文件头  magic(4) version(u16) flags(u16)
+            flags & FLAG_ZLIB 时，其后为 u32 原始长度 + zlib 压缩的正文
+    正文头  icon_count, string_count, string_offsets, string_blob,
+            records, meta_offset, meta_length（均为 u32，偏移相对正文起点）
+    字符串  u32 偏移表（string_count + 1 项）+ UTF-8 数据
+    记录    每个图标 24 字节，见 RECORD
+    元数据  UTF-8 JSON：除 icons 外的顶层字段（icons 处为 null 占位以保持键顺序）
+"""
+import argparse
+import json
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+
+from icon_table import (
+    F_COL, F_DEVICE, F_MONITOR, F_ROW, F_X, F_Y, NO_DEVICE, IconTable, _IconSequence,
+)
+
+MAGIC = b"DIL\x01"
+FORMAT_VERSION = 1
+FLAG_ZLIB = 0x0001
+
+FILE_HEADER = struct.Struct("<4sHH")
+BODY_HEADER = struct.Struct("<7I")
+# name_idx, device_idx, x, y, monitor, col, row, field_mask
+RECORD = struct.Struct("<IIiihhhBx")
+
+NO_STRING = 0xFFFFFFFF
+
+ICON_FIELDS = (
+    ("x", F_X), ("y", F_Y), ("monitor", F_MONITOR),
+    ("monitor_device", F_DEVICE), ("col", F_COL), ("row", F_ROW),
+)
+_INT_LIMITS = {
+    "x": (-2**31, 2**31 - 1), "y": (-2**31, 2**31 - 1),
+    "monitor": (-2**15, 2**15 - 1), "col": (-2**15, 2**15 - 1), "row": (-2**15, 2**15 - 1),
+}
+_KNOWN_KEYS = {"name"} | {key for key, _ in ICON_FIELDS}
+
+
+class LayoutFormatError(ValueError):
+    pass
+
+
+def is_binary(buffer):
+    return bytes(buffer[:4]) == MAGIC
+
+
+def _check_int(key, value):
+    low, high = _INT_LIMITS[key]
+    if type(value) is not int or not low <= value <= high:
+        raise LayoutFormatError(f"Icon field {key!r} cannot be stored losslessly: {value!r}")
+    return value
+
+
+def _pack_table_records(table, indices, intern):
+    records = bytearray(RECORD.size * len(indices))
+    device_strings = {}
+    names, xs, ys = table.name_column, table.x_column, table.y_column
+    monitors, devices = table.monitor_column, table.device_column
+    cols, rows, masks = table.col_column, table.row_column, table.mask_column
+    for k, i in enumerate(indices):
+        mask = masks[i]
+        for key, column in (("monitor", monitors), ("col", cols), ("row", rows)):
+            _check_int(key, column[i])
+        name_idx = intern(names[i])
+        device_idx = NO_STRING
+        device = devices[i]
+        if mask & F_DEVICE and device != NO_DEVICE:
+            device_idx = device_strings.get(device)
+            if device_idx is None:
+                device_idx = device_strings[device] = intern(table.devices[device])
+        RECORD.pack_into(records, k * RECORD.size, name_idx, device_idx,
+                         xs[i], ys[i], monitors[i], cols[i], rows[i], mask)
+    return records
+
+
+def _pack_dict_records(icons, intern):
+    records = bytearray(RECORD.size * len(icons))
+    for i, icon in enumerate(icons):
+        extra = set(icon) - _KNOWN_KEYS
+        if extra:
+            raise LayoutFormatError(f"Unsupported icon fields: {sorted(extra)}")
+        name = icon.get("name")
+        if not isinstance(name, str):
+            raise LayoutFormatError(f"Icon name must be a string: {name!r}")
+        device = icon.get("monitor_device")
+        if "monitor_device" in icon and not isinstance(device, str):
+            raise LayoutFormatError(f"monitor_device must be a string: {device!r}")
+
+        mask = 0
+        for key, bit in ICON_FIELDS:
+            if key in icon:
+                mask |= bit
+        RECORD.pack_into(
+            records, i * RECORD.size,
+            intern(name),
+            intern(device) if mask & F_DEVICE else NO_STRING,
+            _check_int("x", icon["x"]) if mask & F_X else 0,
+            _check_int("y", icon["y"]) if mask & F_Y else 0,
+            _check_int("monitor", icon["monitor"]) if mask & F_MONITOR else 0,
+            _check_int("col", icon["col"]) if mask & F_COL else 0,
+            _check_int("row", icon["row"]) if mask & F_ROW else 0,
+            mask)
+    return records
+
+
+def pack_layout(data, compress=False):
+    """把布局数据（"3.6" JSON 结构）编码为二进制。无法无损表示时抛出 LayoutFormatError。
+
+    icons 可以是 dict 列表，也可以是 IconTable / IconTableView。
+    """
+    icons = data.get("icons") or []
+    strings = []
+    string_ids = {}
+
+    def intern(text):
+        idx = string_ids.get(text)
+        if idx is None:
+            idx = string_ids[text] = len(strings)
+            strings.append(text)
+        return idx
+
+    if isinstance(icons, _IconSequence):
+        records = _pack_table_records(icons._table(), icons._indices(), intern)
+    else:
+        records = _pack_dict_records(icons, intern)
+    icon_count = len(icons)
+
+    encoded = [s.encode('utf-8') for s in strings]
+    offsets = [0]
+    for chunk in encoded:
+        offsets.append(offsets[-1] + len(chunk))
+    blob = b''.join(encoded)
+
+    meta = {key: (None if key == "icons" else value) for key, value in data.items()}
+    meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    string_offsets = BODY_HEADER.size
+    string_blob = string_offsets + 4 * len(offsets)
+    records_offset = string_blob + len(blob)
+    records_offset += -records_offset % 4
+    meta_offset = records_offset + len(records)
+
+    body = bytearray(meta_offset + len(meta_bytes))
+    BODY_HEADER.pack_into(body, 0, icon_count, len(strings), string_offsets, string_blob,
+                          records_offset, meta_offset, len(meta_bytes))
+    struct.pack_into(f"<{len(offsets)}I", body, string_offsets, *offsets)
+    body[string_blob:string_blob + len(blob)] = blob
+    body[records_offset:meta_offset] = records
+    body[meta_offset:] = meta_bytes
+
+    if compress:
+        return (FILE_HEADER.pack(MAGIC, FORMAT_VERSION, FLAG_ZLIB) +
+                struct.pack("<I", len(body)) + zlib.compress(bytes(body), 6))
+    return FILE_HEADER.pack(MAGIC, FORMAT_VERSION, 0) + bytes(body)
+
+
+class LayoutView:
+    """二进制布局的只读视图，字段按需从底层缓冲（bytes 或 mmap）解码。"""
+
+    def __init__(self, buffer):
+        magic, version, flags = FILE_HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise LayoutFormatError("Not a binary layout file")
+        if version > FORMAT_VERSION:
+            raise LayoutFormatError(f"Unsupported binary layout version {version}")
+        self._source = buffer
+        if flags & FLAG_ZLIB:
+            (length,) = struct.unpack_from("<I", buffer, FILE_HEADER.size)
+            body = zlib.decompress(bytes(buffer[FILE_HEADER.size + 4:]))
+            if len(body) != length:
+                raise LayoutFormatError("Corrupted compressed layout")
+            self._body = memoryview(body)
+        else:
+            self._body = memoryview(buffer)[FILE_HEADER.size:]
+        (self.icon_count, self.string_count, self._string_offsets, self._string_blob,
+         self._records, self._meta_offset, self._meta_length) = BODY_HEADER.unpack_from(self._body, 0)
+        self._strings = [None] * self.string_count
+        self._meta = None
+
+    def __len__(self):
+        return self.icon_count
+
+    def string(self, idx):
+        text = self._strings[idx]
+        if text is None:
+            start, end = struct.unpack_from("<II", self._body, self._string_offsets + 4 * idx)
+            text = self._strings[idx] = str(self._body[self._string_blob + start:
+                                                      self._string_blob + end], 'utf-8')
+        return text
+
+    def record(self, i):
+        """返回原始记录 (name_idx, device_idx, x, y, monitor, col, row, mask)。"""
+        if not 0 <= i < self.icon_count:
+            raise IndexError(i)
+        return RECORD.unpack_from(self._body, self._records + i * RECORD.size)
+
+    def iter_records(self):
+        end = self._records + self.icon_count * RECORD.size
+        return RECORD.iter_unpack(self._body[self._records:end])
+
+    def name(self, i):
+        return self.string(self.record(i)[0])
+
+    def position(self, i):
+        record = self.record(i)
+        return record[2], record[3]
+
+    def icon(self, i):
+        return self._record_to_dict(self.record(i))
+
+    def _record_to_dict(self, record):
+        name_idx, device_idx, x, y, monitor, col, row, mask = record
+        icon = {"name": self.string(name_idx)}
+        if mask & F_X:
+            icon["x"] = x
+        if mask & F_Y:
+            icon["y"] = y
+        if mask & F_MONITOR:
+            icon["monitor"] = monitor
+        if mask & F_DEVICE:
+            icon["monitor_device"] = self.string(device_idx)
+        if mask & F_COL:
+            icon["col"] = col
+        if mask & F_ROW:
+            icon["row"] = row
+        return icon
+
+    def icons(self):
+        return [self._record_to_dict(record) for record in self.iter_records()]
+
+    def icon_table(self):
+        """直接由记录构建 IconTable，不经过中间 dict。"""
+        table = IconTable()
+        string = self.string
+        device_map = {}
+        names = []
+        xs, ys = array('i'), array('i')
+        monitors, devices = array('i'), array('I')
+        cols, rows, masks = array('i'), array('i'), array('B')
+        for name_idx, device_idx, x, y, monitor, col, row, mask in self.iter_records():
+            names.append(string(name_idx))
+            xs.append(x)
+            ys.append(y)
+            monitors.append(monitor)
+            if mask & F_DEVICE:
+                device = device_map.get(device_idx)
+                if device is None:
+                    device = device_map[device_idx] = table.device_id(string(device_idx))
+                devices.append(device)
+            else:
+                devices.append(NO_DEVICE)
+            cols.append(col)
+            rows.append(row)
+            masks.append(mask)
+        table.name_column = [sys.intern(name) for name in names]
+        table.x_column, table.y_column = xs, ys
+        table.monitor_column, table.device_column = monitors, devices
+        table.col_column, table.row_column, table.mask_column = cols, rows, masks
+        return table
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            start = self._meta_offset
+            self._meta = json.loads(str(self._body[start:start + self._meta_length], 'utf-8'))
+        return self._meta
+
+    @property
+    def monitors(self):
+        return self.meta.get("monitors")
+
+    def to_dict(self, table=False):
+        data = dict(self.meta)
+        data["icons"] = self.icon_table() if table else self.icons()
+        return data
+
+    def release(self):
+        """释放对底层缓冲的引用（mmap 关闭前必须调用）。"""
+        self._body.release()
+
+
+class MappedLayout:
+    """以 mmap 打开二进制布局文件：with open_layout(path) as view: ..."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self.view = LayoutView(self._map)
+
+    def close(self):
+        if self._map is not None:
+            self.view.release()
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+    def __enter__(self):
+        return self.view
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_layout(path):
+    return MappedLayout(path)
+
+
+def unpack_layout(buffer, table=False):
+    """解码为布局数据字典；table=True 时 icons 为 IconTable。"""
+    view = LayoutView(buffer)
+    try:
+        return view.to_dict(table)
+    finally:
+        view.release()
+
+
+def load_layout(path, table=False):
+    """读取布局文件，自动识别二进制或 JSON 格式，返回布局数据字典。
+
+    二进制文件经 open_layout() 映射到内存后直接从映射中解码，不先整体读入。
+    """
+    with open(path, 'rb') as f:
+        head = f.read(len(MAGIC))
+    if is_binary(head):
+        with open_layout(path) as view:
+            return view.to_dict(table)
+    with open(path, 'rb') as f:
+        data = json.loads(f.read().decode('utf-8'))
+    if table and "icons" in data:
+        data["icons"] = IconTable.from_dicts(data["icons"])
+    return data
+
+
+def json_to_binary(src, dst, compress=False):
+    with open(src, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    with open(dst, 'wb') as f:
+        f.write(pack_layout(data, compress))
+    return len(data.get("icons") or [])
+
+
+def binary_to_json(src, dst):
+    data = load_layout(src)
+    with open(dst, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    return len(data.get("icons") or [])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="布局文件 JSON ⇄ 二进制格式转换")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_import = sub.add_parser("import", help="JSON → 二进制")
+    p_import.add_argument("src")
+    p_import.add_argument("dst")
+    p_import.add_argument("--compress", action="store_true")
+    p_export = sub.add_parser("export", help="二进制 → JSON")
+    p_export.add_argument("src")
+    p_export.add_argument("dst")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "import":
+            count = json_to_binary(args.src, args.dst, args.compress)
+        else:
+            count = binary_to_json(args.src, args.dst)
+    except (OSError, ValueError) as e:
+        print(f"转换失败: {e}", file=sys.stderr)
+        return 1
+    print(f"{count} icons")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""布局库的持久化。
+
+每个布局的图标数据单独存放在 <库目录>/<id>.dil（layout_binary 二进制格式，
+读取时经 mmap 直接解码；无法无损表示时退回 <id>.json），顺序与名称等元信息存放在
+<库目录>/index.json。改名、删除、排序只重写很小的索引，保存布局只写入该布局
+自己的文件；所有写入都先写临时文件再原子替换，中途崩溃不会损坏已有数据。
+首次加载时自动把旧版单文件 desktop_layouts.json 拆分迁移到库目录。
+
+启动时只读取索引：layouts 中每项只是轻量的头信息（id、名称、时间、图标数、指纹、
+内容摘要），图标数据在恢复、预览等需要时由 get_data() 按需读取，并保存在按图标数
+限量的 LRU 中。
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+import display_topology
+import layout_binary
+from icon_table import IconTable, to_plain
+from plan_cache import PLAN_DIR, PlanCache
+
+CONFIG_FILE = "desktop_layouts.json"
+INDEX_FILE = "index.json"
+INDEX_VERSION = 2
+HEADER_KEYS = ("id", "name", "saved", "timestamp", "icon_count", "fingerprint", "content_hash")
+CACHE_MAX_ICONS = 20000   # LRU 中最多保留的图标总数（约数 MB）
+
+
+def _atomic_write_bytes(path, payload):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _atomic_write_json(path, obj, indent=None):
+    _atomic_write_bytes(path, json.dumps(obj, indent=indent, ensure_ascii=False).encode('utf-8'))
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _icon_count(data):
+    return len(data.get("icons", [])) if data else 0
+
+
+def content_hash(data):
+    """布局内容（显示器与图标）的摘要，用作缩略图等派生数据的缓存键。"""
+    if not data:
+        return None
+    icons = IconTable.coerce(data.get("icons"))
+    digest = hashlib.sha1()
+    digest.update(json.dumps(data.get("monitors") or [], sort_keys=True,
+                             ensure_ascii=False).encode('utf-8'))
+    digest.update("\0".join(icons.names()).encode('utf-8'))
+    for field in ("x", "y", "monitor", "col", "row"):
+        digest.update(array('i', icons.column(field)).tobytes())
+    return digest.hexdigest()[:16]
+
+
+class _PayloadCache:
+    """按图标总数限量的 LRU，键为布局 id。"""
+
+    def __init__(self, max_icons=CACHE_MAX_ICONS):
+        self.max_icons = max_icons
+        self._items = OrderedDict()
+        self._icons = 0
+        self._lock = threading.Lock()
+
+    def get(self, layout_id):
+        with self._lock:
+            data = self._items.get(layout_id)
+            if data is not None:
+                self._items.move_to_end(layout_id)
+            return data
+
+    def put(self, layout_id, data):
+        with self._lock:
+            self._discard(layout_id)
+            self._items[layout_id] = data
+            self._icons += _icon_count(data)
+            # 至少保留刚放入的一项
+            while self._icons > self.max_icons and len(self._items) > 1:
+                oldest = next(iter(self._items))
+                self._discard(oldest)
+
+    def discard(self, layout_id):
+        with self._lock:
+            self._discard(layout_id)
+
+    def _discard(self, layout_id):
+        data = self._items.pop(layout_id, None)
+        if data is not None:
+            self._icons -= _icon_count(data)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._icons = 0
+
+
+class LayoutManager:
+    def __init__(self, filename=CONFIG_FILE, cache_max_icons=CACHE_MAX_ICONS):
+        self.filename = filename
+        self.store_dir = os.path.splitext(filename)[0]
+        self.index_path = os.path.join(self.store_dir, INDEX_FILE)
+        self.layouts = []
+        self._by_fingerprint = {}
+        self._cache = _PayloadCache(cache_max_icons)
+        self.plans = PlanCache(os.path.join(self.store_dir, PLAN_DIR))
+        self.load()
+
+    # ---- 加载与迁移 ----
+
+    def load(self):
+        self.layouts = []
+        self._cache.clear()
+        if os.path.exists(self.index_path):
+            self._load_store()
+        elif os.path.exists(self.filename):
+            self._migrate_legacy(self.filename, keep_backup=True)
+        elif os.path.exists("desktop_layout.json"):
+            self._migrate_single("desktop_layout.json")
+
+        # 为旧版本索引补齐图标数与拓扑指纹（只在第一次加载时读取数据文件）
+        backfilled = False
+        for layout in self.layouts:
+            if any(key not in layout for key in ("fingerprint", "icon_count", "content_hash")):
+                data = self.get_data(layout)
+                layout["icon_count"] = _icon_count(data)
+                layout["fingerprint"] = self._compute_fingerprint(layout, data)
+                layout["content_hash"] = content_hash(data)
+                backfilled = True
+        self._rebuild_index()
+        if backfilled:
+            try:
+                self._write_index()
+            except Exception as e:
+                print(f"Save failed: {e}")
+
+    def _load_store(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.layouts = json.load(f).get("layouts", [])
+        except Exception as e:
+            print(f"Load failed: {e}")
+            self.layouts = []
+
+    def _adopt(self, layout):
+        """把带完整数据的布局写入库中，并在 layouts 中只保留头信息。"""
+        data = layout.get("data")
+        header = {k: v for k, v in layout.items() if k != "data"}
+        header["icon_count"] = _icon_count(data)
+        header["fingerprint"] = self._compute_fingerprint(header, data)
+        header["content_hash"] = content_hash(data)
+        if data is not None:
+            self._write_payload(header["id"], data)
+            self._cache.put(header["id"], data)
+        self.layouts.append(header)
+
+    def _migrate_legacy(self, filename, keep_backup):
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                legacy = json.load(f).get("layouts", [])
+        except Exception as e:
+            print(f"Load failed: {e}")
+            return
+        try:
+            for layout in legacy:
+                self._adopt(layout)
+            self._write_index()
+            if keep_backup:
+                os.replace(filename, filename + ".bak")
+        except Exception as e:
+            print(f"Migration failed: {e}")
+
+    def _migrate_single(self, filename):
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                old_data = json.load(f)
+            self._adopt({
+                "id": str(int(time.time())),
+                "name": "默认配置",
+                "saved": True,
+                "timestamp": time.time(),
+                "data": old_data,
+            })
+            self._write_index()
+        except Exception:
+            pass
+
+    # ---- 文件读写 ----
+
+    def _payload_path(self, layout_id, ext=".dil"):
+        return os.path.join(self.store_dir, f"{layout_id}{ext}")
+
+    def _read_payload(self, layout_id):
+        try:
+            binary_path = self._payload_path(layout_id)
+            if os.path.exists(binary_path):
+                return layout_binary.load_layout(binary_path, table=True)
+            with open(self._payload_path(layout_id, ".json"), 'r', encoding='utf-8') as f:
+                data = json.load(f).get("data")
+            if data and data.get("icons") is not None:
+                data["icons"] = IconTable.from_dicts(data["icons"])
+            return data
+        except Exception as e:
+            print(f"Load layout {layout_id} failed: {e}")
+            return None
+
+    def _write_payload(self, layout_id, data):
+        os.makedirs(self.store_dir, exist_ok=True)
+        try:
+            payload = layout_binary.pack_layout(data)
+        except layout_binary.LayoutFormatError as e:
+            print(f"Binary encode of layout {layout_id} failed, using JSON: {e}")
+            _atomic_write_json(self._payload_path(layout_id, ".json"),
+                               {"id": layout_id, "data": to_plain(data)})
+            _remove(self._payload_path(layout_id))
+            return
+        _atomic_write_bytes(self._payload_path(layout_id), payload)
+        _remove(self._payload_path(layout_id, ".json"))
+
+    def _write_index(self):
+        os.makedirs(self.store_dir, exist_ok=True)
+        headers = [{k: layout.get(k) for k in HEADER_KEYS} for layout in self.layouts]
+        _atomic_write_json(self.index_path, {"version": INDEX_VERSION, "layouts": headers},
+                           indent=2)
+
+    def save(self):
+        """写出索引（数据文件在保存布局时已单独写入）。"""
+        self._write_index()
+
+    def get_data(self, layout):
+        """返回布局的完整数据（monitors、icons 等），未保存或读取失败时返回 None。"""
+        if not layout.get("saved"):
+            return None
+        layout_id = layout["id"]
+        data = self._cache.get(layout_id)
+        if data is None:
+            data = self._read_payload(layout_id)
+            if data is not None:
+                self._cache.put(layout_id, data)
+        return data
+
+    # ---- 拓扑指纹索引 ----
+
+    @staticmethod
+    def _compute_fingerprint(layout, data):
+        if not layout.get("saved") or not data:
+            return None
+        return display_topology.topology_fingerprint(data.get("monitors"))
+
+    def _rebuild_index(self):
+        index = {}
+        for layout in self.layouts:
+            fingerprint = layout.get("fingerprint")
+            if fingerprint:
+                index.setdefault(fingerprint, []).append(layout)
+        self._by_fingerprint = index
+
+    def layouts_for_fingerprint(self, fingerprint):
+        """返回与该拓扑指纹匹配的布局列表（按列表顺序）。"""
+        return self._by_fingerprint.get(fingerprint, [])
+
+    def find_layout(self, target):
+        """按 id、再按名称查找布局，返回下标，找不到返回 None。"""
+        for key in ("id", "name"):
+            for index, layout in enumerate(self.layouts):
+                if layout.get(key) == target:
+                    return index
+        return None
+
+    def best_layout(self, fingerprint=None):
+        """与指定（默认为当前）拓扑匹配的最近保存的布局，没有则返回 None。"""
+        if fingerprint is None:
+            fingerprint = display_topology.current_fingerprint()
+        matches = self.layouts_for_fingerprint(fingerprint)
+        if not matches:
+            return None
+        return max(matches, key=lambda layout: layout.get("timestamp") or 0)
+
+    # ---- 编辑 ----
+
+    def add_layout(self):
+        new_layout = {
+            "id": str(int(time.time() * 1000)),
+            "name": "",
+            "saved": False,
+            "timestamp": None,
+            "icon_count": 0,
+            "fingerprint": None,
+            "content_hash": None,
+        }
+        self.layouts.append(new_layout)
+        return new_layout
+
+    def delete_layout(self, index):
+        if 0 <= index < len(self.layouts):
+            layout = self.layouts.pop(index)
+            self._cache.discard(layout["id"])
+            self.plans.discard(layout["id"])
+            self._rebuild_index()
+            # 先更新索引再删数据文件：崩溃时最多留下无引用的文件
+            self._write_index()
+            _remove(self._payload_path(layout["id"]))
+            _remove(self._payload_path(layout["id"], ".json"))
+
+    def update_layout(self, index, name=None, data=None):
+        if 0 <= index < len(self.layouts):
+            layout = self.layouts[index]
+            if name is not None:
+                layout["name"] = name
+            if data is not None:
+                self._write_payload(layout["id"], data)
+                self._cache.put(layout["id"], data)
+                self.plans.discard(layout["id"])
+                layout["saved"] = True
+                layout["timestamp"] = time.time()
+                layout["icon_count"] = _icon_count(data)
+                layout["fingerprint"] = self._compute_fingerprint(layout, data)
+                layout["content_hash"] = content_hash(data)
+                self._rebuild_index()
+            self._write_index()
+
+    def move_layout(self, from_index, to_index):
+        if 0 <= from_index < len(self.layouts) and 0 <= to_index < len(self.layouts):
+            item = self.layouts.pop(from_index)
+            self.layouts.insert(to_index, item)
+            self._rebuild_index()
+            self._write_index()
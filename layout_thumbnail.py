@@ -0,0 +1,147 @@
+"""布局列表中的缩略图。
+
+缩略图由后台线程用 PIL 绘制，保存在 <缓存目录>/<内容摘要>.png。摘要来自布局头信息
+中的 content_hash（见 layout_store.content_hash），只有重新保存布局时才会变化，
+因此浏览布局库时只需读取已有的小 PNG，不会读取图标数据或进行画布绘制。
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from icon_table import IconTable
+
+THUMB_SIZE = (96, 36)
+THUMB_DIR = "thumbs"
+MEMORY_CACHE_SIZE = 256
+
+BACKGROUND = (0, 0, 0, 0)
+MONITOR_FILL = (45, 52, 54, 255)
+PRIMARY_FILL = (30, 58, 95, 255)
+MONITOR_OUTLINE = (85, 85, 85, 255)
+DOT_FILL = (243, 156, 18, 255)
+
+
+def render_thumbnail(data, size=THUMB_SIZE):
+    """把显示器矩形和图标位置按比例画成一张 RGBA 小图。"""
+    from PIL import Image, ImageDraw   # 只在后台线程中首次绘制时导入
+    w, h = size
+    image = Image.new("RGBA", size, BACKGROUND)
+    monitors = data.get("monitors") or []
+    if not monitors:
+        return image
+    draw = ImageDraw.Draw(image)
+
+    min_x = min(m['rect'][0] for m in monitors)
+    min_y = min(m['rect'][1] for m in monitors)
+    virtual_width = max(m['rect'][2] for m in monitors) - min_x
+    virtual_height = max(m['rect'][3] for m in monitors) - min_y
+    if virtual_width <= 0 or virtual_height <= 0:
+        return image
+    scale = min((w - 2) / virtual_width, (h - 2) / virtual_height)
+    origin_x = (w - virtual_width * scale) / 2 - min_x * scale
+    origin_y = (h - virtual_height * scale) / 2 - min_y * scale
+
+    for m in monitors:
+        left, top, right, bottom = m['rect']
+        draw.rectangle((origin_x + left * scale, origin_y + top * scale,
+                        origin_x + right * scale - 1, origin_y + bottom * scale - 1),
+                       fill=PRIMARY_FILL if m.get('is_primary') else MONITOR_FILL,
+                       outline=MONITOR_OUTLINE)
+
+    icons = IconTable.coerce(data.get("icons"))
+    point = draw.point
+    for x, y in zip(icons.column("x"), icons.column("y")):
+        point((int(origin_x + x * scale), int(origin_y + y * scale)), fill=DOT_FILL)
+    return image
+
+
+class ThumbnailCache:
+    """缩略图的磁盘缓存与后台生成线程。
+
+    request() 立即返回；结果通过 callback(layout_id, digest, image) 在后台线程中
+    回调，调用方负责切回 UI 线程。同一布局的多次请求只保留最后一次，最近的请求
+    最先处理（列表滚动时优先处理当前可见的行）。
+    """
+
+    def __init__(self, cache_dir, load_data, size=THUMB_SIZE, memory_size=MEMORY_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.load_data = load_data
+        self.size = size
+        self.memory_size = memory_size
+        self._images = OrderedDict()   # digest -> Image
+        self._pending = OrderedDict()  # layout_id -> (layout, callback)
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.png")
+
+    def cached(self, digest):
+        """内存中已有的缩略图，没有则返回 None（不读磁盘）。"""
+        with self._cond:
+            image = self._images.get(digest)
+            if image is not None:
+                self._images.move_to_end(digest)
+            return image
+
+    def request(self, layout, callback):
+        digest = layout.get("content_hash")
+        if not layout.get("saved") or not digest:
+            return
+        with self._cond:
+            self._pending.pop(layout["id"], None)
+            self._pending[layout["id"]] = (layout, callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def discard(self, digest):
+        """删除某个摘要对应的缓存文件（布局被重新保存或删除后调用）。"""
+        if not digest:
+            return
+        with self._cond:
+            self._images.pop(digest, None)
+        try:
+            os.remove(self.path(digest))
+        except OSError:
+            pass
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                _, (layout, callback) = self._pending.popitem(last=True)
+            digest = layout.get("content_hash")
+            try:
+                image = self._load(layout, digest)
+            except Exception as e:
+                print(f"Thumbnail for {layout.get('id')} failed: {e}")
+                continue
+            if image is not None:
+                callback(layout["id"], digest, image)
+
+    def _load(self, layout, digest):
+        image = self.cached(digest)
+        if image is not None:
+            return image
+        path = self.path(digest)
+        if os.path.exists(path):
+            from PIL import Image
+            with Image.open(path) as f:
+                image = f.convert("RGBA")
+        else:
+            data = self.load_data(layout)
+            if not data:
+                return None
+            image = render_thumbnail(data, self.size)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            image.save(tmp_path, format="PNG")
+            os.replace(tmp_path, path)
+        with self._cond:
+            self._images[digest] = image
+            while len(self._images) > self.memory_size:
+                self._images.popitem(last=False)
+        return image
@@ -0,0 +1,208 @@
+"""桌面 ListView 批量访问引擎。
+
+逐个图标读写需要为每个图标单独分配缓冲、写入 LVITEM、再分别读取文本和坐标。
+这里把所有图标的 LVITEM、文本缓冲与 POINT 排布在同一块可复用的远程内存中，
+一次写入、批量读回，只剩下无法合并的 SendMessage。
+移动同理：全部 POINT 一次写入，关闭重绘后连续投递，最后以带超时的消息作为屏障。
+"""
+import struct
+
+import metrics
+from desktop_backend import (
+    LVIF_TEXT, LVM_GETITEMCOUNT, LVM_GETITEMPOSITION, LVM_GETITEMTEXTW,
+    LVM_SETITEMPOSITION32, WM_NULL, WM_SETREDRAW, logging,
+)
+
+LVITEM_SIZE     = 128        # 每个 LVITEMW 槽位（x64 结构体小于 128 字节）
+TEXT_CHARS      = 512        # cchTextMax
+TEXT_BYTES      = TEXT_CHARS * 2
+POINT_SIZE      = 8
+READ_CHUNK      = 1 << 20    # 单次 ReadProcessMemory 的上限
+ARENA_GRANULARITY = 1 << 16  # 与 VirtualAllocEx 的分配粒度对齐
+MOVE_CHUNK      = 64         # 每投递多少个移动回调一次进度
+BARRIER_TIMEOUT_MS = 5000
+
+
+class RemoteArena:
+    """目标进程中的一块可复用内存，容量不足时整体重新分配。"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.address = 0
+        self.capacity = 0
+
+    def reserve(self, size):
+        """保证至少 size 字节可用，返回基址；分配失败返回 0。"""
+        if size <= self.capacity and self.address:
+            return self.address
+        self.release()
+        capacity = -(-max(size, 1) // ARENA_GRANULARITY) * ARENA_GRANULARITY
+        address = self.backend.alloc(capacity)
+        if not address:
+            return 0
+        self.address = address
+        self.capacity = capacity
+        return address
+
+    def release(self):
+        if self.address:
+            self.backend.free(self.address)
+        self.address = 0
+        self.capacity = 0
+
+    def abandon(self):
+        """放弃当前区域而不释放：目标进程可能仍有未处理的消息引用它。"""
+        self.address = 0
+        self.capacity = 0
+
+
+def _decode_text(raw, start, length):
+    """按 LVM_GETITEMTEXTW 返回的字符数解码；返回值异常时扫描 UTF-16 结束符。"""
+    if 0 <= length < TEXT_CHARS:
+        end = start + length * 2
+    else:
+        limit = start + TEXT_BYTES
+        end = raw.find(b'\x00\x00', start, limit)
+        while end != -1 and (end - start) % 2:
+            end = raw.find(b'\x00\x00', end + 1, limit)
+        if end == -1:
+            end = limit
+    return raw[start:end].decode('utf-16-le', errors='replace')
+
+
+class SnapshotEngine:
+    """一次性读取全部图标的名称与 LVM 坐标。
+
+    远程内存布局：[LVITEM × n][POINT × n][TEXT × n]。
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.arena = RemoteArena(backend)
+        self._items_key = None
+        self._items_blob = b''
+
+    def _build_items(self, base, count):
+        key = (base, count)
+        if self._items_key == key:
+            return self._items_blob
+        text_base = base + count * (LVITEM_SIZE + POINT_SIZE)
+        blob = bytearray(count * LVITEM_SIZE)
+        for i in range(count):
+            offset = i * LVITEM_SIZE
+            struct.pack_into("<Iii", blob, offset, LVIF_TEXT, i, 0)
+            struct.pack_into("<Qi", blob, offset + 24, text_base + i * TEXT_BYTES, TEXT_CHARS)
+        self._items_key = key
+        self._items_blob = bytes(blob)
+        return self._items_blob
+
+    def snapshot(self):
+        """返回 [(name, lvm_x, lvm_y), ...]，顺序即 ListView 索引。"""
+        backend = self.backend
+        count = backend.send_message(LVM_GETITEMCOUNT, 0, 0)
+        if count <= 0:
+            return []
+
+        base = self.arena.reserve(count * (LVITEM_SIZE + POINT_SIZE + TEXT_BYTES))
+        if not base:
+            logging.error(f"Failed to allocate snapshot arena for {count} items")
+            return []
+        point_base = base + count * LVITEM_SIZE
+        text_base = point_base + count * POINT_SIZE
+
+        backend.write(base, self._build_items(base, count))
+
+        lengths = [0] * count
+        send = backend.send_message
+        for i in range(count):
+            lengths[i] = send(LVM_GETITEMTEXTW, i, base + i * LVITEM_SIZE)
+            send(LVM_GETITEMPOSITION, i, point_base + i * POINT_SIZE)
+
+        points = struct.unpack(f"<{count * 2}i", backend.read(point_base, count * POINT_SIZE))
+
+        results = []
+        per_chunk = max(1, READ_CHUNK // TEXT_BYTES)
+        for first in range(0, count, per_chunk):
+            last = min(count, first + per_chunk)
+            raw = backend.read(text_base + first * TEXT_BYTES, (last - first) * TEXT_BYTES)
+            for i in range(first, last):
+                name = _decode_text(raw, (i - first) * TEXT_BYTES, lengths[i])
+                results.append((name, points[2 * i], points[2 * i + 1]))
+        return results
+
+    def close(self):
+        self.arena.release()
+        self._items_key = None
+        self._items_blob = b''
+
+
+class MoveEngine:
+    """批量移动图标。
+
+    所有 POINT 预先写入远程数组，WM_SETREDRAW 关闭重绘后用 send_notify
+    连续投递 LVM_SETITEMPOSITION32，末尾发送带超时的 WM_NULL 等待队列处理完毕，
+    最后恢复重绘并整体刷新一次。
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.arena = RemoteArena(backend)
+
+    def move_batch(self, moves, progress_callback=None, timeout_ms=BARRIER_TIMEOUT_MS, cancel=None):
+        """moves 为 [(index, x, y), ...]（LVM 坐标），返回成功投递的数量。
+
+        cancel 为 threading.Event，置位后在下一批（MOVE_CHUNK 个）之间停止投递。
+        """
+        total = len(moves)
+        if not total:
+            return 0
+
+        base = self.arena.reserve(total * POINT_SIZE)
+        if not base:
+            logging.error(f"Failed to allocate move arena for {total} items")
+            return 0
+
+        coords = []
+        for _, x, y in moves:
+            coords.append(x)
+            coords.append(y)
+        backend = self.backend
+        backend.write(base, struct.pack(f"<{total * 2}i", *coords))
+
+        moved = 0
+        backend.send_message(WM_SETREDRAW, 0, 0)
+        try:
+            with metrics.span("move"):
+                notify = backend.send_notify
+                for k, (index, _, _) in enumerate(moves):
+                    if notify(LVM_SETITEMPOSITION32, index, base + k * POINT_SIZE):
+                        moved += 1
+                    if (k + 1) % MOVE_CHUNK == 0:
+                        if progress_callback:
+                            try:
+                                progress_callback(moved, total)
+                            except Exception:
+                                pass
+                        if cancel is not None and cancel.is_set():
+                            logging.info(f"Move cancelled after {k + 1}/{total}")
+                            break
+        finally:
+            # 屏障等待 Explorer 处理完队列中的移动，随后整窗重绘一次
+            with metrics.span("repaint"):
+                ok, _ = backend.send_message_timeout(WM_NULL, 0, 0, timeout_ms)
+                if not ok:
+                    # 队列中的消息仍引用这块内存，不能释放或复用
+                    logging.warning(f"Move barrier timed out after {timeout_ms} ms")
+                    self.arena.abandon()
+                backend.send_message(WM_SETREDRAW, 1, 0)
+                backend.invalidate()
+
+        if progress_callback:
+            try:
+                progress_callback(moved, total)
+            except Exception:
+                pass
+        return moved
+
+    def close(self):
+        self.arena.release()
@@ -1,109 +1,64 @@
-import ctypes
-try:
-    ctypes.windll.shcore.SetProcessDpiAwareness(2)
-except Exception:
-    try:
-        ctypes.windll.user32.SetProcessDPIAware()
-    except Exception:
-        pass
+from desktop_backend import enable_dpi_awareness
+enable_dpi_awareness()
 
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.dialogs import Messagebox
 import tkinter as tk
 import desktop_manager
+import instance_ipc
 import sys
+from desktop_jobs import DesktopJobExecutor
+from progress_channel import POLL_INTERVAL_MS, ProgressChannel
+import display_topology
+import metrics
+from layout_store import LayoutManager
+from layout_thumbnail import MEMORY_CACHE_SIZE, THUMB_DIR, THUMB_SIZE, ThumbnailCache
 import os
-import json
 import threading
-import time
 import datetime
-import pystray
-from PIL import Image, ImageDraw, ImageTk
-import base64
-import io
-from ttkbootstrap.icons import Icon
+from collections import OrderedDict
 
-CONFIG_FILE = "desktop_layouts.json"
 
+REMOTE_TIMEOUT = 5.0   # 转发命令等待 UI 线程处理的最长时间（秒）
+TRACE_FILE = "metrics_trace.jsonl"
+DIAGNOSTICS_REFRESH_MS = 1000
 
-class LayoutManager:
-    def __init__(self, filename=CONFIG_FILE):
-        self.filename = filename
-        self.layouts = []
-        self.load()
 
-    def load(self):
-        if os.path.exists(self.filename):
-            try:
-                with open(self.filename, 'r', encoding='utf-8') as f:
-                    self.layouts = json.load(f).get("layouts", [])
-            except Exception as e:
-                print(f"Load failed: {e}")
-                self.layouts = []
-        elif os.path.exists("desktop_layout.json"):
-            try:
-                with open("desktop_layout.json", 'r', encoding='utf-8') as f:
-                    old_data = json.load(f)
-                    self.layouts.append({
-                        "id": str(int(time.time())),
-                        "name": "默认配置",
-                        "saved": True,
-                        "timestamp": time.time(),
-                        "data": old_data,
-                    })
-            except Exception:
-                pass
-
-    def save(self):
-        with open(self.filename, 'w', encoding='utf-8') as f:
-            json.dump({"layouts": self.layouts}, f, indent=2, ensure_ascii=False)
-
-    def add_layout(self):
-        new_layout = {
-            "id": str(int(time.time() * 1000)),
-            "name": "",
-            "saved": False,
-            "timestamp": None,
-            "data": None,
-        }
-        self.layouts.append(new_layout)
-        return new_layout
-
-    def delete_layout(self, index):
-        if 0 <= index < len(self.layouts):
-            del self.layouts[index]
-            self.save()
-
-    def update_layout(self, index, name=None, data=None):
-        if 0 <= index < len(self.layouts):
-            if name is not None:
-                self.layouts[index]["name"] = name
-            if data is not None:
-                self.layouts[index]["data"] = data
-                self.layouts[index]["saved"] = True
-                self.layouts[index]["timestamp"] = time.time()
-            self.save()
-
-    def move_layout(self, from_index, to_index):
-        if 0 <= from_index < len(self.layouts) and 0 <= to_index < len(self.layouts):
-            item = self.layouts.pop(from_index)
-            self.layouts.insert(to_index, item)
-            self.save()
+# 对话框、托盘（pystray）、PIL 与预览绘制只在第一次用到时导入，缩短冷启动时间
+
+def _messagebox():
+    from ttkbootstrap.dialogs import Messagebox
+    return Messagebox
+
+
+def _tray_image():
+    import base64
+    import io
+    from PIL import Image
+    from ttkbootstrap.icons import Icon
+    return Image.open(io.BytesIO(base64.b64decode(Icon.icon)))
 
 
 class ScrollableFrame(ttk.Frame):
-    def __init__(self, container, *args, **kwargs):
-        super().__init__(container, *args, **kwargs)
-        self.canvas = tk.Canvas(self, borderwidth=0, highlightthickness=0)
-        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = ttk.Frame(self.canvas)
+    """虚拟化的滚动列表：只为可见区域创建行控件，滚动时回收复用。
+
+    create_row(parent) 创建一个空行，bind_row(row, index) 把行绑定到第 index 项。
+    行高取第一个创建的行的请求高度，所有行高度相同。
+    """
 
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
+    def __init__(self, container, create_row, bind_row, row_gap=10, *args, **kwargs):
+        super().__init__(container, *args, **kwargs)
+        self.create_row = create_row
+        self.bind_row = bind_row
+        self.row_gap = row_gap
+        self.row_height = None
+        self.count = 0
+        self._visible = {}    # index -> row
+        self._pool = []       # 已隐藏、可复用的行
+        self._windows = {}    # row -> canvas window id
 
-        self.canvas_window = self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
+        self.canvas = tk.Canvas(self, borderwidth=0, highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._yview)
         self.canvas.bind('<Configure>', self._on_canvas_configure)
         self.canvas.configure(yscrollcommand=self.scrollbar.set)
         self.canvas.pack(side="left", fill="both", expand=True)
@@ -117,78 +72,190 @@ class ScrollableFrame(ttk.Frame):
         except Exception:
             pass
 
+    # ---- 对外接口 ----
+
+    def set_count(self, count):
+        """列表长度变化后调用；已显示的行保持绑定，需要时再调用 refresh()。"""
+        self.count = count
+        self._update_scrollregion()
+        self._update_view()
+
+    def refresh(self, start=0, stop=None):
+        """重新绑定 [start, stop) 范围内当前可见的行。"""
+        stop = self.count if stop is None else stop
+        for index, row in self._visible.items():
+            if start <= index < stop:
+                self.bind_row(row, index)
+
+    def refresh_row(self, index):
+        self.refresh(index, index + 1)
+
+    def visible_rows(self):
+        return list(self._visible.values())
+
+    def see(self, index):
+        """滚动使第 index 项可见。"""
+        if not self.row_height or not self.count:
+            return
+        top = self.canvas.canvasy(0)
+        height = self.canvas.winfo_height()
+        y = index * self.row_height
+        if y < top:
+            self.canvas.yview_moveto(y / (self.count * self.row_height))
+        elif y + self.row_height > top + height:
+            self.canvas.yview_moveto((y + self.row_height - height) / (self.count * self.row_height))
+        self._update_view()
+
+    # ---- 虚拟化 ----
+
+    def _yview(self, *args):
+        self.canvas.yview(*args)
+        self._update_view()
+
     def _on_canvas_configure(self, event):
-        self.canvas.itemconfig(self.canvas_window, width=event.width)
+        for window in self._windows.values():
+            self.canvas.itemconfig(window, width=event.width)
+        self._update_scrollregion()
+        self._update_view()
 
     def _on_mousewheel(self, event):
-        if self.scrollable_frame.winfo_height() > self.canvas.winfo_height():
+        if self.row_height and self.count * self.row_height > self.canvas.winfo_height():
             self.canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
+            self._update_view()
+
+    def _update_scrollregion(self):
+        total = self.count * (self.row_height or 0)
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), total),
+                              yscrollincrement=self.row_height or 0)
+
+    def _new_row(self):
+        row = self.create_row(self.canvas)
+        window = self.canvas.create_window((0, 0), window=row, anchor="nw", state="hidden",
+                                           width=self.canvas.winfo_width())
+        self._windows[row] = window
+        if self.row_height is None:
+            row.update_idletasks()
+            self.row_height = row.winfo_reqheight() + self.row_gap
+            self._update_scrollregion()
+        return row
+
+    def _update_view(self):
+        if self.count and self.row_height is None:
+            self._pool.append(self._new_row())   # 先创建一行用于测量行高
+        if self.count == 0:
+            first, last = 0, 0
+        else:
+            top = max(0, self.canvas.canvasy(0))
+            height = max(self.canvas.winfo_height(), self.row_height)
+            first = min(int(top // self.row_height), self.count)
+            last = min(int((top + height) // self.row_height) + 1, self.count)
+
+        for index in [i for i in self._visible if not first <= i < last]:
+            row = self._visible.pop(index)
+            self.canvas.itemconfigure(self._windows[row], state="hidden")
+            self._pool.append(row)
+
+        for index in range(first, last):
+            if index in self._visible:
+                continue
+            row = self._pool.pop() if self._pool else self._new_row()
+            self._visible[index] = row
+            self.bind_row(row, index)
+            window = self._windows[row]
+            self.canvas.coords(window, 0, index * self.row_height + self.row_gap // 2)
+            self.canvas.itemconfigure(window, state="normal")
 
 
 class LayoutRow(ttk.Frame):
-    def __init__(self, parent, app, index, layout, *args, **kwargs):
+    """布局列表中的一行。控件只创建一次，assign() 把它绑定到某个布局。"""
+
+    def __init__(self, parent, app, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
         self.app = app
-        self.index = index
-        self.layout = layout
+        self.index = None
+        self.layout = None
 
         self.configure(bootstyle="light", padding="2")
         inner = ttk.Frame(self, bootstyle="light", padding="10 5")
         inner.pack(fill="x")
-        inner.columnconfigure(2, weight=1)
+        inner.columnconfigure(3, weight=1)
 
         self.indicator_lbl = ttk.Label(inner, text="", font=("Segoe UI Emoji", 12),
                                        width=3, anchor="center", bootstyle="warning")
         self.indicator_lbl.grid(row=0, column=0, padx=(0, 5))
 
-        self.name_var = tk.StringVar(value=layout["name"])
-        if layout["saved"]:
-            name_entry = ttk.Entry(inner, textvariable=self.name_var, state="readonly",
-                                   font=("Microsoft YaHei UI", 10), width=15, bootstyle="secondary")
-        else:
-            name_entry = ttk.Entry(inner, textvariable=self.name_var,
-                                   font=("Microsoft YaHei UI", 10), width=15, bootstyle="primary")
-            def on_name_change(*args):
-                self.app.manager.update_layout(self.index, name=self.name_var.get())
-            name_entry.bind("<FocusOut>", on_name_change)
-            name_entry.bind("<Return>", on_name_change)
-        name_entry.grid(row=0, column=1, padx=(0, 10), sticky="w")
+        self.thumb_lbl = ttk.Label(inner, image=app.blank_thumbnail, bootstyle="light")
+        self.thumb_lbl.grid(row=0, column=2, padx=(0, 10))
 
-        timestamp = layout.get("timestamp")
-        if timestamp:
-            dt = datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')
-            icon_count = len(layout["data"]["icons"]) if layout["data"] else 0
-            info_text = f"📅 {dt}   📁 {icon_count}个图标"
-            bootstyle = "secondary"
-        else:
-            info_text = "⚠️ 未保存"
-            bootstyle = "warning"
-        ttk.Label(inner, text=info_text, font=("Microsoft YaHei UI", 10),
-                  bootstyle=bootstyle).grid(row=0, column=2, sticky="w", padx=5)
+        self.name_var = tk.StringVar()
+        self.name_entry = ttk.Entry(inner, textvariable=self.name_var,
+                                    font=("Microsoft YaHei UI", 10), width=15)
+        self.name_entry.bind("<FocusOut>", self._commit_name)
+        self.name_entry.bind("<Return>", self._commit_name)
+        self.name_entry.grid(row=0, column=1, padx=(0, 10), sticky="w")
+
+        self.info_lbl = ttk.Label(inner, text="", font=("Microsoft YaHei UI", 10))
+        self.info_lbl.grid(row=0, column=3, sticky="w", padx=5)
 
         btn_frame = ttk.Frame(inner)
-        btn_frame.grid(row=0, column=3, sticky="e")
+        btn_frame.grid(row=0, column=4, sticky="e")
 
         ttk.Button(btn_frame, text="保存", width=6, bootstyle="outline-primary",
                    command=lambda: self.app.save_action(self.index, self.name_var)
                    ).pack(side=LEFT, padx=2)
 
-        ttk.Button(btn_frame, text="恢复", width=6, bootstyle="outline-success",
-                   state="normal" if layout["saved"] else "disabled",
-                   command=lambda: self.app.restore_action(self.index)
-                   ).pack(side=LEFT, padx=2)
+        self.restore_btn = ttk.Button(btn_frame, text="恢复", width=6, bootstyle="outline-success",
+                                      command=lambda: self.app.restore_action(self.index))
+        self.restore_btn.pack(side=LEFT, padx=2)
 
-        has_monitors = bool(layout.get("saved") and layout.get("data") and
-                            layout["data"].get("monitors"))
-        ttk.Button(btn_frame, text="布局", width=6, bootstyle="outline-info",
-                   state="normal" if has_monitors else "disabled",
-                   command=lambda: self.app.show_saved_monitor_layout(self.index)
-                   ).pack(side=LEFT, padx=2)
+        self.layout_btn = ttk.Button(btn_frame, text="布局", width=6, bootstyle="outline-info",
+                                     command=lambda: self.app.show_saved_monitor_layout(self.index))
+        self.layout_btn.pack(side=LEFT, padx=2)
 
         ttk.Button(btn_frame, text="删除", width=6, bootstyle="outline-danger",
                    command=lambda: self.app.delete_action(self.index)
                    ).pack(side=LEFT, padx=2)
 
+    def assign(self, index, layout, active=False, thumbnail=None):
+        # 回收前先提交正在编辑的名称，避免滚动时丢失输入
+        self._commit_name()
+        self.index = index
+        self.layout = layout
+
+        self.name_var.set(layout["name"])
+        if layout["saved"]:
+            self.name_entry.configure(state="readonly", bootstyle="secondary")
+        else:
+            self.name_entry.configure(state="normal", bootstyle="primary")
+
+        timestamp = layout.get("timestamp")
+        if timestamp:
+            dt = datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')
+            icon_count = layout.get("icon_count", 0)
+            self.info_lbl.configure(text=f"📅 {dt}   📁 {icon_count}个图标", bootstyle="secondary")
+        else:
+            self.info_lbl.configure(text="⚠️ 未保存", bootstyle="warning")
+
+        self.restore_btn.configure(state="normal" if layout["saved"] else "disabled")
+        # 指纹只在布局包含显示器信息时存在，无需读取图标数据
+        has_monitors = bool(layout.get("saved") and layout.get("fingerprint"))
+        self.layout_btn.configure(state="normal" if has_monitors else "disabled")
+        self.set_active(active)
+        self.set_thumbnail(thumbnail)
+
+    def _commit_name(self, *args):
+        layout = self.layout
+        if layout is None or layout["saved"]:
+            return
+        name = self.name_var.get()
+        layouts = self.app.manager.layouts
+        if (name != layout["name"] and 0 <= self.index < len(layouts)
+                and layouts[self.index] is layout):
+            self.app.manager.update_layout(self.index, name=name)
+
+    def set_thumbnail(self, photo):
+        self.thumb_lbl.configure(image=photo or self.app.blank_thumbnail)
+
     def set_active(self, active):
         self.indicator_lbl.configure(text="⭐" if active else "")
 
@@ -199,6 +266,17 @@ class DesktopLayoutApp:
         self.manager = LayoutManager()
         self._viz_win = None
         self._viz_canvas = None
+        self._viz_preview = None
+        self._diag_win = None
+        self._matched_ids = set()
+        self._progress_channel = None
+        self.icon_image = None
+        self.icon = None
+        self.thumbnails = ThumbnailCache(os.path.join(self.manager.store_dir, THUMB_DIR),
+                                         self.manager.get_data)
+        self._thumb_photos = OrderedDict()   # content_hash -> PhotoImage
+        self.blank_thumbnail = tk.PhotoImage(width=THUMB_SIZE[0], height=THUMB_SIZE[1])
+        self.jobs = DesktopJobExecutor(lambda func, *args: self.root.after(0, func, *args))
         self._init_ui()
         self.refresh_list()
 
@@ -218,8 +296,15 @@ class DesktopLayoutApp:
         ttk.Button(header_frame, text="➕ 新增配置",
                    command=self.add_row,
                    bootstyle="success", width=15).pack(side=RIGHT)
-
-        self.list_container = ScrollableFrame(self.root, padding="20 10")
+        ttk.Button(header_frame, text="📊 诊断",
+                   command=self.show_diagnostics,
+                   bootstyle="secondary-outline", width=8).pack(side=RIGHT, padx=10)
+
+        self.list_container = ScrollableFrame(
+            self.root,
+            create_row=lambda parent: LayoutRow(parent, self),
+            bind_row=self._bind_row,
+            padding="20 10")
         self.list_container.pack(fill="both", expand=True)
 
         footer_frame = ttk.Frame(self.root, padding="20")
@@ -234,103 +319,212 @@ class DesktopLayoutApp:
                   bootstyle="info", font=("Microsoft YaHei UI", 10)).pack(side=RIGHT)
 
     def refresh_list(self):
-        for widget in self.list_container.scrollable_frame.winfo_children():
-            widget.destroy()
-        for index, layout in enumerate(self.manager.layouts):
-            LayoutRow(self.list_container.scrollable_frame, self, index, layout).pack(fill="x", pady=5)
+        """布局数量变化或需要整体刷新时调用；只会重新绑定可见的行。"""
+        self.list_container.set_count(len(self.manager.layouts))
         self.check_layout_match()
 
+    def _bind_row(self, row, index):
+        layout = self.manager.layouts[index]
+        row.assign(index, layout, active=layout["id"] in self._matched_ids,
+                   thumbnail=self._thumbnail_for(layout))
+
+    # ---- 缩略图 ----
+
+    def _thumbnail_for(self, layout):
+        """已缓存的缩略图；没有时提交后台生成，完成后再更新对应的行。"""
+        digest = layout.get("content_hash")
+        if not layout.get("saved") or not digest:
+            return None
+        photo = self._thumb_photos.get(digest)
+        if photo is not None:
+            self._thumb_photos.move_to_end(digest)
+            return photo
+        image = self.thumbnails.cached(digest)
+        if image is not None:
+            return self._add_thumbnail_photo(digest, image)
+        self.thumbnails.request(
+            layout, lambda layout_id, digest, image: self.root.after(
+                0, self._on_thumbnail_ready, layout_id, digest, image))
+        return None
+
+    def _add_thumbnail_photo(self, digest, image):
+        from PIL import ImageTk
+        photo = ImageTk.PhotoImage(image)
+        self._thumb_photos[digest] = photo
+        while len(self._thumb_photos) > MEMORY_CACHE_SIZE:
+            self._thumb_photos.popitem(last=False)
+        return photo
+
+    def _on_thumbnail_ready(self, layout_id, digest, image):
+        photo = self._add_thumbnail_photo(digest, image)
+        for row in self.list_container.visible_rows():
+            if row.layout["id"] == layout_id and row.layout.get("content_hash") == digest:
+                row.set_thumbnail(photo)
+
+    def _discard_thumbnail(self, digest):
+        if digest and not any(layout.get("content_hash") == digest
+                              for layout in self.manager.layouts):
+            self._thumb_photos.pop(digest, None)
+            self.thumbnails.discard(digest)
+
     def check_layout_match(self):
         try:
-            current = sorted(desktop_manager.get_monitors_info(),
-                             key=lambda x: (x['rect'][0], x['rect'][1]))
-            for child in self.list_container.scrollable_frame.winfo_children():
-                if not isinstance(child, LayoutRow):
-                    continue
-                match = False
-                layout = child.layout
-                if layout.get('saved') and layout.get('data'):
-                    saved = layout['data'].get('monitors')
-                    if saved and len(saved) == len(current):
-                        saved_sorted = sorted(saved, key=lambda x: (x['rect'][0], x['rect'][1]))
-                        match = all(
-                            tuple(c['resolution']) == tuple(s['resolution']) and
-                            tuple(c['rect']) == tuple(s['rect'])
-                            for c, s in zip(current, saved_sorted)
-                        )
-                child.set_active(match)
+            fingerprint = display_topology.current_fingerprint()
+            self._matched_ids = {layout["id"] for layout in self.manager.layouts_for_fingerprint(fingerprint)}
+            for row in self.list_container.visible_rows():
+                row.set_active(row.layout["id"] in self._matched_ids)
         except Exception as e:
             print(f"Layout match check failed: {e}")
 
     def add_row(self):
         self.manager.add_layout()
-        self.refresh_list()
+        count = len(self.manager.layouts)
+        self.list_container.set_count(count)
+        self.list_container.see(count - 1)
 
     def delete_action(self, index):
-        if Messagebox.show_question("确定要删除这个配置吗？", "确认删除"):
+        if _messagebox().show_question("确定要删除这个配置吗？", "确认删除"):
+            digest = self.manager.layouts[index].get("content_hash")
             self.manager.delete_layout(index)
-            self.refresh_list()
+            self._discard_thumbnail(digest)
+            # 之后的布局整体前移一位，只需重新绑定 index 之后的可见行
+            self.list_container.set_count(len(self.manager.layouts))
+            self.list_container.refresh(start=index)
+
+    def _layout_index(self, layout):
+        """布局当前的下标；后台任务完成前布局可能已被移动或删除，删除时返回 None。"""
+        for i, item in enumerate(self.manager.layouts):
+            if item is layout:
+                return i
+        return None
 
     def save_action(self, index, name_var):
         name = name_var.get().strip()
         if not name:
-            Messagebox.show_warning("请输入配置名称！", "提示")
+            _messagebox().show_warning("请输入配置名称！", "提示")
             return
-        try:
-            self.manager.update_layout(index, name=name)
-            data = desktop_manager.get_current_layout_data()
-            self.manager.update_layout(index, data=data)
-            self.status_var.set(f"已保存: {name}")
-            self.refresh_list()
-        except Exception as e:
-            Messagebox.show_error(f"保存失败: {str(e)}", "错误")
-
-    def restore_action(self, index):
+        self.manager.update_layout(index, name=name)
         layout = self.manager.layouts[index]
-        if not layout["saved"] or not layout["data"]:
-            return
+        self.status_var.set(f"正在保存: {name}...")
 
-        def run_restore():
+        def on_done(data):
+            index = self._layout_index(layout)
+            if index is None:
+                return
             try:
-                self.status_var.set(f"正在恢复: {layout['name']}...")
+                old_digest = layout.get("content_hash")
+                self.manager.update_layout(index, data=data)
+                self._discard_thumbnail(old_digest)
+                self.status_var.set(f"已保存: {name}")
+                self.check_layout_match()
+                self.list_container.refresh_row(index)
+            except Exception as e:
+                on_error(e)
 
-                def progress(current, total):
-                    self.progress_var.set(f"进度: {current}/{total}")
+        def on_error(e):
+            self.status_var.set("保存失败")
+            _messagebox().show_error(f"保存失败: {str(e)}", "错误")
 
-                count = desktop_manager.restore_from_data(layout["data"], progress_callback=progress)
-                self.status_var.set(f"恢复完成: {layout['name']}")
-                self.progress_var.set(f"成功恢复 {count} 个图标")
-            except Exception as e:
-                self.status_var.set("恢复失败")
-                self.progress_var.set(f"错误: {str(e)}")
+        self.jobs.submit("save", lambda cancel: desktop_manager.get_current_layout_table(),
+                         on_done=on_done, on_error=on_error)
+
+    def restore_action(self, index):
+        layout = self.manager.layouts[index]
+        if not layout["saved"]:
+            return
+        self.status_var.set(f"正在恢复: {layout['name']}...")
+        channel = ProgressChannel()
+
+        def run_restore(cancel):
+            data = self.manager.get_data(layout)
+            if not data:
+                raise Exception("布局数据读取失败")
+            return desktop_manager.restore_from_data(data, cancel=cancel, progress=channel,
+                                                     layout=layout, plans=self.manager.plans)
+
+        def on_done(plan):
+            detail = f"缺失 {plan.missing} 个"
+            if plan.renamed:
+                detail += f"，按相似名称对应 {plan.renamed} 个"
+            if plan.cancelled:
+                self.status_var.set(f"恢复已取消: {layout['name']}（{detail}）")
+            else:
+                self.status_var.set(f"恢复完成: {layout['name']}（{detail}）")
+
+        def on_error(e):
+            channel.finish("failed")
+            self.status_var.set("恢复失败")
+            self.progress_var.set(f"错误: {str(e)}")
+
+        def on_cancel():
+            # 排队中就被取消（例如在保存之后排队时按 Esc），任务不会执行
+            channel.finish("cancelled")
+            if channel is self._progress_channel:
+                self.status_var.set(f"恢复已取消: {layout['name']}")
+
+        # 新的恢复请求取代尚未执行的请求，并中止正在进行的恢复
+        self.jobs.submit("restore", run_restore, on_done=on_done, on_error=on_error,
+                         replace=True, on_cancel=on_cancel)
+        self._progress_channel = channel
+        self._poll_progress(channel)
+
+    def _poll_progress(self, channel):
+        """在 UI 线程中取出恢复进度并显示，直到收到最终更新或被新的恢复取代。"""
+        if channel is not self._progress_channel:
+            return
+        for update in channel.drain():
+            self._show_progress(update)
+        if not channel.done:
+            self.root.after(POLL_INTERVAL_MS, self._poll_progress, channel)
+
+    def _show_progress(self, update):
+        if update.phase == "snapshot":
+            text = "正在读取桌面图标..."
+        elif update.phase == "plan":
+            text = "正在计算移动计划..."
+        elif update.phase == "move":
+            text = f"进度: {update.moved}/{update.total}（{update.elapsed:.1f}s）"
+        elif update.phase == "failed":
+            return   # 错误信息由任务的 on_error 显示
+        elif update.phase == "cancelled" and not update.total:
+            text = "已取消"
+        else:
+            text = (f"移动 {update.moved} 个，{update.skipped} 个已在原位"
+                    f"（{update.elapsed:.1f}s）")
+        self.progress_var.set(text)
 
-        threading.Thread(target=run_restore, daemon=True).start()
+    def cancel_restore(self, event=None):
+        self.jobs.cancel("restore")
 
     def show_saved_monitor_layout(self, index):
         layout = self.manager.layouts[index]
-        if not layout.get("saved") or not layout.get("data"):
-            Messagebox.show_warning("该配置未保存或数据损坏", "提示")
+        data = self.manager.get_data(layout)
+        if not data:
+            _messagebox().show_warning("该配置未保存或数据损坏", "提示")
             return
-        monitors = layout["data"].get("monitors")
+        monitors = data.get("monitors")
         if not monitors:
-            Messagebox.show_warning("该配置不包含显示器布局信息", "提示")
+            _messagebox().show_warning("该配置不包含显示器布局信息", "提示")
             return
         self.show_monitor_visualization(
             monitors,
-            icons=layout["data"].get("icons", []),
+            icons=data.get("icons", []),
             title=f"布局: {layout['name']}")
 
     def show_monitor_layout(self):
-        try:
-            data = desktop_manager.get_current_layout_data()
+        def on_done(data):
             self.show_monitor_visualization(
                 data.get("monitors", []),
                 icons=data.get("icons", []),
                 title="当前显示器布局")
-        except Exception as e:
+
+        def on_error(e):
             monitors = desktop_manager.get_monitors_info()
             self.show_monitor_visualization(monitors, title="当前显示器布局")
 
+        self.jobs.submit("snapshot", lambda cancel: desktop_manager.get_current_layout_table(),
+                         on_done=on_done, on_error=on_error, replace=True)
+
     def show_monitor_visualization(self, monitors, icons=None, title="显示器布局"):
         # 复用已有窗口：存在且未被关闭则直接更新，否则新建
         if self._viz_win is not None:
@@ -339,11 +533,15 @@ class DesktopLayoutApp:
                 self._viz_win.title(title)
                 self._viz_win.lift()
                 self._viz_win.focus_force()
-                canvas = self._viz_canvas
-                canvas.delete("all")
             except Exception:
                 self._viz_win = None
                 self._viz_canvas = None
+                self._viz_preview = None
+
+        if self._viz_win is not None and self._viz_preview is None:
+            # 上次打开时没有显示器信息，窗口中没有画布
+            self._viz_win.destroy()
+            self._viz_win = None
 
         if self._viz_win is None:
             top = ttk.Toplevel(self.root)
@@ -369,130 +567,146 @@ class DesktopLayoutApp:
             canvas.master.pack(fill="both", expand=True)
             canvas.pack(fill="both", expand=True)
             self._viz_canvas = canvas
+            from monitor_preview import MonitorPreview
+            self._viz_preview = MonitorPreview(canvas)
         else:
             if not monitors:
                 return
 
-        min_x = min(m['rect'][0] for m in monitors)
-        min_y = min(m['rect'][1] for m in monitors)
-        max_x = max(m['rect'][2] for m in monitors)
-        max_y = max(m['rect'][3] for m in monitors)
-        virtual_width  = max_x - min_x
-        virtual_height = max_y - min_y
-
-        idx_to_pos = {m.get('index', j): j for j, m in enumerate(monitors)}
-
-        icons_by_monitor = {}
-        if icons:
-            for icon in icons:
-                j = idx_to_pos.get(icon.get("monitor", 0), 0)
-                icons_by_monitor.setdefault(j, []).append(icon)
-
-        def draw_layout(event=None):
-            canvas.delete("all")
-            w = canvas.winfo_width()
-            h = canvas.winfo_height()
-            if w <= 1 or h <= 1 or virtual_width == 0 or virtual_height == 0:
-                return
-
-            padding = 60
-            avail_w = w - 2 * padding
-            avail_h = h - 2 * padding
-            scale = min(avail_w / virtual_width, avail_h / virtual_height)
-
-            draw_w = virtual_width * scale
-            draw_h = virtual_height * scale
-            offset_x = (w - draw_w) / 2
-            offset_y = (h - draw_h) / 2
-
-            for i, m in enumerate(monitors):
-                rect = m['rect']
-                mon_w = rect[2] - rect[0]
-                mon_h = rect[3] - rect[1]
-
-                x1 = offset_x + (rect[0] - min_x) * scale
-                y1 = offset_y + (rect[1] - min_y) * scale
-                x2 = x1 + mon_w * scale
-                y2 = y1 + mon_h * scale
-
-                bezel = max(2, int(4 * scale))
-                canvas.create_rectangle(x1, y1, x2, y2, fill="#1a1a1a", outline="#555555", width=1)
-
-                sx1, sy1 = x1 + bezel, y1 + bezel
-                sx2, sy2 = x2 - bezel, y2 - bezel
-                screen_w = sx2 - sx1
-
-                canvas.create_rectangle(sx1, sy1, sx2, sy2,
-                                        fill="#1e3a5f" if m.get('is_primary') else "#2d3436",
-                                        outline="")
-
-                cx = (x1 + x2) / 2
-                base_size = max(7, min(11, int(min(x2 - x1, y2 - y1) / 28)))
-
-                res = m.get('resolution', (mon_w, mon_h))
-                pos = m.get('position', (rect[0], rect[1]))
-                primary_tag = " ★" if m.get('is_primary') else ""
-                info_text = (f"#{i + 1}{primary_tag}  "
-                             f"{res[0]}×{res[1]}  "
-                             f"{m.get('refresh_rate', '?')}Hz  "
-                             f"({pos[0]}, {pos[1]})")
-
-                info_bar_h = base_size + 12
-                canvas.create_rectangle(sx1, sy1, sx2, sy1 + info_bar_h, fill="#111111", outline="")
-                canvas.create_text(cx, sy1 + info_bar_h / 2, text=info_text,
-                                   font=("Microsoft YaHei UI", base_size, "bold"), fill="white")
-
-                m_icons = icons_by_monitor.get(i, [])
-                if not m_icons:
-                    if not icons:
-                        canvas.create_text(cx, (sy1 + sy2) / 2, text="(无图标数据)",
-                                           font=("Microsoft YaHei UI", 9), fill="#666666")
-                    continue
-
-                icon_area_x = sx1 + 6
-                icon_area_y = sy1 + info_bar_h + 4
-                icon_area_w = screen_w - 12
-                icon_area_h = sy2 - icon_area_y - 4
-
-                if icon_area_w <= 0 or icon_area_h <= 0:
-                    continue
-
-                if all('row' in ic and 'col' in ic for ic in m_icons):
-                    min_col = min(ic['col'] for ic in m_icons)
-                    min_row = min(ic['row'] for ic in m_icons)
-                    cols = max(ic['col'] for ic in m_icons) - min_col + 1
-                    rows = max(ic['row'] for ic in m_icons) - min_row + 1
-
-                    cell = min(icon_area_w / max(cols, 1), icon_area_h / max(rows, 1))
-                    dot_r = max(2, min(5, cell / 3))
-
-                    for ic in m_icons:
-                        dx = icon_area_x + (ic['col'] - min_col) * cell + cell / 2
-                        dy = icon_area_y + (ic['row'] - min_row) * cell + cell / 2
-                        canvas.create_oval(dx - dot_r, dy - dot_r, dx + dot_r, dy + dot_r,
-                                           fill="#f39c12", outline="#e67e22", width=1)
-                else:
-                    for ic in m_icons:
-                        rx = max(0.0, min(1.0, (ic.get("x", 0) - rect[0]) / mon_w)) if mon_w else 0
-                        ry = max(0.0, min(1.0, (ic.get("y", 0) - rect[1]) / mon_h)) if mon_h else 0
-                        dx = icon_area_x + rx * icon_area_w
-                        dy = icon_area_y + ry * icon_area_h
-                        canvas.create_oval(dx - 3, dy - 3, dx + 3, dy + 3,
-                                           fill="#f39c12", outline="#e67e22", width=1)
-
-        canvas.bind("<Configure>", draw_layout)
-        # 窗口已存在时尺寸不变，手动触发一次重绘
-        self._viz_win.after(50, draw_layout)
+        self._viz_preview.set_data(monitors, icons)
 
     def _on_viz_close(self, win):
         self._viz_win = None
         self._viz_canvas = None
+        self._viz_preview = None
         win.destroy()
 
+    # ---- 诊断面板 ----
+
+    def show_diagnostics(self):
+        """显示 metrics 的计数器与各阶段耗时，打开期间每秒刷新。"""
+        if self._diag_win is not None:
+            try:
+                self._diag_win.lift()
+                return
+            except Exception:
+                self._diag_win = None
+
+        top = ttk.Toplevel(self.root)
+        top.title("诊断")
+        top.geometry("560x420")
+        self._diag_win = top
+
+        enabled_var = tk.BooleanVar(value=metrics.enabled)
+        trace_var = tk.BooleanVar(value=False)
+
+        def apply():
+            if enabled_var.get():
+                metrics.enable(TRACE_FILE if trace_var.get() else None)
+            else:
+                metrics.disable()
+
+        toolbar = ttk.Frame(top, padding="10 10 10 0")
+        toolbar.pack(fill="x")
+        ttk.Checkbutton(toolbar, text="启用统计", variable=enabled_var, command=apply,
+                        bootstyle="round-toggle").pack(side=LEFT)
+        ttk.Checkbutton(toolbar, text=f"写入跟踪文件 {TRACE_FILE}", variable=trace_var,
+                        command=apply, bootstyle="round-toggle").pack(side=LEFT, padx=15)
+        ttk.Button(toolbar, text="重置", width=6, bootstyle="outline-secondary",
+                   command=metrics.reset).pack(side=RIGHT)
+
+        columns = ("value", "total", "max", "last")
+        tree = ttk.Treeview(top, columns=columns, height=14)
+        tree.heading("#0", text="名称")
+        for column, text in zip(columns, ("次数 / 数值", "总计 ms", "最大 ms", "最近 ms")):
+            tree.heading(column, text=text)
+            tree.column(column, width=90, anchor="e")
+        tree.column("#0", width=180)
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        def refresh():
+            if self._diag_win is not top:
+                return
+            stats = metrics.snapshot()
+            tree.delete(*tree.get_children())
+            for name, value in sorted(stats["counters"].items()):
+                tree.insert("", "end", text=name, values=(value, "", "", ""))
+            for name, span in sorted(stats["spans"].items()):
+                tree.insert("", "end", text=f"⏱ {name}",
+                            values=(span["count"], span["total_ms"], span["max_ms"],
+                                    span["last_ms"]))
+            top.after(DIAGNOSTICS_REFRESH_MS, refresh)
+
+        def on_close():
+            self._diag_win = None
+            top.destroy()
+
+        top.protocol("WM_DELETE_WINDOW", on_close)
+        refresh()
+
+    # ---- 单实例命令转发 ----
+
+    def handle_remote_command(self, command, args):
+        """InstanceServer 的回调（监听线程）：切回 UI 线程执行并等待结果。"""
+        done = threading.Event()
+        outcome = {}
+
+        def run():
+            try:
+                outcome["result"] = self.run_command(command, args)
+            except Exception as e:
+                outcome["error"] = str(e)
+            finally:
+                done.set()
+
+        self.root.after(0, run)
+        if not done.wait(REMOTE_TIMEOUT):
+            raise Exception("界面无响应")
+        if "error" in outcome:
+            raise Exception(outcome["error"])
+        return outcome["result"]
+
+    def run_command(self, command, args):
+        """执行命令行或其他实例转发来的命令：show、restore <名称|id|--best>、save <名称>。
+
+        restore / save 只提交到后台执行器，立即返回。
+        """
+        if command == "show":
+            self.show_main_window()
+            return {"shown": True}
+        if command == "restore":
+            target = args[0] if args else "--best"
+            if target == "--best":
+                layout = self.manager.best_layout()
+                index = self._layout_index(layout) if layout else None
+            else:
+                index = self.manager.find_layout(target)
+            if index is None or not self.manager.layouts[index].get("saved"):
+                raise Exception(f"找不到已保存的布局: {target}")
+            self.restore_action(index)
+            return {"queued": "restore", "layout": self.manager.layouts[index]["id"]}
+        if command == "save":
+            if not args:
+                raise Exception("缺少布局名称")
+            index = self.manager.find_layout(args[0])
+            if index is None:
+                self.manager.add_layout()
+                index = len(self.manager.layouts) - 1
+                self.list_container.set_count(len(self.manager.layouts))
+                name = args[0]
+            else:
+                name = self.manager.layouts[index]["name"] or args[0]
+            self.save_action(index, tk.StringVar(value=name))
+            return {"queued": "save", "layout": self.manager.layouts[index]["id"]}
+        raise Exception(f"未知命令: {command}")
+
     def create_tray_icon(self):
+        import pystray
+        if self.icon_image is None:
+            self.icon_image = _tray_image()
+
         def show_window(icon, item):
-            icon.stop()
-            self.root.after(0, self.root.deiconify)
+            self.root.after(0, self.show_main_window)
 
         def exit_app(icon, item):
             icon.stop()
@@ -513,6 +727,14 @@ class DesktopLayoutApp:
         self.icon = pystray.Icon("name", self.icon_image, "桌面图标管理", pystray.Menu(*menu_items))
         self.icon.run()
 
+    def show_main_window(self):
+        icon, self.icon = self.icon, None
+        if icon is not None:
+            icon.stop()
+        self.root.deiconify()
+        self.root.lift()
+        self.root.focus_force()
+
     def minimize_to_tray(self):
         self.root.withdraw()
         threading.Thread(target=self.create_tray_icon, daemon=True).start()
@@ -522,7 +744,19 @@ class DesktopLayoutApp:
             self.minimize_to_tray()
 
 
-def main():
+def main(argv=None, forward=True):
+    """启动界面；已有实例在运行时把命令（默认 show）转发给它后立即退出。
+
+    用法：桌面图标管理.exe [show | restore <名称|id|--best> | save <名称>]
+    forward=False 表示调用方（launcher）已尝试过转发。
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if forward:
+        exit_code = instance_ipc.forward(argv)
+        if exit_code is not None:
+            return exit_code
+    command, args = instance_ipc.parse_argv(argv)
+
     app = ttk.Window(title="桌面图标管理", themename="litera", size=(950, 450))
     app.withdraw()
     app.place_window_center()
@@ -535,14 +769,40 @@ def main():
         except Exception:
             pass
 
-    icon_data = base64.b64decode(Icon.icon)
-    image = Image.open(io.BytesIO(icon_data))
-
     gui = DesktopLayoutApp(app)
-    gui.icon_image = image
     app.bind('<Unmap>', gui.on_unmap)
-    app.mainloop()
+    app.bind('<Escape>', gui.cancel_restore)
+
+    server = None
+    try:
+        server = instance_ipc.InstanceServer(gui.handle_remote_command).start()
+    except instance_ipc.AlreadyRunning:
+        # 另一个实例在转发检查之后抢先开始监听：把命令交给它，不再打开第二个界面
+        exit_code = instance_ipc.forward(argv)
+        if exit_code is not None:
+            gui.jobs.shutdown()
+            app.destroy()
+            return exit_code
+        print("Instance server failed: running instance did not answer")
+    except Exception as e:
+        print(f"Instance server failed: {e}")
+
+    if argv:
+        def run_initial_command():
+            try:
+                gui.run_command(command, args)
+            except Exception as e:
+                gui.status_var.set(str(e))
+        app.after(100, run_initial_command)
+
+    try:
+        app.mainloop()
+    finally:
+        if server is not None:
+            server.close()
+        gui.jobs.shutdown()
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
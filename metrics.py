@@ -0,0 +1,120 @@
+"""热路径计数器与耗时区段。
+
+默认关闭：关闭时 count() 直接返回，span() 返回共享的空上下文，热循环中的调用方
+还可以先判断 metrics.enabled 以省去函数调用。开启后：
+
+- count(name, n) 累加计数器，如 send_message、rpm_calls / rpm_bytes、icons_moved；
+- with span(name): 记录区段耗时（次数、总计、最大、最近一次）；
+- snapshot() 返回当前统计，供界面诊断面板与命令行 --timing 输出；
+- enable(trace_path) 时每个区段结束都向 JSONL 文件追加一行。
+"""
+import json
+import threading
+import time
+
+enabled = False
+
+_lock = threading.Lock()
+_counters = {}
+_spans = {}          # name -> [count, total, max, last]（秒）
+_trace_file = None
+
+
+def enable(trace_path=None):
+    """开启统计；trace_path 不为空时同时把区段写入 JSONL 跟踪文件。"""
+    global enabled, _trace_file
+    with _lock:
+        if _trace_file is not None:
+            _trace_file.close()
+            _trace_file = None
+        if trace_path:
+            _trace_file = open(trace_path, 'a', encoding='utf-8')
+        enabled = True
+
+
+def disable():
+    global enabled, _trace_file
+    with _lock:
+        enabled = False
+        if _trace_file is not None:
+            _trace_file.close()
+            _trace_file = None
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _spans.clear()
+
+
+def count(name, n=1):
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            stat = _spans.get(self.name)
+            if stat is None:
+                stat = _spans[self.name] = [0, 0.0, 0.0, 0.0]
+            stat[0] += 1
+            stat[1] += elapsed
+            stat[2] = max(stat[2], elapsed)
+            stat[3] = elapsed
+            if _trace_file is not None:
+                _trace_file.write(json.dumps({
+                    "ts": round(time.time(), 6),
+                    "span": self.name,
+                    "ms": round(elapsed * 1000, 3),
+                    "thread": threading.current_thread().name,
+                }) + "\n")
+                _trace_file.flush()
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    return _Span(name) if enabled else _NULL_SPAN
+
+
+def snapshot():
+    """当前统计：{"enabled", "counters": {...}, "spans": {name: {count, total_ms, max_ms, last_ms}}}。"""
+    with _lock:
+        return {
+            "enabled": enabled,
+            "counters": dict(_counters),
+            "spans": {
+                name: {
+                    "count": stat[0],
+                    "total_ms": round(stat[1] * 1000, 3),
+                    "max_ms": round(stat[2] * 1000, 3),
+                    "last_ms": round(stat[3] * 1000, 3),
+                }
+                for name, stat in _spans.items()
+            },
+        }
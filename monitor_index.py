@@ -0,0 +1,112 @@
+"""显示器空间索引：替代逐个图标调用 MonitorFromPoint。
+
+所有显示器矩形的左右/上下边界排序去重后把虚拟桌面切成网格，
+每个网格单元预先记录所属显示器，点查询只需两次二分查找。
+不在任何显示器上的点按 MONITOR_DEFAULTTONEAREST 的语义取最近的显示器。
+"""
+import bisect
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class MonitorIndex:
+    """由 get_monitors() / get_monitors_info() 的结果构建，位置均为屏幕坐标。"""
+
+    def __init__(self, monitors):
+        self.monitors = list(monitors)
+        rects = [tuple(m['rect']) for m in self.monitors]
+        self._rects = rects
+        self._xs = sorted(set(r[0] for r in rects) | set(r[2] for r in rects))
+        self._ys = sorted(set(r[1] for r in rects) | set(r[3] for r in rects))
+        nx = max(len(self._xs) - 1, 0)
+        ny = max(len(self._ys) - 1, 0)
+        self._nx = nx
+        self._cells = [-1] * (nx * ny)
+
+        # 重叠（镜像）时先枚举到的显示器优先
+        for pos in range(len(rects) - 1, -1, -1):
+            left, top, right, bottom = rects[pos]
+            x0, x1 = self._xs.index(left), self._xs.index(right)
+            y0, y1 = self._ys.index(top), self._ys.index(bottom)
+            for yi in range(y0, y1):
+                row = yi * nx
+                for xi in range(x0, x1):
+                    self._cells[row + xi] = pos
+
+    def __len__(self):
+        return len(self.monitors)
+
+    def locate(self, x, y):
+        """返回包含该点的显示器在 monitors 中的位置，不在任何显示器上返回 -1。"""
+        xi = bisect.bisect_right(self._xs, x) - 1
+        yi = bisect.bisect_right(self._ys, y) - 1
+        if 0 <= xi < self._nx and 0 <= yi < len(self._ys) - 1:
+            return self._cells[yi * self._nx + xi]
+        return -1
+
+    def contains(self, x, y):
+        return self.locate(x, y) >= 0
+
+    def nearest(self, x, y):
+        """返回包含该点或距离最近的显示器位置；没有显示器时返回 -1。"""
+        pos = self.locate(x, y)
+        if pos >= 0 or not self._rects:
+            return pos
+        best, best_dist = -1, None
+        for i, (left, top, right, bottom) in enumerate(self._rects):
+            dx = max(left - x, 0, x - (right - 1))
+            dy = max(top - y, 0, y - (bottom - 1))
+            dist = dx * dx + dy * dy
+            if best_dist is None or dist < best_dist:
+                best, best_dist = i, dist
+        return best
+
+    def monitor_at(self, x, y):
+        pos = self.nearest(x, y)
+        return self.monitors[pos] if pos >= 0 else None
+
+    def assign(self, xs, ys, spacing):
+        """批量计算每个点所在显示器位置及相对该显示器的网格列、行。
+
+        返回 (positions, cols, rows) 三个列表；没有显示器时位置为 -1、列行相对原点。
+        """
+        if np is not None and len(xs) >= 64 and self._rects:
+            return self._assign_numpy(xs, ys, spacing)
+
+        spacing_x, spacing_y = spacing
+        rects = self._rects
+        positions, cols, rows = [], [], []
+        for x, y in zip(xs, ys):
+            pos = self.nearest(x, y)
+            left, top = (rects[pos][0], rects[pos][1]) if pos >= 0 else (0, 0)
+            positions.append(pos)
+            cols.append(round((x - left) / spacing_x) if spacing_x else 0)
+            rows.append(round((y - top) / spacing_y) if spacing_y else 0)
+        return positions, cols, rows
+
+    def _assign_numpy(self, xs, ys, spacing):
+        spacing_x, spacing_y = spacing
+        px = np.asarray(xs, dtype=np.int64)
+        py = np.asarray(ys, dtype=np.int64)
+        edges_x = np.asarray(self._xs, dtype=np.int64)
+        edges_y = np.asarray(self._ys, dtype=np.int64)
+        ny = len(self._ys) - 1
+
+        xi = np.searchsorted(edges_x, px, side='right') - 1
+        yi = np.searchsorted(edges_y, py, side='right') - 1
+        inside = (xi >= 0) & (xi < self._nx) & (yi >= 0) & (yi < ny)
+        cells = np.asarray(self._cells, dtype=np.int64)
+        pos = np.full(len(px), -1, dtype=np.int64)
+        pos[inside] = cells[yi[inside] * self._nx + xi[inside]]
+        for k in np.nonzero(pos < 0)[0]:
+            pos[k] = self.nearest(int(px[k]), int(py[k]))
+
+        lefts = np.asarray([r[0] for r in self._rects], dtype=np.int64)[pos]
+        tops = np.asarray([r[1] for r in self._rects], dtype=np.int64)[pos]
+        # np.rint 与内置 round 一样采用银行家舍入
+        cols = np.rint((px - lefts) / spacing_x).astype(np.int64) if spacing_x else np.zeros_like(px)
+        rows = np.rint((py - tops) / spacing_y).astype(np.int64) if spacing_y else np.zeros_like(py)
+        return pos.tolist(), cols.tolist(), rows.tolist()
@@ -0,0 +1,221 @@
+"""显示器布局预览的绘制。
+
+显示器边框与文字只有每台显示器几个画布项，图标点则先渲染到一张透明的 PIL
+图层上再整体贴到画布，数千个图标也只占一个画布项。图标点的相对位置在
+set_data() 时一次算好；窗口尺寸变化时 <Configure> 事件经过去抖合并，停止拖动
+后才按新尺寸重绘，最近几个尺寸的图层会被缓存，来回切换时直接复用。
+"""
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw, ImageTk
+
+from icon_table import F_COL, F_ROW, IconTable
+
+PADDING = 60
+RESIZE_DEBOUNCE_MS = 80
+LAYER_CACHE_SIZE = 4
+
+DOT_FILL = "#f39c12"
+DOT_OUTLINE = "#e67e22"
+
+
+class _MonitorIcons:
+    """一台显示器上的图标：网格模式保存相对列行，否则保存 0~1 的相对坐标。"""
+
+    __slots__ = ("grid", "us", "vs", "cols", "rows")
+
+    def __init__(self, grid, us, vs, cols=1, rows=1):
+        self.grid = grid
+        self.us = us
+        self.vs = vs
+        self.cols = cols
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.us)
+
+
+def _group_icons(monitors, icons):
+    """按显示器分组并预先计算每个图标的相对位置。"""
+    table = IconTable.coerce(icons)
+    idx_to_pos = {m.get('index', j): j for j, m in enumerate(monitors)}
+    xs, ys = table.column("x"), table.column("y")
+    cols, rows = table.column("col"), table.column("row")
+    masks, monitor_values = table.column("mask"), table.column("monitor")
+
+    members = {}
+    for k, monitor in enumerate(monitor_values):
+        members.setdefault(idx_to_pos.get(monitor, 0), []).append(k)
+
+    groups = {}
+    for j, ks in members.items():
+        if j >= len(monitors):
+            continue
+        if all(masks[k] & F_COL and masks[k] & F_ROW for k in ks):
+            min_col = min(cols[k] for k in ks)
+            min_row = min(rows[k] for k in ks)
+            us = [cols[k] - min_col for k in ks]
+            vs = [rows[k] - min_row for k in ks]
+            groups[j] = _MonitorIcons(True, us, vs, max(us) + 1, max(vs) + 1)
+        else:
+            rect = monitors[j]['rect']
+            mon_w, mon_h = rect[2] - rect[0], rect[3] - rect[1]
+            us = [max(0.0, min(1.0, (xs[k] - rect[0]) / mon_w)) if mon_w else 0 for k in ks]
+            vs = [max(0.0, min(1.0, (ys[k] - rect[1]) / mon_h)) if mon_h else 0 for k in ks]
+            groups[j] = _MonitorIcons(False, us, vs)
+    return groups
+
+
+class MonitorPreview:
+    """绑定在一个 tk.Canvas 上的预览渲染器，可反复 set_data() 复用。"""
+
+    def __init__(self, canvas, debounce_ms=RESIZE_DEBOUNCE_MS):
+        self.canvas = canvas
+        self.debounce_ms = debounce_ms
+        self.monitors = []
+        self.has_icons = False
+        self._groups = {}
+        self._layers = OrderedDict()   # (w, h) -> PhotoImage
+        self._photo = None
+        self._drawn_size = None
+        self._after_id = None
+        canvas.bind("<Configure>", self._on_configure)
+
+    def set_data(self, monitors, icons=None):
+        self.monitors = list(monitors or [])
+        self.has_icons = bool(icons)
+        self._groups = _group_icons(self.monitors, icons) if icons else {}
+        self._layers.clear()
+        self._drawn_size = None
+        self.schedule_redraw(0)
+
+    def schedule_redraw(self, delay=None):
+        if self._after_id is not None:
+            self.canvas.after_cancel(self._after_id)
+        self._after_id = self.canvas.after(self.debounce_ms if delay is None else delay,
+                                           self.redraw)
+
+    def _on_configure(self, event):
+        if (event.width, event.height) != self._drawn_size:
+            self.schedule_redraw()
+
+    # ---- 绘制 ----
+
+    def _geometry(self, w, h):
+        monitors = self.monitors
+        min_x = min(m['rect'][0] for m in monitors)
+        min_y = min(m['rect'][1] for m in monitors)
+        virtual_width = max(m['rect'][2] for m in monitors) - min_x
+        virtual_height = max(m['rect'][3] for m in monitors) - min_y
+        if virtual_width == 0 or virtual_height == 0:
+            return None
+        scale = min((w - 2 * PADDING) / virtual_width, (h - 2 * PADDING) / virtual_height)
+        if scale <= 0:
+            return None
+        offset_x = (w - virtual_width * scale) / 2
+        offset_y = (h - virtual_height * scale) / 2
+        return scale, offset_x - min_x * scale, offset_y - min_y * scale
+
+    def redraw(self):
+        self._after_id = None
+        canvas = self.canvas
+        try:
+            w, h = canvas.winfo_width(), canvas.winfo_height()
+        except Exception:
+            return   # 窗口已关闭
+        if w <= 1 or h <= 1 or not self.monitors:
+            return
+        if (w, h) == self._drawn_size:
+            return
+
+        canvas.delete("all")
+        self._drawn_size = (w, h)
+        geometry = self._geometry(w, h)
+        if geometry is None:
+            return
+        scale, origin_x, origin_y = geometry
+
+        icon_areas = []
+        for i, m in enumerate(self.monitors):
+            rect = m['rect']
+            mon_w = rect[2] - rect[0]
+            mon_h = rect[3] - rect[1]
+
+            x1 = origin_x + rect[0] * scale
+            y1 = origin_y + rect[1] * scale
+            x2 = x1 + mon_w * scale
+            y2 = y1 + mon_h * scale
+
+            bezel = max(2, int(4 * scale))
+            canvas.create_rectangle(x1, y1, x2, y2, fill="#1a1a1a", outline="#555555", width=1)
+
+            sx1, sy1 = x1 + bezel, y1 + bezel
+            sx2, sy2 = x2 - bezel, y2 - bezel
+
+            canvas.create_rectangle(sx1, sy1, sx2, sy2,
+                                    fill="#1e3a5f" if m.get('is_primary') else "#2d3436",
+                                    outline="")
+
+            cx = (x1 + x2) / 2
+            base_size = max(7, min(11, int(min(x2 - x1, y2 - y1) / 28)))
+
+            res = m.get('resolution', (mon_w, mon_h))
+            pos = m.get('position', (rect[0], rect[1]))
+            primary_tag = " ★" if m.get('is_primary') else ""
+            info_text = (f"#{i + 1}{primary_tag}  "
+                         f"{res[0]}×{res[1]}  "
+                         f"{m.get('refresh_rate', '?')}Hz  "
+                         f"({pos[0]}, {pos[1]})")
+
+            info_bar_h = base_size + 12
+            canvas.create_rectangle(sx1, sy1, sx2, sy1 + info_bar_h, fill="#111111", outline="")
+            canvas.create_text(cx, sy1 + info_bar_h / 2, text=info_text,
+                               font=("Microsoft YaHei UI", base_size, "bold"), fill="white")
+
+            if i not in self._groups:
+                if not self.has_icons:
+                    canvas.create_text(cx, (sy1 + sy2) / 2, text="(无图标数据)",
+                                       font=("Microsoft YaHei UI", 9), fill="#666666")
+                continue
+
+            area_x = sx1 + 6
+            area_y = sy1 + info_bar_h + 4
+            area_w = (sx2 - sx1) - 12
+            area_h = sy2 - area_y - 4
+            if area_w > 0 and area_h > 0:
+                icon_areas.append((self._groups[i], area_x, area_y, area_w, area_h))
+
+        if icon_areas:
+            photo = self._layers.get((w, h))
+            if photo is None:
+                photo = ImageTk.PhotoImage(self._render_icons(w, h, icon_areas))
+                self._layers[(w, h)] = photo
+                while len(self._layers) > LAYER_CACHE_SIZE:
+                    self._layers.popitem(last=False)
+            else:
+                self._layers.move_to_end((w, h))
+            self._photo = photo
+            canvas.create_image(0, 0, image=photo, anchor="nw")
+
+    @staticmethod
+    def _render_icons(w, h, icon_areas):
+        """把所有图标点画到一张与画布同尺寸的透明图层上。"""
+        layer = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        ellipse = draw.ellipse
+        for group, area_x, area_y, area_w, area_h in icon_areas:
+            if group.grid:
+                cell = min(area_w / max(group.cols, 1), area_h / max(group.rows, 1))
+                r = max(2, min(5, cell / 3))
+                base_x = area_x + cell / 2
+                base_y = area_y + cell / 2
+                for u, v in zip(group.us, group.vs):
+                    dx = base_x + u * cell
+                    dy = base_y + v * cell
+                    ellipse((dx - r, dy - r, dx + r, dy + r), fill=DOT_FILL, outline=DOT_OUTLINE)
+            else:
+                for u, v in zip(group.us, group.vs):
+                    dx = area_x + u * area_w
+                    dy = area_y + v * area_h
+                    ellipse((dx - 3, dy - 3, dx + 3, dy + 3), fill=DOT_FILL, outline=DOT_OUTLINE)
+        return layer
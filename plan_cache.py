@@ -0,0 +1,150 @@
+"""预编译恢复计划的缓存。
+
+compile_restore_plan() 的结果只取决于布局内容、显示器拓扑、图标间距与不属于布局的
+当前图标位置，这里以 (布局 id, 内容摘要, 拓扑摘要, 间距, 占用摘要) 为键缓存在内存 LRU
+与 <库目录>/plans/<id>.plan 中。任何一项变化都会使键不同而重新编译；同一布局的磁盘文件只保留最近一次的计划。
+重复恢复同一布局时只剩名称 → 下标的对照与移动。
+
+文件结构（小端）：magic(4) meta_length(u32)，UTF-8 JSON 元数据（键、名称、虚拟桌面
+偏移），之后为 x、y 两个 int32 数组。
+"""
+import hashlib
+import json
+import os
+import struct
+import threading
+from array import array
+from collections import OrderedDict
+
+from restore_plan import CompiledPlan
+
+PLAN_DIR = "plans"
+MEMORY_SIZE = 16
+MAGIC = b"DRP\x01"
+HEADER = struct.Struct("<4sI")
+
+
+def topology_key(monitors):
+    """当前显示器的摘要。
+
+    除拓扑指纹包含的矩形外还包括设备名、主显示器标记与工作区，因为保存的显示器按
+    设备名对应到当前显示器，图标只安置在工作区的空闲网格中。
+    """
+    key = [[m.get('device'), [int(v) for v in m['rect']], bool(m.get('is_primary')),
+            [int(v) for v in m.get('work') or m['rect']]]
+           for m in monitors]
+    return hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()[:16]
+
+
+def occupied_key(occupied):
+    """不属于布局的当前图标位置的摘要，与顺序无关。"""
+    points = sorted(zip(*occupied)) if occupied else []
+    return hashlib.sha1(json.dumps(points).encode('utf-8')).hexdigest()[:16]
+
+
+def pack_plan(key, plan):
+    meta = json.dumps({
+        "key": list(key),
+        "names": plan.names,
+        "virtual": [plan.virtual_left, plan.virtual_top],
+    }, ensure_ascii=False).encode('utf-8')
+    return (HEADER.pack(MAGIC, len(meta)) + meta +
+            array('i', plan.xs).tobytes() + array('i', plan.ys).tobytes())
+
+
+def unpack_plan(payload):
+    """返回 (key, CompiledPlan)；格式不符时抛出 ValueError。"""
+    magic, meta_length = HEADER.unpack_from(payload)
+    if magic != MAGIC:
+        raise ValueError("not a restore plan")
+    offset = HEADER.size
+    meta = json.loads(payload[offset:offset + meta_length].decode('utf-8'))
+    offset += meta_length
+    count = len(meta["names"])
+    xs = array('i')
+    ys = array('i')
+    xs.frombytes(payload[offset:offset + count * 4])
+    ys.frombytes(payload[offset + count * 4:offset + count * 8])
+    if len(xs) != count or len(ys) != count:
+        raise ValueError("truncated restore plan")
+    left, top = meta["virtual"]
+    return tuple(meta["key"]), CompiledPlan(meta["names"], xs, ys, left, top)
+
+
+class PlanCache:
+    """directory 为 None 时只缓存在内存中。"""
+
+    def __init__(self, directory=None, memory_size=MEMORY_SIZE):
+        self.directory = directory
+        self.memory_size = memory_size
+        self._plans = OrderedDict()   # key -> CompiledPlan
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(layout, monitors, spacing, occupied=None):
+        """布局头信息（需有 id 与 content_hash）对应的缓存键，无法缓存时返回 None。
+
+        occupied 为不属于布局的当前图标的屏幕坐标 (xs, ys)。
+        """
+        digest = layout.get("content_hash") if layout else None
+        if not digest or not monitors:
+            return None
+        return (str(layout["id"]), digest, topology_key(monitors), int(spacing[0]), int(spacing[1]),
+                occupied_key(occupied))
+
+    def path(self, layout_id):
+        return os.path.join(self.directory, f"{layout_id}.plan")
+
+    def get(self, key):
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                return plan
+        if self.directory is None:
+            return None
+        try:
+            with open(self.path(key[0]), 'rb') as f:
+                stored_key, plan = unpack_plan(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            print(f"Load restore plan {key[0]} failed: {e}")
+            return None
+        if stored_key != key:
+            return None
+        self._remember(key, plan)
+        return plan
+
+    def put(self, key, plan):
+        self._remember(key, plan)
+        if self.directory is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self.path(key[0])
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(pack_plan(key, plan))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Save restore plan {key[0]} failed: {e}")
+
+    def discard(self, layout_id):
+        """丢弃某个布局的所有计划（布局被重新保存或删除时调用）。"""
+        layout_id = str(layout_id)
+        with self._lock:
+            for key in [k for k in self._plans if k[0] == layout_id]:
+                del self._plans[key]
+        if self.directory is not None:
+            try:
+                os.remove(self.path(layout_id))
+            except OSError:
+                pass
+
+    def _remember(self, key, plan):
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.memory_size:
+                self._plans.popitem(last=False)
@@ -0,0 +1,67 @@
+"""线程安全、限速的进度通道。
+
+工作线程调用 report() 写入进度，UI 线程在 after 轮询中调用 drain() 取出。
+同一阶段内的更新按 max_rate 限速，期间只保留最新的一条；阶段切换与 finish()
+的最终更新总会送达。队列有上限，UI 来不及取时丢弃最旧的更新。
+"""
+import threading
+import time
+from collections import deque, namedtuple
+
+MAX_RATE = 30         # 每秒最多送达的更新数
+QUEUE_SIZE = 64
+POLL_INTERVAL_MS = 33
+
+Progress = namedtuple("Progress", "phase moved skipped total elapsed")
+
+
+class ProgressChannel:
+    def __init__(self, max_rate=MAX_RATE, maxsize=QUEUE_SIZE):
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0
+        self.started = time.monotonic()
+        self.finished = False
+        self._queue = deque(maxlen=maxsize)
+        self._pending = None
+        self._last_sent = 0.0
+        self._last_phase = None
+        self._lock = threading.Lock()
+
+    def report(self, phase, moved=0, skipped=0, total=0, final=False):
+        """写入一条进度；被限速合并时返回 False。finish 之后的更新被忽略。"""
+        now = time.monotonic()
+        update = Progress(phase, moved, skipped, total, now - self.started)
+        with self._lock:
+            if self.finished:
+                return False
+            if (not final and phase == self._last_phase and
+                    now - self._last_sent < self.min_interval):
+                self._pending = update
+                return False
+            self._queue.append(update)
+            self._pending = None
+            self._last_sent = now
+            self._last_phase = phase
+            if final:
+                self.finished = True
+            return True
+
+    def finish(self, phase="done", moved=0, skipped=0, total=0):
+        """最终更新，保证送达；之后 drain() 取空即表示结束。"""
+        self.report(phase, moved, skipped, total, final=True)
+
+    def drain(self):
+        """取出所有待送达的更新（含被限速暂存的最新一条）。"""
+        with self._lock:
+            updates = list(self._queue)
+            self._queue.clear()
+            if self._pending is not None:
+                updates.append(self._pending)
+                self._pending = None
+                self._last_sent = time.monotonic()
+            return updates
+
+    @property
+    def done(self):
+        """已 finish 且所有更新都已取出。"""
+        with self._lock:
+            return self.finished and not self._queue
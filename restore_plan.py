@@ -0,0 +1,270 @@
+"""恢复计划：比较当前与目标位置，只移动不在原位的图标。"""
+from grid_occupancy import GridOccupancy
+from icon_matching import match_icons
+from icon_table import F_COL, F_ROW, F_X, F_Y, IconTable
+from monitor_index import MonitorIndex
+
+POSITION_TOLERANCE = 2   # 像素；Explorer 对齐网格时会有少量偏差
+
+
+class RestorePlan:
+    """一次恢复的移动计划及执行结果。
+
+    moves 为 [(index, lvm_x, lvm_y), ...]；skipped_names 为已在目标位置的图标，
+    missing_names 为保存时存在、当前桌面上找不到的图标；renamed_names 为名称有变化、
+    按相似名称对应上的 (保存时名称, 当前名称)；cancelled 表示执行中途被取消。
+    """
+
+    def __init__(self):
+        self.moves = []
+        self.move_names = []
+        self.skipped_names = []
+        self.missing_names = []
+        self.renamed_names = []
+        self.moved = 0
+        self.cancelled = False
+
+    @property
+    def planned(self):
+        return len(self.moves)
+
+    @property
+    def skipped(self):
+        return len(self.skipped_names)
+
+    @property
+    def missing(self):
+        return len(self.missing_names)
+
+    @property
+    def renamed(self):
+        return len(self.renamed_names)
+
+    @property
+    def restored(self):
+        """执行后处于目标位置的图标数（成功移动 + 无需移动）。"""
+        return self.moved + self.skipped
+
+    def as_dict(self):
+        return {
+            "planned": self.planned,
+            "moved": self.moved,
+            "skipped": self.skipped,
+            "missing": self.missing,
+            "renamed": self.renamed,
+            "restored": self.restored,
+            "cancelled": self.cancelled,
+        }
+
+    def __repr__(self):
+        return (f"RestorePlan(planned={self.planned}, moved={self.moved}, "
+                f"skipped={self.skipped}, missing={self.missing})")
+
+
+def _map_saved_monitors(saved_monitors, monitors, current_primary):
+    """保存的显示器编号 → 当前显示器。
+
+    返回 (mapping, exact)：exact 为按设备名或主显示器对应上的编号，其余编号是按
+    位置猜测或退回主显示器的，这些显示器上的图标在安置时让位于前者。
+    """
+    current_device_map = {m['device']: m for m in monitors}
+    monitor_mapping = {}
+    exact = set()
+    for sm in saved_monitors:
+        s_device = sm.get('device')
+        if s_device and s_device in current_device_map:
+            target = current_device_map[s_device]
+            exact.add(sm['index'])
+        elif sm.get('is_primary'):
+            target = current_primary
+            exact.add(sm['index'])
+        elif sm['index'] < len(monitors):
+            target = monitors[sm['index']]
+        else:
+            target = current_primary
+        monitor_mapping[sm['index']] = target
+    return monitor_mapping, exact
+
+
+class CompiledPlan:
+    """与当前桌面无关的目标位置：按移动顺序排列的 (名称, LVM x, LVM y)。
+
+    只取决于布局内容、显示器拓扑与图标间距，可以缓存；每次恢复只需
+    resolve() 把名称对应到当前快照的下标并跳过已在原位的图标。
+    """
+    __slots__ = ("names", "xs", "ys", "virtual_left", "virtual_top")
+
+    def __init__(self, names=(), xs=(), ys=(), virtual_left=0, virtual_top=0):
+        self.names = list(names)
+        self.xs = list(xs)
+        self.ys = list(ys)
+        self.virtual_left = virtual_left
+        self.virtual_top = virtual_top
+
+    def __len__(self):
+        return len(self.names)
+
+    def resolve(self, current_icons, tolerance=POSITION_TOLERANCE, fuzzy=True, matched=None):
+        """对照当前快照（屏幕坐标，dict 列表或 IconTable）生成 RestorePlan。
+
+        名称对应见 icon_matching.match_icons：同名图标按位置就近对应，fuzzy 为真时
+        名称有变化的图标按相似名称对应。matched 为编译前由 match_saved() 得到的
+        (matches, renamed)，给出时直接使用，与安置时的占用情况保持一致。
+        """
+        plan = RestorePlan()
+        current = IconTable.coerce(current_icons)
+        current_names = current.column("name")
+        current_xs = current.column("x")
+        current_ys = current.column("y")
+        virtual_left, virtual_top = self.virtual_left, self.virtual_top
+        if matched is None:
+            matched = match_icons(self.names, self.xs, self.ys, current_names,
+                                  current_xs, current_ys, (virtual_left, virtual_top), fuzzy)
+        matches, renamed = matched
+        plan.renamed_names = [(self.names[s], current_names[matches[s]]) for s in renamed]
+
+        for name, idx, target_x, target_y in zip(self.names, matches, self.xs, self.ys):
+            if idx < 0:
+                plan.missing_names.append(name)
+                continue
+            if (abs(current_xs[idx] - virtual_left - target_x) <= tolerance and
+                    abs(current_ys[idx] - virtual_top - target_y) <= tolerance):
+                plan.skipped_names.append(name)
+                continue
+            plan.moves.append((idx, target_x, target_y))
+            plan.move_names.append(name)
+        return plan
+
+    def __repr__(self):
+        return f"CompiledPlan({len(self)} icons)"
+
+
+def match_saved(saved_icons, current_icons, fuzzy=True):
+    """按保存时的屏幕坐标把布局图标对应到当前快照，返回 match_icons 的 (matches, renamed)。
+
+    用于编译之前：没有对应上的当前图标即不属于布局，其单元不用于安置其他图标；
+    结果随后传给 CompiledPlan.resolve()，两处使用同一份对应关系。
+    """
+    saved = IconTable.coerce(saved_icons)
+    current = IconTable.coerce(current_icons)
+    return match_icons(saved.column("name"), saved.column("x"), saved.column("y"),
+                       current.column("name"), current.column("x"), current.column("y"),
+                       fuzzy=fuzzy)
+
+
+def unmatched_positions(current_icons, matches):
+    """没有被任何布局图标对应上的当前图标的屏幕坐标 (xs, ys)。"""
+    current = IconTable.coerce(current_icons)
+    used = bytearray(len(current))
+    for idx in matches:
+        if idx >= 0:
+            used[idx] = 1
+    xs, ys = [], []
+    for flag, x, y in zip(used, current.column("x"), current.column("y")):
+        if not flag:
+            xs.append(x)
+            ys.append(y)
+    return xs, ys
+
+
+def compile_restore_plan(saved_icons, monitors, spacing, saved_monitors=None, logger=None,
+                         occupied=None):
+    """把保存的图标换算为当前拓扑与间距下的 LVM 目标坐标，顺序与 saved_icons 相同。
+
+    monitors 为 get_monitors() 的结果；saved_monitors 为 None 时 saved_icons
+    的 x/y 直接作为 LVM 坐标，否则按列行换算，没有列行的图标使用保存的屏幕坐标 x/y。
+    occupied 为不属于布局的当前图标的屏幕坐标 (xs, ys)，
+    其所在单元不用于安置原单元无效或冲突的图标。
+    """
+    saved = IconTable.coerce(saved_icons)
+    names = saved.names()
+    spacing_x, spacing_y = spacing
+
+    # LVM 坐标转换偏移
+    virtual_left = min(m['rect'][0] for m in monitors) if monitors else 0
+    virtual_top  = min(m['rect'][1] for m in monitors) if monitors else 0
+
+    if saved_monitors is None:
+        return CompiledPlan(names, saved.column("x"), saved.column("y"),
+                            virtual_left, virtual_top)
+
+    current_primary = next((m for m in monitors if m['is_primary']), monitors[0])
+    primary_pos = monitors.index(current_primary)
+    monitor_mapping, exact = _map_saved_monitors(saved_monitors, monitors, current_primary)
+    positions = {id(m): pos for pos, m in enumerate(monitors)}
+    grids = [GridOccupancy.for_monitor(m, spacing) for m in monitors]
+    fallback_order = [primary_pos] + [pos for pos in range(len(monitors)) if pos != primary_pos]
+
+    targets = [None] * len(names)     # (显示器位置, col, row)；位置为 None 时为 LVM (x, y)
+    wanted = []
+    marked_xs, marked_ys = (list(occupied[0]), list(occupied[1])) if occupied else ([], [])
+    for i, (monitor, col, row, x, y, mask) in enumerate(zip(
+            saved.column("monitor"), saved.column("col"), saved.column("row"),
+            saved.column("x"), saved.column("y"), saved.column("mask"))):
+        if mask & (F_COL | F_ROW) != F_COL | F_ROW and mask & (F_X | F_Y) == F_X | F_Y:
+            # 只有屏幕坐标的图标（旧格式）：直接使用 x/y，并占用其所在单元
+            targets[i] = (None, x - virtual_left, y - virtual_top)
+            marked_xs.append(x)
+            marked_ys.append(y)
+            wanted.append(None)
+            continue
+        target_monitor = monitor_mapping.get(monitor, current_primary)
+        wanted.append((positions[id(target_monitor)], col, row, monitor in exact))
+
+    # 先让对应上的显示器中的图标占用原单元，再安置其余图标；之后标记只有 x/y 的图标
+    # 与不属于布局的当前图标所在单元。原单元无效或已被占用的图标放到同一显示器上最近的空闲单元，
+    # 该显示器已满时依次尝试主显示器与其他显示器
+    for exact_pass in (True, False):
+        for i, want in enumerate(wanted):
+            if want is None:
+                continue
+            pos, col, row, is_exact = want
+            if is_exact == exact_pass and grids[pos].occupy(col, row):
+                targets[i] = (pos, col, row)
+    if marked_xs:
+        for pos, col, row in zip(*MonitorIndex(monitors).assign(marked_xs, marked_ys, spacing)):
+            grids[pos].occupy(col, row)
+    relocated = 0
+    for i, want in enumerate(wanted):
+        if targets[i] is not None:
+            continue
+        pos, col, row, _ = want
+        for candidate in [pos] + [p for p in fallback_order if p != pos]:
+            cell = grids[candidate].place(col, row) if grids[candidate].free else None
+            if cell is not None:
+                targets[i] = (candidate, cell[0], cell[1])
+                break
+        else:
+            # 所有网格都已占满（或间距无效）：保持原列行，叠放在目标显示器上
+            targets[i] = (pos, col, row)
+        relocated += 1
+    if relocated and logger:
+        logger.warning(f"{relocated} icons relocated to free grid cells.")
+
+    xs, ys = [], []
+    for pos, col, row in targets:
+        if pos is None:
+            xs.append(col)
+            ys.append(row)
+            continue
+        rect = monitors[pos]['rect']
+        # 屏幕坐标 → LVM 虚拟桌面坐标
+        xs.append(rect[0] + int(col * spacing_x) - virtual_left)
+        ys.append(rect[1] + int(row * spacing_y) - virtual_top)
+    return CompiledPlan(names, xs, ys, virtual_left, virtual_top)
+
+
+def build_restore_plan(saved_icons, current_icons, monitors, spacing,
+                       saved_monitors=None, tolerance=POSITION_TOLERANCE, logger=None):
+    """根据保存的图标与当前快照生成 RestorePlan。
+
+    current_icons 为 get_icons() 的结果（屏幕坐标），monitors 为 get_monitors() 的结果；
+    两者均可为 dict 列表或 IconTable。
+    """
+    if saved_monitors is None:
+        compiled = compile_restore_plan(saved_icons, monitors, spacing, None, logger)
+        return compiled.resolve(current_icons, tolerance)
+    matched = match_saved(saved_icons, current_icons)
+    compiled = compile_restore_plan(saved_icons, monitors, spacing, saved_monitors, logger,
+                                    unmatched_positions(current_icons, matched[0]))
+    return compiled.resolve(current_icons, tolerance, matched=matched)
@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pytest
+
+# 模块位于仓库根目录，没有安装为包
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import desktop_manager
+import display_topology
+from desktop_sim import SimulatedDisplays, SimulatedListView, desktop_items, monitor_row
+
+
+class SimulatedDesktop:
+    """模拟的显示器与桌面 ListView，以及连接到它的 DesktopSession。"""
+
+    def __init__(self, monitor_count, icon_count):
+        self.displays = SimulatedDisplays(monitor_row(monitor_count))
+        display_topology.use_source(self.displays)
+        self.sim = SimulatedListView(desktop_items(icon_count, self.displays.rects),
+                                     log_messages=False)
+        self.session = desktop_manager.DesktopSession(
+            lambda: desktop_manager.DesktopManager(self.sim))
+
+    def positions(self):
+        return {name: (x, y) for name, x, y in self.sim.items}
+
+    def close(self):
+        self.session.close()
+        display_topology.use_source(None)
+
+
+@pytest.fixture
+def simulated_desktop():
+    """simulated_desktop(monitor_count, icon_count) 安装模拟桌面，测试结束时卸载。"""
+    desktops = []
+
+    def create(monitor_count=1, icon_count=50):
+        desktop = SimulatedDesktop(monitor_count, icon_count)
+        desktops.append(desktop)
+        return desktop
+    yield create
+    for desktop in desktops:
+        desktop.close()
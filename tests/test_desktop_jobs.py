@@ -0,0 +1,136 @@
+import threading
+
+import pytest
+
+from desktop_jobs import DesktopJobExecutor
+
+TIMEOUT = 5
+
+
+class Recorder:
+    """dispatch 直接在调用线程执行回调；回调把事件记录下来。"""
+
+    def __init__(self):
+        self.events = []
+        self.changed = threading.Condition()
+
+    def dispatch(self, func, *args):
+        func(*args)
+
+    def record(self, *event):
+        with self.changed:
+            self.events.append(event)
+            self.changed.notify_all()
+
+    def callback(self, *prefix):
+        return lambda *args: self.record(*prefix, *args)
+
+    def wait_for(self, count):
+        with self.changed:
+            assert self.changed.wait_for(lambda: len(self.events) >= count, TIMEOUT)
+        return self.events
+
+
+@pytest.fixture
+def recorder():
+    return Recorder()
+
+
+@pytest.fixture
+def executor(recorder):
+    executor = DesktopJobExecutor(recorder.dispatch)
+    yield executor
+    executor.shutdown()
+
+
+def blocking_job(started, release, result):
+    def job(cancel):
+        started.set()
+        assert release.wait(TIMEOUT)
+        return result, cancel.is_set()
+    return job
+
+
+def test_runs_jobs_serially_in_order(executor, recorder):
+    running = []
+
+    def job(n):
+        def run(cancel):
+            running.append(n)
+            assert len(running) == 1
+            running.pop()
+            return n
+        return run
+
+    for n in range(5):
+        executor.submit("restore", job(n), on_done=recorder.callback("done"))
+    assert recorder.wait_for(5) == [("done", n) for n in range(5)]
+
+
+def test_replace_drops_queued_and_cancels_running(executor, recorder):
+    started, release = threading.Event(), threading.Event()
+    running = executor.submit("restore", blocking_job(started, release, "first"),
+                              on_done=recorder.callback("done"))
+    assert started.wait(TIMEOUT)
+    queued = executor.submit("restore", lambda cancel: "second",
+                             on_done=recorder.callback("done"),
+                             on_cancel=recorder.callback("cancelled", "second"))
+    other = executor.submit("preview", lambda cancel: "preview",
+                            on_done=recorder.callback("done"))
+    executor.submit("restore", lambda cancel: "third", on_done=recorder.callback("done"),
+                    replace=True)
+
+    # 排队的同类任务立即收到 on_cancel，正在执行的只收到取消信号
+    assert recorder.events == [("cancelled", "second")]
+    assert queued.cancelled and running.cancelled and not other.cancelled
+    release.set()
+    assert recorder.wait_for(4)[1:] == [
+        ("done", ("first", True)), ("done", "preview"), ("done", "third"),
+    ]
+
+
+def test_cancel_by_kind(executor, recorder):
+    started, release = threading.Event(), threading.Event()
+    executor.submit("snapshot", blocking_job(started, release, "snapshot"),
+                    on_done=recorder.callback("done"))
+    assert started.wait(TIMEOUT)
+    executor.submit("restore", lambda cancel: "restore",
+                    on_cancel=recorder.callback("cancelled", "restore"))
+    executor.submit("preview", lambda cancel: "preview", on_done=recorder.callback("done"))
+
+    executor.cancel("restore")
+    release.set()
+    assert recorder.wait_for(3) == [
+        ("cancelled", "restore"), ("done", ("snapshot", False)), ("done", "preview"),
+    ]
+
+
+def test_errors_go_to_on_error(executor, recorder):
+    def fail(cancel):
+        raise RuntimeError("ListView not found")
+
+    executor.submit("restore", fail, on_done=recorder.callback("done"),
+                    on_error=recorder.callback("error"))
+    executor.submit("restore", lambda cancel: "next", on_done=recorder.callback("done"))
+    events = recorder.wait_for(2)
+    assert events[0][0] == "error" and str(events[0][1]) == "ListView not found"
+    assert events[1] == ("done", "next")
+
+
+def test_shutdown_drops_jobs_without_callbacks(recorder):
+    executor = DesktopJobExecutor(recorder.dispatch)
+    started, release = threading.Event(), threading.Event()
+    running = executor.submit("restore", blocking_job(started, release, "first"))
+    assert started.wait(TIMEOUT)
+    queued = executor.submit("restore", lambda cancel: "second",
+                             on_done=recorder.callback("done"),
+                             on_cancel=recorder.callback("cancelled"))
+
+    executor.shutdown()
+    release.set()
+    executor._thread.join(TIMEOUT)
+    assert not executor._thread.is_alive()
+    assert running.cancelled and queued.cancelled
+    assert recorder.events == []
+    with pytest.raises(RuntimeError):
+        executor.submit("restore", lambda cancel: None)
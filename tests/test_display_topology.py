@@ -0,0 +1,71 @@
+import display_topology
+from desktop_sim import SimulatedDisplays
+from display_topology import TopologyCache
+
+
+class FakeSource:
+    def __init__(self):
+        self.rect = (0, 0, 1920, 1080)
+        self.work = (0, 0, 1920, 1040)
+        self.broken = False
+        self.enumerations = 0
+
+    def signature_func(self):
+        return None if self.broken else ((1, self.rect, self.work),)
+
+    def monitors(self):
+        self.enumerations += 1
+        return [{"rect": self.rect, "work": self.work, "is_primary": True}]
+
+    def monitors_info(self):
+        return [{"rect": self.rect, "is_primary": True}]
+
+
+def test_cache_until_signature_changes():
+    source = FakeSource()
+    cache = TopologyCache(source.signature_func, source.monitors, source.monitors_info)
+    first = cache.monitors()
+    cache.monitors()
+    assert source.enumerations == 1
+    generation = cache.generation
+
+    # 只有工作区变化（任务栏移动）也要重新枚举
+    source.work = (0, 40, 1920, 1080)
+    second = cache.monitors()
+    assert source.enumerations == 2
+    assert cache.generation == generation + 1
+    assert first[0]["work"] != second[0]["work"]
+
+
+def test_invalidate_forces_enumeration():
+    source = FakeSource()
+    cache = TopologyCache(source.signature_func, source.monitors, source.monitors_info)
+    cache.monitors()
+    generation = cache.generation
+    cache.invalidate()
+    cache.monitors()
+    assert source.enumerations == 2
+    assert cache.generation == generation + 1
+
+
+def test_missing_signature_is_never_cached():
+    source = FakeSource()
+    source.broken = True
+    cache = TopologyCache(source.signature_func, source.monitors, source.monitors_info)
+    cache.monitors()
+    cache.monitors()
+    assert source.enumerations == 2
+
+
+def test_simulated_taskbar_change_updates_work_area():
+    displays = SimulatedDisplays([(0, 0, 1920, 1080)])
+    display_topology.use_source(displays)
+    try:
+        assert display_topology.get_monitors()[0]["work"] == (0, 0, 1920, 1040)
+        fingerprint = display_topology.current_fingerprint()
+        displays.taskbar = 60
+        assert display_topology.get_monitors()[0]["work"] == (0, 0, 1920, 1020)
+        # 指纹只比较矩形与分辨率，布局匹配不受任务栏影响
+        assert display_topology.current_fingerprint() == fingerprint
+    finally:
+        display_topology.use_source(None)
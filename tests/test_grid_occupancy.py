@@ -0,0 +1,84 @@
+import itertools
+import random
+
+from grid_occupancy import GridOccupancy
+
+
+def grid(cols, rows, spacing=(100, 100)):
+    width, height = cols * spacing[0], rows * spacing[1]
+    return GridOccupancy((0, 0, width, height), (0, 0, width, height), spacing)
+
+
+def brute_force(g, col, row):
+    """按定义求最近空闲单元：像素距离最小，相同时取列、行较小者。"""
+    free = [cell for cell in itertools.product(range(g.col0, g.col0 + g.cols),
+                                               range(g.row0, g.row0 + g.rows))
+            if g.is_free(*cell)]
+    if not free:
+        return None
+    return min(free, key=lambda c: (((c[0] - col) * g.spacing_x) ** 2 +
+                                    ((c[1] - row) * g.spacing_y) ** 2, c))
+
+
+def test_work_area_excludes_taskbar():
+    g = GridOccupancy((0, 0, 1920, 1080), (0, 0, 1920, 1040), (75, 100))
+    assert (g.cols, g.rows) == (25, 10)
+    assert g.contains(24, 9)
+    assert not g.contains(25, 0)
+    assert not g.contains(0, 10)
+
+
+def test_nearest_prefers_neighbour_in_same_row():
+    g = grid(25, 10)
+    for row in range(3, 10):
+        g.occupy(5, row)
+    # 按排列顺序会先到下一列的 (6, 0)，但 (4, 3) 更近
+    assert g.nearest_free(5, 3) == (4, 3)
+
+
+def test_full_last_column_does_not_wrap_to_origin():
+    g = grid(25, 6)
+    for row in range(6):
+        g.occupy(24, row)
+    assert g.nearest_free(24, 5) == (23, 5)
+    assert g.place(24, 5) == (23, 5)
+    assert g.place(24, 5) == (23, 4)
+
+
+def test_out_of_range_request_goes_to_nearest_edge():
+    g = grid(25, 6)
+    for row in range(6):
+        g.occupy(24, row)
+    assert g.nearest_free(30, 5) == (23, 5)
+    assert g.nearest_free(-3, -2) == (0, 0)
+
+
+def test_place_until_full():
+    g = grid(3, 2)
+    placed = {g.place(1, 1) for _ in range(6)}
+    assert len(placed) == 6
+    assert g.free == 0
+    assert g.place(1, 1) is None
+    assert g.nearest_free(0, 0) is None
+
+
+def test_empty_grid_with_invalid_spacing():
+    g = GridOccupancy((0, 0, 1920, 1080), (0, 0, 1920, 1040), (0, 100))
+    assert len(g) == 0
+    assert not g.occupy(0, 0)
+    assert g.place(0, 0) is None
+
+
+def test_matches_brute_force():
+    rng = random.Random(7)
+    for _ in range(200):
+        g = grid(rng.randint(1, 12), rng.randint(1, 8), (rng.randint(40, 120), rng.randint(40, 140)))
+        for cell in itertools.product(range(g.cols), range(g.rows)):
+            if rng.random() < 0.6:
+                g.occupy(*cell)
+        for _ in range(10):
+            col, row = rng.randint(-4, 16), rng.randint(-4, 12)
+            expected = brute_force(g, col, row)
+            assert g.nearest_free(col, row) == expected
+            if expected is not None:
+                g.occupy(*expected)
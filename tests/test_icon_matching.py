@@ -0,0 +1,80 @@
+from icon_matching import match_icons, ngrams, normalize
+
+
+def match(saved, current, offset=(0, 0), fuzzy=True):
+    """saved / current 为 [(name, x, y), ...]。"""
+    return match_icons([n for n, _, _ in saved], [x for _, x, _ in saved],
+                       [y for _, _, y in saved], [n for n, _, _ in current],
+                       [x for _, x, _ in current], [y for _, _, y in current],
+                       offset, fuzzy)
+
+
+def test_normalize_strips_shortcut_suffixes():
+    assert normalize("App - 快捷方式") == "app"
+    assert normalize("App - Shortcut.lnk") == "app"
+    assert normalize("Report (2)") == "report"
+    assert normalize("  Visual Studio Code  ") == "visual studio code"
+    assert normalize("微信") == "微信"
+
+
+def test_ngrams_cover_short_names():
+    assert ngrams("a")
+    assert ngrams("app") >= {"  a", " ap", "app", "pp "}
+
+
+def test_exact_names():
+    matches, renamed = match([("a", 0, 0), ("b", 100, 0)], [("b", 5, 5), ("a", 7, 7)])
+    assert matches == [1, 0]
+    assert renamed == []
+
+
+def test_duplicates_pair_by_distance():
+    saved = [("App", 0, 0), ("App", 500, 300)]
+    current = [("App", 510, 290), ("App", 3, 4)]
+    matches, _ = match(saved, current)
+    assert matches == [1, 0]
+
+
+def test_duplicates_use_offset():
+    # 当前坐标为屏幕坐标，减去 offset 后与保存的 LVM 坐标比较
+    saved = [("App", 0, 0), ("App", 500, 0)]
+    current = [("App", -1420, 0), ("App", -1920, 0)]
+    matches, _ = match(saved, current, offset=(-1920, 0))
+    assert matches == [1, 0]
+
+
+def test_extra_duplicate_is_missing():
+    matches, _ = match([("App", 0, 0), ("App", 100, 0)], [("App", 99, 0)])
+    assert matches == [-1, 0]
+
+
+def test_normalized_fallback():
+    saved = [("App", 0, 0), ("Notes", 100, 0)]
+    current = [("app - 快捷方式", 0, 0), ("Notes (2)", 100, 0)]
+    matches, renamed = match(saved, current)
+    assert matches == [0, 1]
+    assert renamed == [0, 1]
+    assert match(saved, current, fuzzy=False) == ([-1, -1], [])
+
+
+def test_trigram_fallback():
+    saved = [("Adobe Photoshop 2023", 0, 0), ("Steam", 100, 0)]
+    current = [("Adobe Photoshop 2024", 5, 0), ("Calculator", 100, 0)]
+    matches, renamed = match(saved, current)
+    assert matches == [0, -1]
+    assert renamed == [0]
+
+
+def test_trigram_prefers_higher_score_then_distance():
+    saved = [("Project Alpha Report", 0, 0)]
+    current = [("Project Alpha Reports", 900, 0), ("Project Alpha Rep", 0, 0)]
+    matches, _ = match(saved, current)
+    assert matches == [0]
+
+
+def test_exact_match_is_not_reused_by_fuzzy_stage():
+    saved = [("App", 0, 0), ("App - 快捷方式", 100, 0)]
+    current = [("App", 0, 0)]
+    matches, renamed = match(saved, current)
+    assert matches == [0, -1]
+    assert renamed == []
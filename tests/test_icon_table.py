@@ -0,0 +1,37 @@
+import pytest
+
+from icon_table import F_ALL, F_COL, F_ROW, F_X, F_Y, IconTable, to_plain
+
+
+def test_from_dicts_round_trip_keeps_missing_fields():
+    icons = [
+        {"name": "A", "x": 0, "y": 2, "monitor": 1, "monitor_device": "\\\\.\\DISPLAY2",
+         "col": 0, "row": 0},
+        {"name": "B", "x": 93, "y": 2},
+    ]
+    table = IconTable.from_dicts(icons)
+    assert table.to_dicts() == icons
+    assert list(table.column("mask")) == [F_ALL, F_X | F_Y]
+
+
+def test_float_coordinates_are_rounded():
+    table = IconTable.from_dicts([{"name": "A", "x": 93.6, "y": 2.4, "col": 1.0, "row": 0.0}])
+    assert table[0] == {"name": "A", "x": 94, "y": 2, "col": 1, "row": 0}
+    assert table.column("mask")[0] & (F_COL | F_ROW) == F_COL | F_ROW
+
+
+def test_invalid_coordinate_names_the_icon():
+    with pytest.raises(ValueError, match="'Broken' has invalid x"):
+        IconTable.from_dicts([{"name": "Broken", "x": "left", "y": 0}])
+
+
+def test_grid_order_is_a_view():
+    table = IconTable.from_dicts([
+        {"name": "C", "x": 0, "y": 0, "monitor": 1, "col": 0, "row": 0},
+        {"name": "B", "x": 0, "y": 0, "monitor": 0, "col": 1, "row": 0},
+        {"name": "A", "x": 0, "y": 0, "monitor": 0, "col": 0, "row": 1},
+    ])
+    ordered = table.grid_order()
+    assert ordered.names() == ["B", "A", "C"]
+    assert table.names() == ["C", "B", "A"]
+    assert to_plain({"icons": ordered})["icons"][0]["name"] == "B"
@@ -0,0 +1,65 @@
+import pytest
+
+import instance_ipc
+from instance_ipc import InstanceServer, forward, is_running, send_command
+
+NAME = "desktop-icon-test"
+
+
+@pytest.fixture
+def server(tmp_path):
+    calls = []
+
+    def handler(command, args):
+        calls.append((command, args))
+        if command == "fail":
+            raise ValueError("boom")
+        return {"command": command, "args": args}
+
+    instance = InstanceServer(handler, name=NAME, directory=str(tmp_path))
+    instance.start()
+    instance.calls = calls
+    yield instance
+    instance.close()
+
+
+def test_no_instance(tmp_path):
+    assert not is_running(NAME, str(tmp_path))
+    assert send_command("show", name=NAME, directory=str(tmp_path)) is None
+    assert forward(["show"], name=NAME, directory=str(tmp_path)) is None
+
+
+def test_send_command_round_trip(server, tmp_path):
+    assert is_running(NAME, str(tmp_path))
+    reply = send_command("restore", ["办公室"], name=NAME, directory=str(tmp_path))
+    assert reply == {"ok": True, "result": {"command": "restore", "args": ["办公室"]}}
+    assert server.calls == [("restore", ["办公室"])]
+
+
+def test_forward_exit_codes(server, tmp_path):
+    assert forward([], name=NAME, directory=str(tmp_path)) == 0
+    assert server.calls[-1] == ("show", [])
+    assert forward(["fail"], name=NAME, directory=str(tmp_path)) == 1
+
+
+def test_second_server_refuses_to_start(server, tmp_path):
+    other = InstanceServer(lambda command, args: None, name=NAME, directory=str(tmp_path))
+    with pytest.raises(instance_ipc.AlreadyRunning):
+        other.start()
+
+
+def test_close_removes_endpoint(server, tmp_path):
+    server.close()
+    assert not is_running(NAME, str(tmp_path))
+
+
+def test_launcher_forwards_without_gui_imports(monkeypatch):
+    import sys
+
+    import launcher
+    forwarded = []
+    monkeypatch.setattr(instance_ipc, "forward", lambda argv: forwarded.append(argv) or 0)
+    monkeypatch.delitem(sys.modules, "main_gui", raising=False)
+    assert launcher.main(["restore", "办公室"]) == 0
+    assert forwarded == [["restore", "办公室"]]
+    assert "main_gui" not in sys.modules
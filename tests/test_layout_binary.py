@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from icon_table import IconTable
+from layout_binary import (
+    LayoutFormatError, is_binary, load_layout, open_layout, pack_layout, unpack_layout,
+)
+
+DATA = {
+    "version": "3.6",
+    "timestamp": 1700000000.0,
+    "monitors": [{"index": 0, "rect": [0, 0, 1920, 1080], "device": "\\\\.\\DISPLAY1",
+                  "is_primary": True}],
+    "spacing": [75, 100],
+    "icons": [
+        {"name": "此电脑", "x": 0, "y": 2, "monitor": 0, "monitor_device": "\\\\.\\DISPLAY1",
+         "col": 0, "row": 0},
+        {"name": "回收站", "x": -75, "y": 102, "monitor": 1, "col": -1, "row": 1},
+        {"name": "Example App", "x": 93, "y": 2},
+    ],
+}
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_round_trip_dicts(compress):
+    payload = pack_layout(DATA, compress=compress)
+    assert is_binary(payload)
+    assert unpack_layout(payload) == DATA
+
+
+def test_round_trip_table_keeps_missing_fields():
+    payload = pack_layout(dict(DATA, icons=IconTable.from_dicts(DATA["icons"])))
+    data = unpack_layout(payload, table=True)
+    assert isinstance(data["icons"], IconTable)
+    assert data["icons"].to_dicts() == DATA["icons"]
+    assert data["monitors"] == DATA["monitors"]
+
+
+def test_mapped_file_and_json_fallback(tmp_path):
+    binary = tmp_path / "layout.dil"
+    binary.write_bytes(pack_layout(DATA))
+    with open_layout(str(binary)) as view:
+        assert len(view) == 3
+        assert view.name(2) == "Example App"
+        assert view.icon(1) == DATA["icons"][1]
+    text = tmp_path / "layout.json"
+    text.write_text(json.dumps(DATA, ensure_ascii=False), encoding="utf-8")
+    assert load_layout(str(text)) == load_layout(str(binary)) == DATA
+
+
+def test_rejects_values_out_of_range():
+    icons = [{"name": "x", "x": 0, "y": 0, "col": 2**15}]
+    with pytest.raises(LayoutFormatError):
+        pack_layout(dict(DATA, icons=icons))
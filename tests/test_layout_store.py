@@ -0,0 +1,198 @@
+import json
+import os
+
+import pytest
+
+import layout_store
+from layout_store import INDEX_VERSION, LayoutManager
+
+MONITORS = [{"index": 0, "rect": [0, 0, 1920, 1080], "device": "\\\\.\\DISPLAY1",
+             "is_primary": True}]
+
+
+def layout_data(count=3, offset=0):
+    return {
+        "version": "3.6",
+        "monitors": MONITORS,
+        "spacing": [75, 100],
+        "icons": [{"name": f"图标 {i}", "x": offset + i * 75, "y": 2, "monitor": 0,
+                   "col": i, "row": 0} for i in range(count)],
+    }
+
+
+def legacy_layout(layout_id, name, data):
+    return {"id": layout_id, "name": name, "saved": True,
+            "timestamp": 1700000000.0 + int(layout_id), "data": data}
+
+
+def read_index(manager):
+    with open(manager.index_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def icon_names(data):
+    return list(data["icons"].names())
+
+
+def test_migrates_legacy_file_and_keeps_backup(tmp_path):
+    legacy = tmp_path / "desktop_layouts.json"
+    legacy.write_text(json.dumps({"layouts": [
+        legacy_layout("1", "工作", layout_data(3)),
+        legacy_layout("2", "游戏", layout_data(2, offset=300)),
+        {"id": "3", "name": "", "saved": False, "timestamp": None},
+    ]}, ensure_ascii=False), encoding="utf-8")
+
+    manager = LayoutManager(str(legacy))
+
+    assert not legacy.exists()
+    assert (tmp_path / "desktop_layouts.json.bak").exists()
+    store = tmp_path / "desktop_layouts"
+    assert sorted(os.listdir(store)) == ["1.dil", "2.dil", "index.json"]
+    index = read_index(manager)
+    assert index["version"] == INDEX_VERSION
+    assert [(h["id"], h["name"], h["icon_count"]) for h in index["layouts"]] == \
+        [("1", "工作", 3), ("2", "游戏", 2), ("3", "", 0)]
+
+    reloaded = LayoutManager(str(legacy))
+    assert [layout["name"] for layout in reloaded.layouts] == ["工作", "游戏", ""]
+    assert icon_names(reloaded.get_data(reloaded.layouts[1])) == ["图标 0", "图标 1"]
+    assert reloaded.get_data(reloaded.layouts[2]) is None
+
+
+def test_migrates_single_layout_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "desktop_layout.json").write_text(json.dumps(layout_data(4)), encoding="utf-8")
+
+    manager = LayoutManager(str(tmp_path / "desktop_layouts.json"))
+
+    assert len(manager.layouts) == 1
+    layout = manager.layouts[0]
+    assert layout["name"] == "默认配置" and layout["icon_count"] == 4
+    assert os.path.exists(manager.index_path)
+    assert icon_names(LayoutManager(manager.filename).get_data(layout)) == \
+        [f"图标 {i}" for i in range(4)]
+
+
+def test_index_writes_are_atomic(tmp_path, monkeypatch):
+    manager = LayoutManager(str(tmp_path / "desktop_layouts.json"))
+    manager.add_layout()
+    manager.update_layout(0, name="工作", data=layout_data())
+    before = (tmp_path / "desktop_layouts" / "index.json").read_bytes()
+
+    def crash(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(layout_store.os, "replace", crash)
+    with pytest.raises(OSError):
+        manager.update_layout(0, name="改名")
+    monkeypatch.undo()
+
+    # 替换失败时旧索引保持完整，下次加载仍是原来的名称
+    assert (tmp_path / "desktop_layouts" / "index.json").read_bytes() == before
+    assert LayoutManager(manager.filename).layouts[0]["name"] == "工作"
+
+    manager.update_layout(0, name="改名")
+    assert not [name for name in os.listdir(manager.store_dir) if name.endswith(".tmp")]
+    assert read_index(manager)["layouts"][0]["name"] == "改名"
+
+
+def test_rename_move_delete_only_touch_index(tmp_path):
+    manager = LayoutManager(str(tmp_path / "desktop_layouts.json"))
+    for i, name in enumerate(("A", "B")):
+        manager.add_layout()["id"] = str(i + 1)
+        manager.update_layout(i, name=name, data=layout_data(i + 1))
+    payload = os.path.join(manager.store_dir, "1.dil")
+    mtime = os.stat(payload).st_mtime_ns
+
+    manager.update_layout(0, name="A2")
+    manager.move_layout(0, 1)
+    assert os.stat(payload).st_mtime_ns == mtime
+    assert [h["name"] for h in read_index(manager)["layouts"]] == ["B", "A2"]
+
+    manager.delete_layout(1)
+    assert not os.path.exists(payload)
+    assert [h["id"] for h in read_index(manager)["layouts"]] == ["2"]
+
+
+def test_falls_back_to_json_payload(tmp_path):
+    manager = LayoutManager(str(tmp_path / "desktop_layouts.json"))
+    manager.add_layout()["id"] = "7"
+    data = layout_data(2)
+    data["icons"][0]["col"] = 40000   # 超出二进制格式 int16 的范围
+    manager.update_layout(0, name="大列号", data=data)
+
+    assert sorted(os.listdir(manager.store_dir)) == ["7.json", "index.json"]
+    reloaded = LayoutManager(manager.filename)
+    assert reloaded.get_data(reloaded.layouts[0])["icons"].column("col")[0] == 40000
+
+
+def saved_store(tmp_path, sizes, cache_max_icons=layout_store.CACHE_MAX_ICONS):
+    manager = LayoutManager(str(tmp_path / "desktop_layouts.json"))
+    for i, count in enumerate(sizes):
+        manager.add_layout()["id"] = str(i + 1)
+        manager.update_layout(i, name=f"布局 {i + 1}", data=layout_data(count))
+    return LayoutManager(manager.filename, cache_max_icons=cache_max_icons)
+
+
+def count_reads(manager, monkeypatch):
+    reads = []
+    original = manager._read_payload
+
+    def read(layout_id):
+        reads.append(layout_id)
+        return original(layout_id)
+
+    monkeypatch.setattr(manager, "_read_payload", read)
+    return reads
+
+
+def test_load_reads_headers_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(LayoutManager, "_read_payload",
+                        lambda self, layout_id: pytest.fail("payload read during load"))
+    manager = saved_store(tmp_path, [3, 5])
+    monkeypatch.undo()
+
+    assert all(set(layout) == set(layout_store.HEADER_KEYS) for layout in manager.layouts)
+    assert [layout["icon_count"] for layout in manager.layouts] == [3, 5]
+    reads = count_reads(manager, monkeypatch)
+    assert len(manager.get_data(manager.layouts[1])["icons"]) == 5
+    assert len(manager.get_data(manager.layouts[1])["icons"]) == 5
+    assert reads == ["2"]
+
+
+def test_payload_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    manager = saved_store(tmp_path, [4, 4, 4], cache_max_icons=8)
+    reads = count_reads(manager, monkeypatch)
+    first, second, third = manager.layouts
+
+    manager.get_data(first)
+    manager.get_data(second)
+    manager.get_data(first)    # second 成为最久未用的一项
+    manager.get_data(third)    # 超出 8 个图标，淘汰 second
+    manager.get_data(first)
+    manager.get_data(second)
+    assert reads == ["1", "2", "3", "2"]
+
+
+def test_payload_cache_keeps_oversized_entry():
+    cache = layout_store._PayloadCache(max_icons=2)
+    cache.put("a", layout_data(1))
+    cache.put("b", layout_data(5))
+    assert cache.get("a") is None
+    assert len(cache.get("b")["icons"]) == 5
+
+
+def test_backfills_old_index(tmp_path):
+    manager = saved_store(tmp_path, [3])
+    expected = dict(manager.layouts[0])
+    assert expected["fingerprint"] and expected["content_hash"]
+    index = read_index(manager)
+    for key in ("icon_count", "fingerprint", "content_hash"):
+        del index["layouts"][0][key]
+    with open(manager.index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+
+    reloaded = LayoutManager(manager.filename)
+    assert reloaded.layouts[0] == expected
+    assert read_index(reloaded)["layouts"][0] == expected
+    assert reloaded.layouts_for_fingerprint(expected["fingerprint"]) == reloaded.layouts
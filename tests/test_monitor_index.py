@@ -0,0 +1,58 @@
+import pytest
+
+import monitor_index
+from monitor_index import MonitorIndex
+
+# 主显示器在左，右侧一台竖放、顶部偏下的副显示器，左侧一台负坐标显示器
+MONITORS = [
+    {'rect': (0, 0, 1920, 1080)},
+    {'rect': (1920, 200, 3000, 2120)},
+    {'rect': (-1280, 0, 0, 1024)},
+]
+
+
+def test_locate_inside():
+    index = MonitorIndex(MONITORS)
+    assert index.locate(0, 0) == 0
+    assert index.locate(1919, 1079) == 0
+    assert index.locate(1920, 200) == 1
+    assert index.locate(-1, 500) == 2
+    assert len(index) == 3
+
+
+def test_locate_outside_and_gaps():
+    index = MonitorIndex(MONITORS)
+    assert index.locate(2500, 100) == -1      # 副显示器上方的空隙
+    assert index.locate(5000, 5000) == -1
+    assert not index.contains(-1281, 0)
+
+
+def test_nearest_falls_back_to_closest_monitor():
+    index = MonitorIndex(MONITORS)
+    assert index.nearest(2500, 100) == 1
+    assert index.nearest(-5000, 10) == 2
+    assert index.nearest(100, 1500) == 0
+    assert index.monitor_at(2500, 100) is MONITORS[1]
+    assert MonitorIndex([]).nearest(0, 0) == -1
+
+
+def test_overlapping_monitors_prefer_first():
+    index = MonitorIndex([{'rect': (0, 0, 1920, 1080)}, {'rect': (0, 0, 1920, 1080)}])
+    assert index.locate(10, 10) == 0
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_assign_matches_scalar_lookup(monkeypatch, use_numpy):
+    if use_numpy and monitor_index.np is None:
+        pytest.skip("numpy not installed")
+    if not use_numpy:
+        monkeypatch.setattr(monitor_index, "np", None)
+    index = MonitorIndex(MONITORS)
+    xs = [x for x in range(-1500, 3200, 37)]
+    ys = [(x * 7) % 2200 - 50 for x in xs]
+    positions, cols, rows = index.assign(xs, ys, (75, 100))
+    for x, y, pos, col, row in zip(xs, ys, positions, cols, rows):
+        left, top = MONITORS[pos]['rect'][:2]
+        assert pos == index.nearest(x, y)
+        assert col == round((x - left) / 75)
+        assert row == round((y - top) / 100)
@@ -0,0 +1,97 @@
+import pytest
+
+import desktop_manager
+import metrics
+from layout_store import content_hash
+from plan_cache import PlanCache, pack_plan, unpack_plan
+from restore_plan import CompiledPlan
+
+MONITORS = [{'device': 'A', 'rect': (0, 0, 1920, 1080), 'work': (0, 0, 1920, 1040),
+             'is_primary': True}]
+LAYOUT = {"id": "42", "content_hash": "abc"}
+
+
+def plan(n=3):
+    return CompiledPlan([f"图标 {i}" for i in range(n)], range(0, n * 75, 75), [0] * n, -1920, 0)
+
+
+def same(a, b):
+    return (a.names, a.xs, a.ys, a.virtual_left, a.virtual_top) == \
+        (b.names, b.xs, b.ys, b.virtual_left, b.virtual_top)
+
+
+def test_pack_round_trip():
+    key = PlanCache.key(LAYOUT, MONITORS, (75, 100))
+    stored_key, restored = unpack_plan(pack_plan(key, plan()))
+    assert stored_key == key
+    assert same(restored, plan())
+
+
+def test_unpack_rejects_bad_data():
+    payload = pack_plan(PlanCache.key(LAYOUT, MONITORS, (75, 100)), plan())
+    with pytest.raises(ValueError):
+        unpack_plan(b"XXXX" + payload[4:])
+    with pytest.raises(ValueError):
+        unpack_plan(payload[:-4])
+
+
+def test_key_changes_with_inputs():
+    base = PlanCache.key(LAYOUT, MONITORS, (75, 100))
+    assert PlanCache.key(LAYOUT, MONITORS, (76, 100)) != base
+    moved_taskbar = [dict(MONITORS[0], work=(0, 40, 1920, 1080))]
+    assert PlanCache.key(LAYOUT, moved_taskbar, (75, 100)) != base
+    assert PlanCache.key(LAYOUT, MONITORS, (75, 100), ([10], [20])) != base
+    # 占用位置与顺序无关
+    assert (PlanCache.key(LAYOUT, MONITORS, (75, 100), ([1, 2], [3, 4])) ==
+            PlanCache.key(LAYOUT, MONITORS, (75, 100), ([2, 1], [4, 3])))
+    assert PlanCache.key({"id": "42"}, MONITORS, (75, 100)) is None
+    assert PlanCache.key(LAYOUT, [], (75, 100)) is None
+
+
+def test_disk_cache_survives_new_instance(tmp_path):
+    key = PlanCache.key(LAYOUT, MONITORS, (75, 100))
+    PlanCache(str(tmp_path)).put(key, plan())
+    cache = PlanCache(str(tmp_path))
+    assert same(cache.get(key), plan())
+    # 同一布局的文件只保存最近的键
+    assert cache.get(PlanCache.key(LAYOUT, MONITORS, (80, 100))) is None
+
+
+def test_discard_and_memory_limit(tmp_path):
+    cache = PlanCache(str(tmp_path), memory_size=2)
+    keys = [PlanCache.key({"id": str(i), "content_hash": "h"}, MONITORS, (75, 100))
+            for i in range(3)]
+    for key in keys:
+        cache.put(key, plan())
+    assert len(cache._plans) == 2
+    assert cache.get(keys[0]) is not None          # 从磁盘读回
+    cache.discard("0")
+    assert cache.get(keys[0]) is None
+    assert not (tmp_path / "0.plan").exists()
+
+
+def test_restore_uses_cache_until_desktop_changes(simulated_desktop):
+    desktop = simulated_desktop(monitor_count=2, icon_count=60)
+    data = desktop_manager.get_current_layout_data(desktop.session)
+    layout = {"id": "1", "content_hash": content_hash(data)}
+    plans = PlanCache()
+
+    def restore():
+        metrics.reset()
+        desktop_manager.restore_from_data(data, session=desktop.session, layout=layout,
+                                          plans=plans)
+        counters = metrics.snapshot()["counters"]
+        return counters.get("plan_cache_hit", 0), counters.get("plan_cache_miss", 0)
+
+    metrics.enable()
+    try:
+        assert restore() == (0, 1)
+        assert restore() == (1, 0)
+        desktop.displays.taskbar = 80           # 工作区变化
+        assert restore() == (0, 1)
+        desktop.sim.items.append(["新建文本文档.txt", 1000, 700])   # 布局外的图标
+        assert restore() == (0, 1)
+        assert restore() == (1, 0)
+    finally:
+        metrics.disable()
+        metrics.reset()
@@ -0,0 +1,68 @@
+import pytest
+
+import progress_channel
+from progress_channel import ProgressChannel
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(progress_channel.time, "monotonic", lambda: now[0])
+    return now
+
+
+def moved(updates):
+    return [(u.phase, u.moved) for u in updates]
+
+
+def test_throttles_within_phase_and_keeps_latest(clock):
+    channel = ProgressChannel(max_rate=10)
+    assert channel.report("move", 1, total=100)
+    clock[0] += 0.01
+    assert not channel.report("move", 2, total=100)
+    clock[0] += 0.01
+    assert not channel.report("move", 3, total=100)
+    # 被合并的更新只保留最新一条，并在 drain 时送达
+    assert moved(channel.drain()) == [("move", 1), ("move", 3)]
+    assert channel.drain() == []
+
+    clock[0] += 0.2
+    assert channel.report("move", 4, total=100)
+    assert moved(channel.drain()) == [("move", 4)]
+
+
+def test_phase_change_and_finish_are_never_throttled(clock):
+    channel = ProgressChannel(max_rate=10)
+    channel.report("match")
+    assert channel.report("move", 1)
+    assert not channel.report("move", 2)
+    channel.finish("done", moved=5, skipped=1, total=6)
+    assert channel.finished and not channel.done
+
+    updates = channel.drain()
+    assert moved(updates) == [("match", 0), ("move", 1), ("done", 5)]
+    assert updates[-1].skipped == 1 and updates[-1].total == 6
+    assert channel.done
+
+
+def test_ignores_updates_after_finish(clock):
+    channel = ProgressChannel()
+    channel.finish()
+    assert not channel.report("move", 1)
+    channel.finish("again")
+    assert moved(channel.drain()) == [("done", 0)]
+    assert channel.done
+
+
+def test_bounded_queue_drops_oldest(clock):
+    channel = ProgressChannel(max_rate=0, maxsize=3)
+    for i in range(5):
+        channel.report(f"phase {i}")
+    assert [u.phase for u in channel.drain()] == ["phase 2", "phase 3", "phase 4"]
+
+
+def test_elapsed_is_relative_to_start(clock):
+    channel = ProgressChannel()
+    clock[0] += 1.5
+    channel.report("move")
+    assert channel.drain()[0].elapsed == pytest.approx(1.5)
@@ -0,0 +1,128 @@
+import desktop_manager
+from restore_plan import build_restore_plan, compile_restore_plan, match_saved, unmatched_positions
+
+SPACING = (100, 50)
+MONITOR = {'index': 0, 'device': 'A', 'rect': (0, 0, 1000, 500), 'work': (0, 0, 1000, 500),
+           'is_primary': True}
+SAVED_MONITORS = [{'index': 0, 'device': 'A', 'rect': [0, 0, 1000, 500], 'is_primary': True}]
+
+
+def icon(name, col, row, monitor=0):
+    return {'name': name, 'x': col * SPACING[0], 'y': row * SPACING[1], 'monitor': monitor,
+            'col': col, 'row': row}
+
+
+def current(*icons):
+    """(名称, col, row) → get_icons() 形式的屏幕坐标。"""
+    return [{'name': n, 'x': c * SPACING[0], 'y': r * SPACING[1]} for n, c, r in icons]
+
+
+def targets(plan, current_icons):
+    names = [c['name'] for c in current_icons]
+    return {names[idx]: (x // SPACING[0], y // SPACING[1]) for idx, x, y in plan.moves}
+
+
+def test_renamed_icon_is_not_treated_as_unlisted():
+    saved = [icon("A", 0, 0), icon("B", 0, 0), icon("Adobe Photoshop 2023", 5, 5)]
+    desktop = current(("A", 0, 0), ("B", 3, 3), ("Adobe Photoshop 2024", 0, 1))
+    matches, renamed = match_saved(saved, desktop)
+    assert matches == [0, 1, 2] and renamed == [2]
+    assert unmatched_positions(desktop, matches) == ([], [])
+
+    plan = build_restore_plan(saved, desktop, [MONITOR], SPACING, SAVED_MONITORS)
+    # (0, 1) 上的是改名后的图标，它会移回 (5, 5)，B 可以使用该单元
+    assert targets(plan, desktop) == {"B": (0, 1), "Adobe Photoshop 2024": (5, 5)}
+    assert plan.renamed == 1
+
+
+def test_unmatched_icon_keeps_its_cell():
+    saved = [icon("A", 0, 0), icon("B", 0, 0)]
+    desktop = current(("A", 0, 0), ("B", 3, 3), ("Notes.txt", 0, 1))
+    plan = build_restore_plan(saved, desktop, [MONITOR], SPACING, SAVED_MONITORS)
+    # (0, 2) 与 (1, 0) 一样近（100 像素），相同距离时取列较小者
+    assert targets(plan, desktop) == {"B": (0, 2)}
+
+
+# ---- 编译：显示器对应与安置 ----
+
+TWO_SAVED_MONITORS = SAVED_MONITORS + [
+    {'index': 1, 'device': 'GONE', 'rect': [1000, 0, 2000, 500], 'is_primary': False},
+]
+
+
+def compiled_cells(compiled, spacing=SPACING):
+    return {name: (x // spacing[0], y // spacing[1])
+            for name, x, y in zip(compiled.names, compiled.xs, compiled.ys)}
+
+
+def test_exact_monitor_icons_keep_their_cells():
+    # P 来自已不存在的显示器，先出现在列表中，但 Q 的显示器按设备名对应上，Q 优先
+    saved = [icon("P", 0, 0, monitor=1), icon("Q", 0, 0, monitor=0)]
+    compiled = compile_restore_plan(saved, [MONITOR], SPACING, TWO_SAVED_MONITORS)
+    assert compiled_cells(compiled) == {"Q": (0, 0), "P": (0, 1)}
+
+
+def test_missing_monitor_out_of_range_goes_to_nearest_cell():
+    saved = [icon("Far", 30, 2, monitor=1)]
+    compiled = compile_restore_plan(saved, [MONITOR], SPACING, TWO_SAVED_MONITORS)
+    assert compiled_cells(compiled) == {"Far": (9, 2)}
+
+
+def test_full_monitor_falls_back_to_another_monitor():
+    small = dict(MONITOR, rect=(0, 0, 200, 100), work=(0, 0, 200, 100))
+    other = {'index': 1, 'device': 'B', 'rect': (200, 0, 1200, 500),
+             'work': (200, 0, 1200, 500), 'is_primary': False}
+    saved_monitors = [dict(SAVED_MONITORS[0], rect=[0, 0, 200, 100])]
+    saved = [icon(f"I{i}", 0, 0) for i in range(5)]
+    compiled = compile_restore_plan(saved, [small, other], SPACING, saved_monitors)
+    cells = set(zip(compiled.xs, compiled.ys))
+    assert len(cells) == 5
+    # 主显示器只有 2×2 个单元，第 5 个图标放到右侧显示器的 (0, 0)
+    assert (200, 0) in cells
+
+
+def test_icons_without_grid_fields_use_saved_position():
+    saved = [{'name': "Old", 'x': -1000, 'y': 48}, icon("New", 0, 0), icon("Moved", 0, 0)]
+    monitors = [dict(MONITOR, rect=(-1000, 0, 1000, 500), work=(-1000, 0, 1000, 500))]
+    compiled = compile_restore_plan(saved, monitors, SPACING,
+                                    [dict(SAVED_MONITORS[0], rect=[-1000, 0, 1000, 500])])
+    targets = dict(zip(compiled.names, zip(compiled.xs, compiled.ys)))
+    # 屏幕坐标 (-1000, 48) → LVM 坐标（虚拟桌面左边界为 -1000），不再落到 (0, 0) 单元
+    assert targets["Old"] == (0, 48)
+    assert targets["New"] == (0, 0)
+    # Moved 与 New 冲突；最近的 (0, 1) 被 Old 占用，(0, 2) 与 (1, 0) 同样近
+    assert targets["Moved"] == (0, 100)
+
+
+def test_without_saved_monitors_coordinates_are_lvm():
+    saved = [{'name': "A", 'x': 10, 'y': 20}]
+    compiled = compile_restore_plan(saved, [MONITOR], SPACING)
+    assert (compiled.xs, compiled.ys) == ([10], [20])
+
+
+# ---- 在模拟桌面上编译并执行 ----
+
+def test_restore_on_simulated_desktop(simulated_desktop):
+    desktop = simulated_desktop(monitor_count=2, icon_count=120)
+    original = desktop.positions()
+    data = desktop_manager.get_current_layout_data(desktop.session)
+    for item in desktop.sim.items[::4]:
+        item[1] += desktop.sim.spacing[0] * 3
+
+    plan = desktop_manager.restore_from_data(data, session=desktop.session)
+    assert (plan.planned, plan.moved, plan.missing) == (30, 30, 0)
+    assert desktop.positions() == original
+
+    again = desktop_manager.restore_from_data(data, session=desktop.session)
+    assert (again.planned, again.skipped) == (0, 120)
+
+
+def test_restore_onto_fewer_monitors_has_no_overlaps(simulated_desktop):
+    desktop = simulated_desktop(monitor_count=3, icon_count=150)
+    data = desktop_manager.get_current_layout_data(desktop.session)
+    desktop.displays.rects = desktop.displays.rects[:1]
+
+    plan = desktop_manager.restore_from_data(data, session=desktop.session)
+    assert plan.missing == 0
+    positions = list(desktop.positions().values())
+    assert len(set(positions)) == len(positions)